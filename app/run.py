@@ -1,118 +1,123 @@
-import json
-import plotly
-from modules.classes import BinomialExperiment
+import os
+import sys
 
 from flask import Flask
 from flask import render_template, request, jsonify
-from plotly.graph_objs import Scatter
+
+# Run from anywhere: modules/ lives one directory up from this file
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.binomial import BinomialExperiment
+from modules.figures import to_json
+from modules.report import FIGURES
+from modules.server import handle
 
 app = Flask(__name__)
 
-# index webpage displays cool visuals and receives user input text for model
+def experiment_from(payload):
+    """
+    BinomialExperiment built from a request's JSON fields (same fields as modules/server.py).
+    Plans (no sample sizes) are sized before plotting.
+    """
+    experiment = BinomialExperiment(p_control = payload['p_control'],
+                                    p_treatment = payload['p_treatment'],
+                                    n_control = payload.get('n_control', 0),
+                                    n_treatment = payload.get('n_treatment', 0),
+                                    power = payload.get('power', 0.8),
+                                    alpha = payload.get('alpha', 0.05),
+                                    draws = payload.get('draws', 1000000),
+                                    seed = payload.get('seed'))
+
+    if not (experiment.n_control > 0 and experiment.n_treatment > 0):
+        experiment.estimate_sample()
+    experiment.get_p_sample()
+
+    return experiment
+
+def respond(response):
+    """
+    JSON response for a modules/server.py response dict: 400 for errors, 200 otherwise.
+    """
+    return jsonify(response), (400 if 'error' in response else 200)
+
+# index webpage shows the planning figures for an experiment given in the query string
 @app.route('/')
 @app.route('/index')
 def index():
-
-    # extract data needed for visuals
-    # TODO: Below is an example - modify to extract data for your own visuals
-    genre_counts = df.groupby('genre').count()['message']
-    genre_names = list(genre_counts.index)
-
-    labels = [x for x in df.columns if x not in ['id','message','original','genre']]
-    label_means = [df[x].mean() for x in labels]
-
-    top_vals, top_labels = sort_lists(label_means, labels, 'descending', 6)
-    bot_vals, bot_labels = sort_lists(label_means, labels, 'ascending',6)
-
-    # create visuals
-    # TODO: Below is an example - modify to create your own visuals
-    graphs = [
-        {
-            'data': [
-                Scatter(
-                    x = x,
-                    y = y_null,
-                    mode = 'lines'
-                ),
-                Scatter(
-                    x = x,
-                    y = y_alt,
-                    mode = 'lines'
-                )
-            ],
-
-            'layout': {
-                'title': 'Distribution of Message Genres',
-                'yaxis': {
-                    'title': "Count"
-                },
-                'xaxis': {
-                    'title': "Genre"
-                }
-            }
-        },
-        {'data':[
-            Scatter(
-                x = top_labels,
-                y = top_vals,
-                mode = 'lines'
-            )
-        ],
-
-        'layout':{
-            'title':'Top 6 Categories Represented in Message Set',
-            'yaxis':{
-                'title': '% of Messages Classified'
-            },
-            'xaxis': {
-                'title': 'Alert Category'
-            }
-            }
-        },
-
-        {'data':[
-            Scatter(
-                x = bot_labels,
-                y = bot_vals,
-                mode = 'lines'
-            )
-        ],
-        'layout':{
-            'title':'Bottom 6 Categories Represented in Message Set',
-            'yaxis':{
-                'title':'% of Messages Classified'
-            },
-            'xaxis':{
-                'title': 'Alert Category'
-            }
-            }
-        }
-    ]
-
-    # encode plotly graphs in JSON
-    ids = ["graph-{}".format(i) for i, _ in enumerate(graphs)]
-    graphJSON = json.dumps(graphs, cls=plotly.utils.PlotlyJSONEncoder)
-
-    # render web page with plotly graphs
-    return render_template('master.html', ids=ids, graphJSON=graphJSON)
-
-
-# web page that handles user query and displays model results
-@app.route('/go')
-def go():
-    # save user input in query
-    query = request.args.get('query', '')
-
-    # use model to predict classification for query
-    classification_labels = model.predict([query])[0]
-    classification_results = dict(zip(df.columns[4:], classification_labels))
-
-    # This will render the go.html Please see that file.
-    return render_template(
-        'go.html',
-        query=query,
-        classification_result=classification_results
-    )
+    payload = {'p_control': request.args.get('p_control', 0.1, type = float),
+               'p_treatment': request.args.get('p_treatment', 0.12, type = float),
+               'power': request.args.get('power', 0.8, type = float),
+               'alpha': request.args.get('alpha', 0.05, type = float),
+               'draws': 100000}
+    experiment = experiment_from(payload)
+
+    graphs = [getattr(experiment, FIGURES[name])(spec = True) for name in ('p', 'power', 'power_curve', 'confidence')]
+
+    # encode figure specs in JSON for plotly.js
+    ids = ['graph-{}'.format(i) for i, _ in enumerate(graphs)]
+    graphJSON = '[' + ','.join(to_json(graph) for graph in graphs) + ']'
+
+    return render_template('master.html', ids = ids, graphJSON = graphJSON)
+
+@app.route('/api/evaluate', methods = ['POST'])
+def api_evaluate():
+    """
+    Evaluate one experiment. Body and response are those of modules/server.py.
+    """
+    payload = request.get_json(force = True, silent = True) or {}
+    if isinstance(payload, dict):
+        payload['action'] = 'evaluate'
+
+    return respond(handle(payload))
+
+@app.route('/api/plan', methods = ['POST'])
+def api_plan():
+    """
+    Plan one experiment. Body and response are those of modules/server.py.
+    """
+    payload = request.get_json(force = True, silent = True) or {}
+    if isinstance(payload, dict):
+        payload['action'] = 'plan'
+
+    return respond(handle(payload))
+
+@app.route('/api/batch', methods = ['POST'])
+def api_batch():
+    """
+    Answer {"requests": [...]} with {"responses": [...]}, in order. Each request carries
+    its own action. Failures are reported per request, so the batch itself returns 200.
+    """
+    payload = request.get_json(force = True, silent = True) or {}
+    requests = payload.get('requests') if isinstance(payload, dict) else None
+    if not isinstance(requests, list):
+        return jsonify({'error': 'Body must be {"requests": [...]}.'}), 400
+
+    return jsonify({'responses': [handle(r) for r in requests]})
+
+@app.route('/api/figure', methods = ['POST'])
+def api_figure():
+    """
+    Plotly figure spec for an experiment, ready for Plotly.newPlot(). Body is an experiment's
+    fields (as for /api/evaluate, or /api/plan without sample sizes) plus "figure": one of
+    p, power, confidence, power_curve or simulated_power.
+    """
+    payload = request.get_json(force = True, silent = True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Body must be a JSON object.'}), 400
+
+    name = payload.get('figure', 'p')
+    if name not in FIGURES:
+        return jsonify({'error': 'Unknown figure {}. Use one of {}.'.format(name, ', '.join(FIGURES))}), 400
+
+    try:
+        experiment = experiment_from(payload)
+        spec = getattr(experiment, FIGURES[name])(spec = True)
+    except KeyError as error:
+        return jsonify({'error': 'Missing field {}.'.format(error.args[0])}), 400
+    except (TypeError, ValueError, ZeroDivisionError) as error:
+        return jsonify({'error': str(error)}), 400
+
+    return app.response_class(to_json(spec), mimetype = 'application/json')
 
 
 def main():
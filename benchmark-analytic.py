@@ -0,0 +1,80 @@
+import argparse
+import math
+import timeit
+
+import scipy.stats as stats
+
+from modules import core
+from modules import fastpath
+
+# Microbenchmark of single-experiment analytic evaluation: significance, power and
+# sample size for one set of parameters, through scipy.stats (how the class used to
+# do it) and through the fast-path kernels in modules/fastpath.py.
+
+parser = argparse.ArgumentParser(description = 'Time single-experiment analytic evaluation, scipy.stats vs modules/fastpath.py.')
+parser.add_argument('--repeat',
+                    type = int,
+                    default = 5,
+                    help = 'Optional (default 5). Timing runs per implementation. The best run is reported.')
+
+P_CONTROL, P_TREATMENT, N_CONTROL, N_TREATMENT, POWER, ALPHA = 0.10, 0.12, 2000, 2000, 0.8, 0.05
+
+def scipy_stats():
+    """
+    Significance, power and sample size through scipy.stats.norm, as before the fast path.
+    """
+    var_control = P_CONTROL * (1 - P_CONTROL)
+    var_treatment = P_TREATMENT * (1 - P_TREATMENT)
+    difference = P_TREATMENT - P_CONTROL
+
+    p_sample = (P_CONTROL * N_CONTROL + P_TREATMENT * N_TREATMENT) / (N_CONTROL + N_TREATMENT)
+    var_sample = p_sample * (1 - p_sample)
+    z = difference / ((var_sample / N_CONTROL + var_sample / N_TREATMENT) ** 0.5)
+    p_value = 1 - stats.norm.cdf(z)
+
+    sterror_null = (2 * var_control / N_CONTROL) ** 0.5
+    sterror_alt = (var_treatment / N_TREATMENT + var_control / N_CONTROL) ** 0.5
+    norm_null = stats.norm(loc = 0, scale = sterror_null)
+    norm_alt = stats.norm(loc = difference, scale = sterror_alt)
+    power = 1 - norm_alt.cdf(norm_null.ppf(1 - ALPHA))
+
+    z_diff = stats.norm.ppf(1 - ALPHA) * (2 * var_control) ** 0.5 - stats.norm.ppf(1 - POWER) * (var_control + var_treatment) ** 0.5
+    n = (z_diff / difference) ** 2
+
+    return p_value, power, math.ceil(n)
+
+def fast():
+    """
+    The same three numbers through modules/fastpath.py.
+    """
+    return (fastpath.significance(P_CONTROL, P_TREATMENT, N_CONTROL, N_TREATMENT),
+            fastpath.power(P_CONTROL, P_TREATMENT, N_CONTROL, N_TREATMENT, alpha = ALPHA),
+            fastpath.sample_size(P_CONTROL, P_TREATMENT, power = POWER, alpha = ALPHA))
+
+PARAMS = core.ExperimentParams(P_CONTROL, P_TREATMENT, N_CONTROL, N_TREATMENT, power = POWER, alpha = ALPHA)
+
+def fast_core():
+    """
+    The same three numbers through the functional core, which uses the fast path.
+    """
+    return core.significance(PARAMS), core.power(PARAMS), core.sample_size(PARAMS)
+
+def main():
+    """
+    Time each implementation and print microseconds per evaluation.
+    """
+    args = parser.parse_args()
+
+    reference = scipy_stats()
+    for value, expected in zip(fast(), reference):
+        assert abs(value - expected) <= 1e-9 * max(1, abs(expected)), 'fast path disagrees with scipy.stats'
+
+    print('{:<28}{:>16}'.format('Implementation', 'us / evaluation'))
+    for name, function in [('scipy.stats', scipy_stats), ('modules.fastpath', fast), ('modules.core (fast path)', fast_core)]:
+        timer = timeit.Timer(function)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat = args.repeat, number = number))
+        print('{:<28}{:>16.2f}'.format(name, best / number * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+import scipy.stats as stats
+
+from modules import core
+
+# Monte Carlo error of the simulated p value under each sampling scheme in
+# core.simulate_distributions(), counted and conditional: the spread of the p value
+# across independent seeds, against the exact p value of the simulated test.
+# The vs. random column compares each row's spread with counted random draws, and fewer draws
+# is how many times fewer draws the row needs to match their precision (the square).
+
+parser = argparse.ArgumentParser(description = 'Compare the p value error of the simulation sampling schemes across seeds.')
+parser.add_argument('--draws',
+                    type = int,
+                    default = 100000,
+                    help = 'Optional (default 100,000). Simulation draws per run.')
+parser.add_argument('--seeds',
+                    type = int,
+                    default = 20,
+                    help = 'Optional (default 20). Independent runs per scheme.')
+
+PARAMS = core.ExperimentParams(p_control = 0.10, p_treatment = 0.12, n_control = 5000, n_treatment = 5000)
+
+def exact_p_value(params):
+    """
+    Exact one-tailed p value of the simulated test: the probability that the treatment rate
+    minus the control rate reaches the observed difference when both groups draw at the pooled
+    probability.
+    """
+    p_sample = core.pooled_probability(params)
+    control = np.arange(params.n_control + 1)
+    observed = params.p_treatment - params.p_control
+
+    # Smallest treatment count reaching the observed difference for each control count,
+    # with the same tolerance as the simulation's float comparison
+    needed = np.ceil((observed + control / params.n_control) * params.n_treatment - 1e-9)
+
+    return float(np.sum(stats.binom.pmf(control, params.n_control, p_sample)
+                        * stats.binom.sf(needed - 1, params.n_treatment, p_sample)))
+
+def main():
+    """
+    Run every scheme over the seeds and print the spread of its p values, counted
+    (core.simulated_significance()) and conditional (core.conditional_significance()).
+    """
+    args = parser.parse_args()
+    exact = exact_p_value(PARAMS)
+    print('Exact p value {:.3e}, {:,} draws, {} seeds\n'.format(exact, args.draws, args.seeds))
+
+    print('{:<12}{:<13}{:>12}{:>12}{:>14}{:>16}{:>12}'.format('Sampling', 'Estimate', 'Std. dev.', 'RMSE', 'vs. random', 'fewer draws', 's / run'))
+    baseline = None
+    for sampling in core.SAMPLING_SCHEMES:
+        counted, conditional = [], []
+        start = time.perf_counter()
+        for seed in range(args.seeds):
+            simulated = core.simulate_distributions(PARAMS, draws = args.draws, seed = seed, sampling = sampling)
+            counted.append(core.simulated_significance(PARAMS, simulated['null']))
+            conditional.append(core.conditional_significance(simulated['tail_sums'], simulated['tail_counts'])[0])
+        seconds = (time.perf_counter() - start) / args.seeds
+
+        for estimate, p_values in (('counted', counted), ('conditional', conditional)):
+            p_values = np.array(p_values)
+            spread = p_values.std(ddof = 1)
+            rmse = np.sqrt(np.mean((p_values - exact) ** 2))
+            baseline = spread if baseline == None else baseline
+            print('{:<12}{:<13}{:>12.2e}{:>12.2e}{:>13.1f}x{:>15.0f}x{:>12.3f}'.format(sampling, estimate, spread, rmse, baseline / spread,
+                                                                              (baseline / spread) ** 2, seconds))
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,10 @@
 import argparse
-from PIL import Image
+import json
 import sys
 import os
 import webbrowser as wb
 
-from modules.binomial import BinomialExperiment
-from modules.functions import create_dashboard
-from modules.functions import save_images
+from modules.server import serve, request
 
 # No matter how this script is run, make sure it treats its own directory as the working directory
 # This makes sure that relative file referencing always does what's expected
@@ -20,20 +18,33 @@ parser = argparse.ArgumentParser(description = 'Evaluate an experiment after it
 
 # Add command line arguments to interpret
 parser.add_argument('p_control',
+                    nargs = '?',
                     type = float,
                     help = 'The expected outcome rate of your control group (status quo outcome rate)')
 parser.add_argument('p_treatment',
+                    nargs = '?',
                     type = float,
                     help = 'The expected outcome rate of your treatment group (target outcome rate of the change you want to test)')
 parser.add_argument('n_control',
+                    nargs = '?',
                     type = int,
                     help = 'Count of observations in your control group.')
 parser.add_argument('n_treatment',
+                    nargs = '?',
                     type = int,
                     help = 'Count of observations in your treatment group.')
 parser.add_argument('--show',
                     type = str,
                     help = 'Optional (default no). When yes, output plots to default web browser.')
+parser.add_argument('--serve',
+                    type = str,
+                    help = 'Optional. Run as a server on this Unix socket path ("-" for stdin/stdout), answering newline-delimited JSON requests (see modules/server.py).')
+parser.add_argument('--workers',
+                    type = int,
+                    help = 'Optional (default: number of CPUs). Warm worker processes for --serve.')
+parser.add_argument('--connect',
+                    type = str,
+                    help = 'Optional. Send this experiment to the server on this Unix socket path and print its JSON response. With no experiment arguments, forwards JSON requests from stdin instead.')
 
 def validate_cmd(args):
     """
@@ -64,17 +75,46 @@ def validate_cmd(args):
 
     return p_control, p_treatment, n_control, n_treatment, show
 
+def forward(args):
+    """
+    Client mode: send this experiment (or, with no experiment arguments, the JSON requests
+    on stdin) to the server at args.connect and print the responses, one JSON line each.
+    """
+    if args.p_control == None:
+        requests = [line for line in sys.stdin if line.strip()]
+    else:
+        p_control, p_treatment, n_control, n_treatment, show = validate_cmd(args)
+        requests = [{'action': 'evaluate', 'p_control': p_control, 'p_treatment': p_treatment,
+                     'n_control': n_control, 'n_treatment': n_treatment}]
+
+    for response in request(args.connect, requests):
+        print(json.dumps(response))
+
 def main():
     """
     Function controlling the app's flow. Execute this when this file is run, directly.
     """
     args = parser.parse_args()
+
+    # Server and client modes are dispatched before the analysis imports below, which are
+    # most of this script's startup time.
+    if args.serve:
+        return serve(args.serve, workers = args.workers)
+    if args.connect:
+        return forward(args)
+
+    if None in (args.p_control, args.p_treatment, args.n_control, args.n_treatment):
+        parser.error('p_control, p_treatment, n_control and n_treatment are required.')
+
+    from modules.binomial import BinomialExperiment
+    from modules.functions import create_dashboard, save_images
+
     p_control, p_treatment, n_control, n_treatment, show = validate_cmd(args)
     experiment = BinomialExperiment(p_control = p_control,
                                     p_treatment = p_treatment,
                                     n_control = n_control,
                                     n_treatment = n_treatment)
-    figs = experiment.evaluate(plot = True)
+    result, figs = experiment.evaluate(plot = True, summary = True)
     if show:
         # Save image to a folder in root called "images" then open them in default image program
         save_location = 'images/eval'
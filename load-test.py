@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# No matter how this script is run, make sure it treats its own directory as the working directory
+os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
+
+ENDPOINTS = ('plan', 'evaluate', 'batch', 'figure')
+FIGURES = ('p', 'power', 'confidence', 'power_curve')
+
+# Parse command line arguments
+# Instantiate parser
+parser = argparse.ArgumentParser(description = 'Load test the web app in app/run.py with a mix of plan, evaluate, batch and figure requests. '
+                                               'Reports throughput and p50/p95/p99 latency per endpoint.')
+
+# Add command line arguments to interpret
+parser.add_argument('--url',
+                    type = str,
+                    help = 'Optional. Base URL of a running app (like http://127.0.0.1:3001). Without it, the app is driven in-process through Flask\'s test client.')
+parser.add_argument('--requests',
+                    type = int,
+                    default = 500,
+                    help = 'Optional (default 500). Total requests to send.')
+parser.add_argument('--concurrency',
+                    type = int,
+                    default = 4,
+                    help = 'Optional (default 4). Requests in flight at once.')
+parser.add_argument('--mix',
+                    type = str,
+                    default = 'plan=3,evaluate=3,batch=1,figure=1',
+                    help = 'Optional (default plan=3,evaluate=3,batch=1,figure=1). Relative weight of each endpoint.')
+parser.add_argument('--batch-size',
+                    type = int,
+                    default = 20,
+                    help = 'Optional (default 20). Experiments per batch request.')
+parser.add_argument('--draws',
+                    type = int,
+                    default = 100000,
+                    help = 'Optional (default 100,000). Simulation draws per request. 0 uses the analytic engine for plan, evaluate and batch.')
+parser.add_argument('--warmup',
+                    type = int,
+                    default = 20,
+                    help = 'Optional (default 20). Untimed requests sent first, so imports and caches are warm.')
+parser.add_argument('--seed',
+                    type = int,
+                    default = 0,
+                    help = 'Optional (default 0). Seed for the request mix and experiment parameters.')
+parser.add_argument('--output',
+                    type = str,
+                    help = 'Optional. Write the JSON summary to this file as well as printing it.')
+
+def parse_mix(mix):
+    """
+    'plan=3,evaluate=1' -> {'plan': 0.75, 'evaluate': 0.25}.
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError('Unknown endpoint {} in mix. Use any of {}.'.format(name, ', '.join(ENDPOINTS)))
+        weights[name] = float(weight) if weight else 1.0
+
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError('Mix weights must add up to more than 0.')
+
+    return {name: weight / total for name, weight in weights.items()}
+
+def experiment(rng, planned, draws):
+    """
+    Random but realistic experiment fields: a 1% to 20% base rate, a 5% to 30% relative lift,
+    and (for evaluations) 1,000 to 50,000 observations per group.
+    """
+    p_control = float(rng.uniform(0.01, 0.2))
+    fields = {'p_control': round(p_control, 4),
+              'p_treatment': round(p_control * float(rng.uniform(1.05, 1.3)), 4),
+              'seed': int(rng.integers(2 ** 31))}
+
+    if planned:
+        fields['power'] = 0.8
+    else:
+        fields['n_control'] = int(rng.integers(1000, 50000))
+        fields['n_treatment'] = int(rng.integers(1000, 50000))
+
+    if draws > 0:
+        fields['draws'] = draws
+    else:
+        fields['simulate'] = False
+
+    return fields
+
+def build_requests(count, weights, batch_size, draws, seed):
+    """
+    List of (endpoint, JSON body) pairs drawn from the mix.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(weights)
+    picks = rng.choice(len(names), size = count, p = [weights[name] for name in names])
+
+    requests = []
+    for pick in picks:
+        name = names[pick]
+        if name == 'batch':
+            body = {'requests': []}
+            for _ in range(batch_size):
+                planned = bool(rng.random() < 0.5)
+                fields = experiment(rng, planned, draws)
+                fields['action'] = 'plan' if planned else 'evaluate'
+                body['requests'].append(fields)
+        elif name == 'figure':
+            # Figures always simulate, so they get at least some draws
+            body = experiment(rng, False, max(draws, 10000))
+            body['figure'] = FIGURES[int(rng.integers(len(FIGURES)))]
+        else:
+            body = experiment(rng, name == 'plan', draws)
+        requests.append((name, body))
+
+    return requests
+
+def in_process_sender():
+    """
+    send(endpoint, body) -> status code, going through Flask's test client in this process.
+    """
+    from app.run import app
+
+    def send(name, body):
+        response = app.test_client().post('/api/' + name, json = body)
+        response.get_data()
+        return response.status_code
+
+    return send
+
+def http_sender(url):
+    """
+    send(endpoint, body) -> status code, going over HTTP to a running app.
+    """
+    def send(name, body):
+        data = json.dumps(body).encode('utf-8')
+        req = urllib.request.Request(url.rstrip('/') + '/api/' + name, data = data,
+                                     headers = {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    return send
+
+def timed(send, name, body):
+    """
+    (endpoint, seconds, ok) for one request. Connection failures count as errors.
+    """
+    start = time.perf_counter()
+    try:
+        ok = send(name, body) == 200
+    except OSError:
+        ok = False
+
+    return name, time.perf_counter() - start, ok
+
+def summarize(latencies, errors, elapsed):
+    """
+    Count, errors, throughput and latency percentiles (milliseconds) of one endpoint, or of all.
+    """
+    latencies = np.asarray(latencies) * 1000
+    if len(latencies) == 0:
+        return {'requests': 0, 'errors': errors}
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+
+    return {'requests': int(len(latencies)),
+            'errors': int(errors),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'mean_ms': round(float(latencies.mean()), 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'max_ms': round(float(latencies.max()), 3)}
+
+def run(send, requests, concurrency):
+    """
+    Send every request with up to concurrency in flight. Returns ([(endpoint, seconds, ok)], wall seconds).
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency) as pool:
+        results = list(pool.map(lambda r: timed(send, *r), requests))
+
+    return results, time.perf_counter() - start
+
+def main():
+    """
+    Function controlling the app's flow. Execute this when this file is run, directly.
+    """
+    args = parser.parse_args()
+
+    if args.requests < 1 or args.concurrency < 1:
+        raise ValueError('requests and concurrency must both be at least 1.')
+
+    weights = parse_mix(args.mix)
+    send = http_sender(args.url) if args.url else in_process_sender()
+
+    warmup = build_requests(args.warmup, weights, args.batch_size, args.draws, args.seed + 1)
+    run(send, warmup, args.concurrency)
+
+    requests = build_requests(args.requests, weights, args.batch_size, args.draws, args.seed)
+    results, elapsed = run(send, requests, args.concurrency)
+
+    endpoints = {}
+    for name in weights:
+        latencies = [seconds for endpoint, seconds, ok in results if endpoint == name]
+        errors = sum(1 for endpoint, seconds, ok in results if endpoint == name and not ok)
+        endpoints[name] = summarize(latencies, errors, elapsed)
+
+    summary = {'config': {'target': args.url if args.url else 'in-process',
+                          'requests': args.requests,
+                          'concurrency': args.concurrency,
+                          'mix': weights,
+                          'batch_size': args.batch_size,
+                          'draws': args.draws,
+                          'seed': args.seed},
+               'environment': {'python': platform.python_version(),
+                               'machine': platform.machine(),
+                               'cpus': os.cpu_count()},
+               'elapsed_s': round(elapsed, 3),
+               'overall': summarize([r[1] for r in results], sum(1 for r in results if not r[2]), elapsed),
+               'endpoints': endpoints}
+
+    output = json.dumps(summary, indent = 2)
+    print(output)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
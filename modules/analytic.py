@@ -0,0 +1,81 @@
+"""
+Array versions of BinomialExperiment's analytic (normal approximation) calculations.
+Every argument broadcasts, so one call scores as many experiments, segments or
+arms as fit in the arrays. Cells with no data come back as NaN rather than raising.
+
+Normal CDFs and quantiles go straight to scipy.special.ndtr/ndtri, skipping
+scipy.stats' per-call dispatch. Scalar versions live in modules/fastpath.py.
+"""
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+def significance(p_control, p_treatment, n_control, n_treatment):
+    """
+    One-tailed p values of treatment - control > 0 using the pooled probability,
+    as in BinomialExperiment.analyze_significance().
+    """
+    p_control, p_treatment, n_control, n_treatment = np.broadcast_arrays(
+        *[np.asarray(a, dtype = np.float64) for a in (p_control, p_treatment, n_control, n_treatment)])
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        p_sample = (p_control * n_control + p_treatment * n_treatment) / (n_control + n_treatment)
+        var_sample = p_sample * (1 - p_sample)
+        sigma = np.sqrt((var_sample / n_control) + (var_sample / n_treatment))
+        z = (p_treatment - p_control) / sigma
+
+    return ndtr(-z)
+
+def power(p_control, p_treatment, n_control, n_treatment, alpha = 0.05):
+    """
+    Statistical power of the one-tailed test, as in BinomialExperiment.simulate_power().
+    """
+    p_control, p_treatment, n_control, n_treatment, alpha = np.broadcast_arrays(
+        *[np.asarray(a, dtype = np.float64) for a in (p_control, p_treatment, n_control, n_treatment, alpha)])
+
+    var_control = p_control * (1 - p_control)
+    var_treatment = p_treatment * (1 - p_treatment)
+    difference = p_treatment - p_control
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        sterror_null = np.sqrt((var_control / n_control) + (var_control / n_control))
+        sterror_alt = np.sqrt((var_treatment / n_treatment) + (var_control / n_control))
+
+        thresh = np.where(difference < 0, 1 - alpha, alpha)
+        p_crit = ndtri(1 - thresh) * sterror_null
+        beta = ndtr((p_crit - difference) / sterror_alt)
+
+    return np.where(difference >= 0, 1 - beta, beta)
+
+def sample_size(p_control, p_treatment, power = 0.8, alpha = 0.05):
+    """
+    Minimum sample size per group, as in BinomialExperiment.estimate_sample().
+    """
+    p_control, p_treatment, power, alpha = np.broadcast_arrays(
+        *[np.asarray(a, dtype = np.float64) for a in (p_control, p_treatment, power, alpha)])
+
+    var_control = p_control * (1 - p_control)
+    var_treatment = p_treatment * (1 - p_treatment)
+
+    z_null = ndtri(1 - alpha)
+    z_alt = ndtri(1 - power)
+
+    z_diff = (z_null * np.sqrt(var_control + var_control)) - (z_alt * np.sqrt(var_control + var_treatment))
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        n = (z_diff / (p_treatment - p_control)) ** 2
+
+    return np.ceil(n)
+
+def intervals(p, n, level = 95):
+    """
+    Normal approximation level% confidence interval of each probability. Returns (lower, upper).
+    """
+    p = np.asarray(p, dtype = np.float64)
+    n = np.asarray(n, dtype = np.float64)
+
+    z = ndtri(1 - (100 - level) / 200)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        margin = z * np.sqrt(p * (1 - p) / n)
+
+    return p - margin, p + margin
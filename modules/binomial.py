@@ -3,14 +3,22 @@ import scipy.stats as stats
 import pandas as pd
 
 import os
+import time
 
-import plotly.graph_objects as go
+from modules import core
+from modules.cuped import cuped_moments
+from modules.segments import aggregate_segments, segment_results
+from modules.timeseries import aggregate_timeseries, cumulative_results
+from modules.bayesian import bayesian_summary
+from modules.figures import vline, render
+from modules.store import save_state, load_state
+from modules.config import resolve as resolve_config
 
 class BinomialExperiment():
     """
     Creates an object that represents observed or desired split test results.
-    Currently only supports two-way split tests. n-way tests will be supported
-    in a future release.
+    Supports two-way split tests. For n-way tests, see MultiArmExperiment
+    in modules/multiarm.py.
 
     Analyses can then be performed on this object by calling this class's methods.
     Return statistical power, estimate a necessary sample size, return statistical
@@ -25,13 +33,25 @@ class BinomialExperiment():
     Also, this class is designed to be used as the backend of a web application
     that helps marketers plan and understand optimization experiments.
     """
-    def __init__(self, p_control = 0, p_treatment = 0, n_control = 0, n_treatment = 0, power = None, alpha = 0.05):
+    def __init__(self, p_control = 0, p_treatment = 0, n_control = 0, n_treatment = 0, power = None, alpha = 0.05,
+                 draws = None, sampling = 'random', seed = None, config = None):
         """
         Only two required args are p_control and p_treatment. It is assumed that the user is either evaluating a completed
         experiment or has already determined the practical difference necessary to make an experiment's results worthwhile.
 
         So, those two values are already on-hand.
+
+        draws, sampling and seed control the binomial simulations (see binom_distribution()).
+        At 100,000 draws, sampling = 'sobol' cuts the p value's standard error to about an
+        eighth of 'random' (see benchmark-sampling.py).
+
+        config is a config.SimulationConfig for this instance alone. By default, the process-wide
+        one applies (see modules/config.py). It caps draws (None means as many as it allows),
+        sets the stored dtype and chunk size, limits simulation memory and plotted points.
         """
+        if sampling not in core.SAMPLING_SCHEMES:
+            raise ValueError('Unknown sampling scheme {}. Use one of {}.'.format(sampling, ', '.join(core.SAMPLING_SCHEMES)))
+
         self.p_control = p_control
         self.p_treatment = p_treatment
 
@@ -50,6 +70,19 @@ class BinomialExperiment():
         self.binom_control = None
         self.binom_treatment = None
 
+        self.binom_batches = None
+        self.binom_tail_sums = None
+        self.binom_tail_counts = None
+        self.tail_draws = None
+
+        self.draws = draws
+        self.config = config
+        self.sampling = sampling
+        self.seed = seed
+        self.batches = 10
+
+        self.power_curve = None
+
         self.confidence_control = None
         self.confidence_treatment = None
 
@@ -73,6 +106,34 @@ class BinomialExperiment():
 
         self.alpha = alpha
         self.p_value = None
+        self.p_value_error = None
+
+        self.prob_beat = None
+        self.loss_treatment = None
+        self.loss_control = None
+
+        # CUPED regression coefficient. Stays None unless ingest_data() is given a covariate.
+        self.theta = None
+        self.variance_reduction = None
+
+    def params(self):
+        """
+        Snapshot of this experiment's current parameters as a frozen core.ExperimentParams.
+
+        The calculations in this class are thin wrappers over the pure functions in modules/core.py.
+        Those functions can be called with this snapshot from any number of threads at once,
+        without touching (or being affected by) this instance.
+        """
+        cuped = self.theta != None
+
+        return core.ExperimentParams(p_control = self.p_control,
+                                     p_treatment = self.p_treatment,
+                                     n_control = self.n_control,
+                                     n_treatment = self.n_treatment,
+                                     power = self.power,
+                                     alpha = self.alpha,
+                                     var_control = self.var_control if cuped else None,
+                                     var_treatment = self.var_treatment if cuped else None)
 
     def get_p_sample(self):
         """
@@ -81,15 +142,9 @@ class BinomialExperiment():
         Useful to draw up distributions that assume the difference between sample probs is 0.
         Rather than assume control prob is true prob, assume the combined prob is the true prob.
         """
-        control = self.p_control * self.n_control
-        treatment = self.p_treatment * self.n_treatment
-        sample = self.n_control + self.n_treatment
-
-        p_sample = (control + treatment) / sample
-
-        self.p_sample = p_sample
+        self.p_sample = core.pooled_probability(self.params())
 
-        return p_sample
+        return self.p_sample
 
     def estimate_sample(self, power = None, alpha = None):
         """
@@ -106,30 +161,15 @@ class BinomialExperiment():
         """
         if power == None:
             power = self.power
-        elif power > 0 and power < 1:
-            power = power
-        else:
+        elif not (power > 0 and power < 1):
             raise ValueError('Power provided is impossible (1, 0 or negative). Please provide a positive power between 0 and 1.')
 
         if alpha == None:
             alpha = self.alpha
-        elif alpha > 0 and alpha < 1:
-            alpha = alpha
-        else:
+        elif not (alpha > 0 and alpha < 1):
             raise ValueError('Alpha provided is impossible (1, 0 or negative). Please provide a positive power between 0 and 1.')
 
-        z_null = stats.norm.ppf(1 - self.alpha)
-        z_alt = stats.norm.ppf(1 - power)
-
-        stdev_null = np.sqrt(self.var_control + self.var_control)
-        stdev_alt = np.sqrt(self.var_control + self.var_treatment)
-
-        z_diff = (z_null * stdev_null) - (z_alt * stdev_alt)
-        p_diff = self.p_treatment - self.p_control
-
-        n = (z_diff / p_diff) ** 2
-
-        sample_size = int(np.ceil(n))
+        sample_size = core.sample_size(self.params(), power = power, alpha = alpha)
 
         # Don't update self.power if this was just a what-if simulation.
         # Only update self.power if this is run to update experiment parameters.
@@ -139,33 +179,55 @@ class BinomialExperiment():
 
         return sample_size
 
+    def simulation_config(self):
+        """
+        The SimulationConfig in effect: this instance's, or else the process-wide one.
+        """
+        return resolve_config(self.config)
+
     def binom_distribution(self):
         """
         Simulates two binomial distributions, one for control group and other
         for treatment group. Stored as attributes of the object created by this class.
 
-        Allows a user to specify the probability of each distribution. Assuming separate
-        distributions by default to keep things intuitive.
-
-        But, when testing experiment results against a typical marketing hypothesis
-        (null: treatment - control <= 0), both p_control and p_treatment should be
-        set to the overall probability of the combined sample (call get_p_sample()
-        method of this class, first). That way, a single null distribution can be
-        generated to represent the difference between control and treatment being 0.
+        The null distribution draws both groups at the overall probability of the
+        combined sample (see get_p_sample()). That way, a single null distribution
+        represents the difference between control and treatment being 0. The alt
+        distribution draws each group at its own probability.
 
         (See .simulate_significance() for an example application like the above).
+
+        Draws self.draws samples with self.sampling: 'random' (independent draws), 'crn'
+        (null and alt share random numbers), 'antithetic' or 'sobol' (quasi-random). See
+        core.simulate_distributions().
+
+        The number of draws, their dtype, the chunk size and the memory they may take come from
+        simulation_config(). Requests beyond its limits are cut down to fit.
+
+        Not available after a CUPED-adjusted ingest_data(): adjusted rates aren't binomial
+        counts, so simulating them would drop the variance reduction (and may not be
+        probabilities at all). Use analyze_significance() there, as evaluate() does.
         """
-        null_control = stats.binom.rvs(p = self.p_sample, n = self.n_control, size = 1000000) / self.n_control
-        null_treatment = stats.binom.rvs(p = self.p_sample, n = self.n_treatment, size = 1000000) / self.n_treatment
+        if self.theta != None:
+            raise ValueError('CUPED-adjusted rates can\'t be simulated as binomial counts. Use analyze_significance() or evaluate().')
+
+        config = self.simulation_config()
+        requested = config.max_draws if self.draws == None else self.draws
+        draws = config.limit_draws(requested, bytes_per_draw = core.simulation_bytes(config.dtype, self.sampling))
+
+        simulated = core.simulate_distributions(self.params(), draws = draws, seed = self.seed,
+                                                sampling = self.sampling, batches = self.batches,
+                                                dtype = config.dtype, chunk_size = config.chunk_size)
 
-        alt_control = stats.binom.rvs(p = self.p_control, n = self.n_control, size = 1000000) / self.n_control
-        alt_treatment = stats.binom.rvs(p = self.p_treatment, n = self.n_treatment, size = 1000000) / self.n_treatment
+        self.binom_null = simulated['null']
+        self.binom_alt = simulated['alt']
 
-        self.binom_null = null_treatment - null_control
-        self.binom_alt = alt_treatment - alt_control
+        self.binom_control = simulated['control']
+        self.binom_treatment = simulated['treatment']
 
-        self.binom_control = alt_control
-        self.binom_treatment = alt_treatment
+        self.binom_batches = simulated['batches']
+        self.binom_tail_sums = simulated['tail_sums']
+        self.binom_tail_counts = simulated['tail_counts']
 
     def norm_distribution(self):
         """
@@ -180,20 +242,13 @@ class BinomialExperiment():
 
         This function is useful when simulating statistical power post-hoc.
         """
-        # Null hypothesis is no difference between treatment and control distributions
-        # So, null distribution is control subtracted from itself (treatment = control)
-        sterror_null = np.sqrt((self.var_control / self.n_control) + (self.var_control / self.n_control))
-        # Alt hypothesis is treatment - control > 0
-        # So, alt distribution is treatment - control, variance of which is var(treatment) + var(control).
-        sterror_alt =  np.sqrt((self.var_treatment / self.n_treatment) + (self.var_control / self.n_control))
+        sterror_null, sterror_alt = core.standard_errors(self.params())
 
         self.sterror_null = sterror_null
         self.sterror_alt = sterror_alt
 
-        dist_null = stats.norm(loc = 0, scale = sterror_null)
-        dist_alt = stats.norm(loc = self.p_treatment - self.p_control, scale = sterror_alt)
-        self.norm_null = dist_null
-        self.norm_alt = dist_alt
+        self.norm_null = stats.norm(loc = 0, scale = sterror_null)
+        self.norm_alt = stats.norm(loc = self.p_treatment - self.p_control, scale = sterror_alt)
 
     def confidence_intervals(self, level = 95):
         """
@@ -203,8 +258,17 @@ class BinomialExperiment():
 
         Useful insight in addition to p value and power to understand how confident
         we can be in an experiment's conclusion (contrast interval overlap).
+
+        CUPED-adjusted rates (see ingest_data()) get normal-approximation intervals from
+        their adjusted variances instead of simulated ones.
         """
-        margin = (100 - level) / 2 # interval is middle level% of vals, so this is margin to either side of it
+        if self.theta != None:
+            interval_control, interval_treatment = core.normal_intervals(self.params(), level = level)
+            self.interval_control = {'lower': interval_control[0], 'upper': interval_control[1], 'level': level}
+            self.interval_treatment = {'lower': interval_treatment[0], 'upper': interval_treatment[1], 'level': level}
+
+            return self.interval_control, self.interval_treatment
+
         try:
             len(self.binom_control)
             len(self.binom_treatment)
@@ -212,20 +276,15 @@ class BinomialExperiment():
         except:
             self.binom_distribution()
 
-        control = self.binom_control
-        treatment = self.binom_treatment
-
-        control_upper = np.percentile(a = control, q = level + margin)
-        control_lower = np.percentile(a = control, q = margin)
+        control_lower, control_upper = core.percentile_interval(self.binom_control, level = level)
         self.interval_control = {'lower': control_lower, 'upper':control_upper, 'level':level}
 
-        treatment_upper = np.percentile(a = treatment, q = level + margin)
-        treatment_lower = np.percentile(a = treatment, q = margin)
+        treatment_lower, treatment_upper = core.percentile_interval(self.binom_treatment, level = level)
         self.interval_treatment = {'lower': treatment_lower, 'upper':treatment_upper, 'level':level}
 
         return self.interval_control, self.interval_treatment
 
-    def plot_confidence(self, level = None, show = False):
+    def plot_confidence(self, level = None, show = False, spec = False):
         """
         Looks for confidence intervals in self.interval_control and self.interval_treatment.
         Plots them together for easy contrast.
@@ -234,6 +293,8 @@ class BinomialExperiment():
         If level is provided, method will calculate new confidence intervals with the provided level.
         If not and confidence intervals have already been calculated, level used during previous calc will be used.
         If not and this is the first time confidence intervals are being calculated, 95% will be assumed.
+
+        If spec == True, returns a plain-dict figure spec instead of a go.Figure (see modules/figures.py).
         """
         try: # Check to see if intervals have been calculated, already
             if level and level != self.interval_control['level']:
@@ -255,7 +316,8 @@ class BinomialExperiment():
         high_lim = high_end + (0.1 * r)
 
         data = [
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 mode = 'lines+markers',
                 line = dict(color = 'blue', width = 4),
                 marker = dict(color = 'black', size = 10, symbol = 'line-ns-open'),
@@ -263,7 +325,8 @@ class BinomialExperiment():
                 y = [0.75 for i in range(len(int_control))],
                 name = 'Control'
             ),
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 mode = 'lines+markers',
                 line = dict(color = 'orange', width = 4),
                 marker = dict(color = 'black', size = 10, symbol = 'line-ns-open'),
@@ -274,11 +337,11 @@ class BinomialExperiment():
         ]
 
         layout = dict(
-            title = '{}% Confidence Intervals, Treatment vs Control'.format(level),
+            title = dict(text = '{}% Confidence Intervals, Treatment vs Control'.format(level)),
             plot_bgcolor = 'white',
             height = 350,
             width = 800,
-            xaxis = dict(title = 'Probabilities',
+            xaxis = dict(title = dict(text = 'Probabilities'),
                             range = (low_lim, high_lim),
                             showgrid = False,
                             zeroline = False,
@@ -293,12 +356,7 @@ class BinomialExperiment():
                             visible = False)
         )
 
-        fig = go.Figure(data = data, layout = layout)
-
-        if show:
-            fig.show()
-
-        return fig
+        return render(dict(data = data, layout = layout), show = show, as_spec = spec)
 
     def analyze_significance(self):
         """
@@ -307,90 +365,160 @@ class BinomialExperiment():
 
         Null: Treatment Prob - Control Prob <= 0
         Alt: Treatment Prob - Control Prob > 0
-        """
-        var_control = 1 * self.p_sample * (1 - self.p_sample)
-        var_treatment = 1 * self.p_sample * (1 - self.p_sample) # Same as var_control, because null hyp is no difference
-
-        sigma = np.sqrt((var_control / self.n_control) + (var_treatment / self.n_treatment))
 
-        z = (self.p_treatment - self.p_control) / sigma
-        p = (1 - stats.norm.cdf(z))
-        self.p_value = p
+        CUPED-adjusted rates (see ingest_data()) carry their own variances, which are used
+        in place of the pooled binomial variance.
+        """
+        self.p_value = core.significance(self.params())
 
-        return p
+        return self.p_value
 
     def simulate_significance(self):
         """
         Same intent and outcome as analyze_significance(), but it simulates a binomial distribution rather than
         approximating one with a normal distribution. No continuity correction, necessary. Only significant source of
         inaccuracy would be variability between runs (random simulations can yield slightly different outcomes, each time).
-        """
-        observed_difference = self.p_treatment - self.p_control
 
+        That variability is measured, not just acknowledged: self.p_value_error is the standard error of
+        the p value across independent batches of draws.
+
+        The treatment draw is integrated out exactly for every simulated control count (see
+        core.conditional_significance()), which leaves far less variability than counting
+        null draws past the observed difference. A null distribution saved without its
+        tail sums (by an older save()) falls back to counting (see core.batch_error()).
+        """
         try: # check to see if there's an array in self.binom_null
             len(self.binom_null)
-            differences = self.binom_null
         except:
             self.binom_distribution()
-            differences = self.binom_null
 
-        p = (differences >= observed_difference).mean()
-        self.p_value = p
+        if self.binom_tail_sums is not None:
+            self.p_value, self.p_value_error = core.conditional_significance(self.binom_tail_sums, self.binom_tail_counts)
+        else:
+            self.p_value = core.simulated_significance(self.params(), self.binom_null)
 
-        return p
+            difference = self.p_treatment - self.p_control
+            batches = self.binom_batches or self.batches
+            self.p_value_error = core.batch_error(self.binom_null, lambda batch: (batch >= difference).mean(axis = 1),
+                                                  batches = batches)
+
+        return self.p_value
+
+    def simulate_tail_significance(self, draws = 5000, seed = None):
+        """
+        Same intent as simulate_significance(), for strongly significant results whose p values
+        are too small for the simulation to resolve (below about 1 / draws).
+
+        Draws come from the null tilted toward the observed difference, and are reweighted by their
+        likelihood ratios, so a few thousand draws estimate even astronomically small p values
+        with bounded relative error. See core.tail_significance().
+
+        Populates self.p_value and self.p_value_error (standard error of the estimate, None if
+        the p value is only an upper bound, see core.tail_significance()), and self.tail_draws
+        (the draws used, after the config's limits).
+        seed defaults to the instance's seed.
+        """
+        seed = self.seed if seed == None else seed
+        draws = self.simulation_config().limit_draws(draws, bytes_per_draw = core.TAIL_BYTES)
+        self.tail_draws = draws
+        self.p_value, relative_error = core.tail_significance(self.params(), draws = draws, seed = seed)
+        self.p_value_error = core.tail_error(self.p_value, relative_error)
+
+        return self.p_value
+
+    def analyze_bayesian(self, prior_alpha = 1, prior_beta = 1, exact_limit = 1000):
+        """
+        Bayesian readout to go alongside the p value: the probability that treatment's true
+        rate beats control's, plus the expected loss of each decision.
+
+        Each group's rate gets a Beta(prior_alpha + successes, prior_beta + failures) posterior.
+        P(p_treatment > p_control) is the exact closed-form sum (O(successes)), switching to a
+        normal approximation of the posteriors when successes exceed exact_limit.
+
+        Populates self.prob_beat, self.loss_treatment (expected shortfall in rate if treatment
+        is shipped but control is better) and self.loss_control (the reverse). Returns prob_beat.
+
+        To score many experiments at once, call modules.bayesian.bayesian_summary() with arrays.
+        """
+        s_control = np.round(self.p_control * self.n_control)
+        s_treatment = np.round(self.p_treatment * self.n_treatment)
+
+        results = bayesian_summary(s_control, self.n_control, s_treatment, self.n_treatment,
+                                   prior_alpha = prior_alpha, prior_beta = prior_beta, exact_limit = exact_limit)
+
+        self.prob_beat = float(results['prob_beat'])
+        self.loss_treatment = float(results['loss_treatment'])
+        self.loss_control = float(results['loss_control'])
+
+        return self.prob_beat
 
     def simulate_power(self):
         """
         Takes results of a completed experiment and reveals the statistical power of the significance conclusion.
+
+        Analytic, so no distributions are built. plot_power() builds the ones it draws.
         """
-        if self.p_treatment - self.p_control < 0:
-            thresh = 1 - self.alpha
-        else:
-            thresh = self.alpha
+        self.power = core.power(self.params())
 
-        try:
-            p_crit = self.norm_null.ppf(1 - thresh)
-            beta = self.norm_alt.cdf(p_crit)
-        except:
-            self.norm_distribution()
-            p_crit = self.norm_null.ppf(1 - thresh)
-            beta = self.norm_alt.cdf(p_crit)
+        return self.power
+
+    def simulate_power_curve(self, n_grid = None, draws = 20000):
+        """
+        Simulated power of the binomial test at a range of sample sizes per group, for this
+        experiment's effect size and alpha. Unlike simulate_power() (a normal approximation at
+        the current sample size), this runs the actual simulated test at every size.
+
+        All sizes share one set of random draws (common random numbers, see core.power_curve()),
+        so the curve is smooth from a few thousand draws rather than a fresh, noisy simulation
+        per size. It isn't forced to be monotone: dips are Monte Carlo noise (within the reported
+        error) or steps of the discrete binomial test.
+
+        n_grid defaults to 40 sizes between a tenth of and twice the sample size recommended
+        for self.power (0.8 if not set). Populates self.power_curve, a dict of n, power and
+        error (standard error of each power estimate).
+        """
+        if n_grid is None:
+            recommended = core.sample_size(self.params(), power = self.power if self.power else 0.8)
+            n_grid = np.unique(np.linspace(max(10, recommended / 10), recommended * 2, 40).astype(int))
 
-        power = (1 - beta) if self.p_treatment > self.p_control else beta
-        self.power = power
+        draws = self.simulation_config().limit_draws(draws, bytes_per_draw = core.power_curve_bytes(len(n_grid)))
+        self.power_curve = core.power_curve(self.params(), n_grid, draws = draws, seed = self.seed,
+                                            sampling = self.sampling, batches = self.batches)
 
-        return power
+        return self.power_curve
 
-    def plot_p(self, show = False):
+    def plot_p(self, show = False, spec = False):
         """
         Plot the null distribution, treatment probability and then shade the p value in order to visualize the results
         of a significance test.
+
+        If spec == True, returns a plain-dict figure spec instead of a go.Figure (see modules/figures.py).
         """
-        try:
-            difference = self.binom_null
-        except:
+        if self.binom_null is None or self.p_value is None:
             self.simulate_significance()
-            difference = self.binom_null
+        difference = self.binom_null
 
         observed_difference = self.p_treatment - self.p_control
 
         mu, sigma = stats.norm.fit(difference)
-        crit_density = stats.norm.pdf(observed_difference, mu, sigma)
 
-        x = np.linspace(min(difference), max(difference), self.n_control + self.n_treatment)
+        points = self.simulation_config().limit_points(self.n_control + self.n_treatment)
+        x = np.linspace(np.min(difference), np.max(difference), points)
         y = stats.norm.pdf(x, mu, sigma)
 
         line_curve = dict(color = 'blue', width = 2)
 
         data = [
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 x = x,
                 y = y,
                 mode = 'lines',
                 showlegend = False,
                 line = line_curve
             ),
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 x = x[x > observed_difference],
                 y = y[np.where(x > observed_difference)],
                 fill = 'tozeroy',
@@ -399,44 +527,41 @@ class BinomialExperiment():
             )
         ]
 
+        shape, annotation = vline(x = observed_difference,
+                                  line_width = 2,
+                                  line_dash = 'dash',
+                                  line_color = 'black',
+                                  annotation_text = 'P Value {:.4f}'.format(self.p_value),
+                                  annotation_position = 'top right')
+
         layout = dict(
             plot_bgcolor = 'white',
             width = 800,
             height = 600,
-            title = 'Significance',
+            title = dict(text = 'Significance'),
             xaxis = dict(
-                title = 'Difference in Probabilities',
+                title = dict(text = 'Difference in Probabilities'),
                 showgrid = False,
                 zeroline = False,
                 showline = True,
                 linecolor = 'black'
             ),
             yaxis = dict(
-                title = 'Density',
+                title = dict(text = 'Density'),
                 showgrid = False,
                 zeroline = False,
                 showline = True,
                 linecolor = 'black'
-            )
+            ),
+            shapes = [shape],
+            annotations = [annotation]
         )
 
-        fig = go.Figure(data = data, layout = layout)
-
-        fig.add_vline(x = observed_difference,
-                        line_width = 2,
-                        line_dash = 'dash',
-                        line_color = 'black',
-                        annotation_text = 'P Value {:.4f}'.format(self.p_value),
-                        annotation_position = 'top right')
-
-        if show:
-            # Intended to be used in notebooks.
-            # .py app files that use this module will handle saving and opening from desktop
-            fig.show();
+        # show is intended to be used in notebooks.
+        # .py app files that use this module will handle saving and opening from desktop
+        return render(dict(data = data, layout = layout), show = show, as_spec = spec)
 
-        return fig
-
-    def plot_power(self, show = False):
+    def plot_power(self, show = False, spec = False):
         """
         Produce a plot demonstrating the statistical power of the binomial split
         test's results.
@@ -446,29 +571,30 @@ class BinomialExperiment():
 
         Null p and alt beta are shaded to convey power in shorthand.
 
-        Needs a value in self.power and self.norm_null to work. Call .simulate_power() before this
-        to populate power, sim_null and sim_alt attributes.
+        Uses self.power, calling .simulate_power() first if there isn't one yet.
+
+        If spec == True, returns a plain-dict figure spec instead of a go.Figure (see modules/figures.py).
         """
         if self.p_treatment - self.p_control < 0:
             thresh = 1 - self.alpha
         else:
             thresh = self.alpha
 
-        try:
-            p_crit = self.norm_null.ppf(1 - thresh)
-            beta = self.norm_alt.cdf(p_crit)
-        except:
+        if self.power == None:
             self.simulate_power()
-            p_crit = self.norm_null.ppf(1 - thresh)
-            beta = self.norm_alt.cdf(p_crit)
 
-        sample_null = self.norm_null.rvs(size = self.n_control)
-        sample_alt = self.norm_alt.rvs(size = self.n_treatment)
+        self.norm_distribution()
+        p_crit = self.norm_null.ppf(1 - thresh)
+
+        # Samples only set the plotted range, so a capped number of them does
+        config = self.simulation_config()
+        sample_null = self.norm_null.rvs(size = config.limit_points(self.n_control))
+        sample_alt = self.norm_alt.rvs(size = config.limit_points(self.n_treatment))
 
-        lowest_x = min(min(sample_null), min(sample_alt))
-        highest_x = max(max(sample_null), max(sample_alt))
+        lowest_x = min(sample_null.min(), sample_alt.min())
+        highest_x = max(sample_null.max(), sample_alt.max())
 
-        x = np.linspace(lowest_x, highest_x, self.n_control + self.n_treatment)
+        x = np.linspace(lowest_x, highest_x, config.limit_points(self.n_control + self.n_treatment))
 
         y_null = self.norm_null.pdf(x)
         y_alt = self.norm_alt.pdf(x)
@@ -479,14 +605,16 @@ class BinomialExperiment():
 
         # Plot the null and alt distributions
         data = [
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 x = x,
                 y = y_null,
                 mode = 'lines',
                 name = 'Null',
                 line = line_null
             ),
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 x = x,
                 y = y_alt,
                 mode = 'lines',
@@ -494,7 +622,8 @@ class BinomialExperiment():
                 line = line_alt
             ),
             # Shade P under null distribution
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 x = x[x > p_crit],
                 y = y_null[np.where(x > p_crit)],
                 fill = 'tozeroy',
@@ -502,7 +631,8 @@ class BinomialExperiment():
                 line = line_null
             ),
             # Shade beta under alt distribution
-            go.Scatter(
+            dict(
+                type = 'scatter',
                 x = x[x < p_crit],
                 y = y_alt[np.where(x < p_crit)],
                 fill = 'tozeroy',
@@ -511,18 +641,26 @@ class BinomialExperiment():
             )
         ]
 
+        # Mark p_crit with a dashed vertical line
+        shape, annotation = vline(x = p_crit,
+                                  line_width = 2,
+                                  line_dash = 'dash',
+                                  line_color = 'black',
+                                  annotation_text = 'P Crit (Power {:.2f})'.format(self.power),
+                                  annotation_position = 'top right')
+
         # Apply axis configurations to the plot
         layout = dict(
             yaxis = dict(
                 showgrid = False,
-                title = 'Probability Density',
+                title = dict(text = 'Probability Density'),
                 showline = True,
                 linecolor = 'black',
                 zeroline = False
             ),
             xaxis = dict(
                 showgrid = False,
-                title = 'Sample Mean Differences (Probabilities)',
+                title = dict(text = 'Sample Mean Differences (Probabilities)'),
                 showline = True,
                 linecolor = 'black',
                 zeroline = False
@@ -530,25 +668,14 @@ class BinomialExperiment():
             plot_bgcolor = 'white',
             width = 800,
             height = 600,
-            title = 'Power'
+            title = dict(text = 'Power'),
+            shapes = [shape],
+            annotations = [annotation]
         )
 
-        fig = go.Figure(data = data, layout = layout)
-
-        # Mark p_crit with a dashed vertical line
-        fig.add_vline(x = p_crit,
-                    line_width = 2,
-                    line_dash = 'dash',
-                    line_color = 'black',
-                    annotation_text = 'P Crit (Power {:.2f})'.format(self.power),
-                    annotation_position = 'top right')
+        return render(dict(data = data, layout = layout), show = show, as_spec = spec)
 
-        if show:
-            fig.show()
-
-        return fig
-
-    def plot_power_curve(self, show = False):
+    def plot_power_curve(self, show = False, spec = False):
         """
         Creates a line plot that shows how power changes as sample size changes.
         Intended to be used during experiment planning in order to find out
@@ -561,64 +688,138 @@ class BinomialExperiment():
         Requires effect size (p_treatment and p_control) and alpha to work. Then,
         it loops through many different power values and plots resulting sample
         size for each.
+
+        If spec == True, returns a plain-dict figure spec instead of a go.Figure (see modules/figures.py).
         """
         power_levels = np.linspace(0.01,0.99,176)
-        sample_sizes = []
-
-        for p in power_levels:
-            size = self.estimate_sample(power = p)
-            sample_sizes.append(size)
+        # Computed straight from the core, so this leaves self.n_control and self.n_treatment alone
+        sample_sizes = core.sample_size(self.params(), power = power_levels)
 
         x = power_levels
         y = sample_sizes
 
         line_curve = dict(color = 'blue', width = 2)
 
-        x_axis = dict(title = 'Statistical Power', showline = True, linecolor = 'black', zeroline = False, showgrid = False)
-        y_axis = dict(title = 'Recommended Size per Sample at Alpha 0.05', showline = True, linecolor = 'black', zeroline = False, showgrid = False, tickformat = ',d')
+        x_axis = dict(title = dict(text = 'Statistical Power'), showline = True, linecolor = 'black', zeroline = False, showgrid = False)
+        y_axis = dict(title = dict(text = 'Recommended Size per Sample at Alpha 0.05'), showline = True, linecolor = 'black', zeroline = False, showgrid = False, tickformat = ',d')
+
+        data = [dict(type = 'scatter', x = x, y = y, mode = 'lines', showlegend = False, line = line_curve)]
+        shape, annotation = vline(x = self.power, line_dash = 'dash', line_color = 'black', line_width = 2)
+
+        layout = dict(xaxis = x_axis,
+                      yaxis = y_axis,
+                      plot_bgcolor = 'white',
+                      width = 800,
+                      height = 600,
+                      title = dict(text = 'Sample Curve'),
+                      shapes = [shape])
+
+        return render(dict(data = data, layout = layout), show = show, as_spec = spec)
+
+    def plot_simulated_power(self, show = False, spec = False):
+        """
+        Creates a line plot of simulated power against sample size per group, with a band of
+        two standard errors around it. Calls simulate_power_curve() if it hasn't been run.
+
+        Complements plot_power_curve(): that one is analytic and varies power at a fixed effect,
+        this one simulates the binomial test itself across sample sizes.
+
+        If spec == True, returns a plain-dict figure spec instead of a go.Figure (see modules/figures.py).
+        """
+        if getattr(self, 'power_curve', None) == None:
+            self.simulate_power_curve()
+
+        x = self.power_curve['n']
+        y = self.power_curve['power']
+        band = 2 * self.power_curve['error']
+
+        line_curve = dict(color = 'blue', width = 2)
+        line_band = dict(color = 'rgba(0,0,255,0)')
+
+        x_axis = dict(title = dict(text = 'Size per Sample'), showline = True, linecolor = 'black', zeroline = False, showgrid = False, tickformat = ',d')
+        y_axis = dict(title = dict(text = 'Simulated Power at Alpha {}'.format(self.alpha)), showline = True, linecolor = 'black', zeroline = False, showgrid = False, range = [0, 1])
 
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x = x, y = y, mode = 'lines', showlegend = False, line = line_curve))
-        fig.add_vline(x = self.power, line_dash = 'dash', line_color = 'black', line_width = 2)
+        data = [dict(type = 'scatter', x = x, y = y + band, mode = 'lines', showlegend = False, line = line_band),
+                dict(type = 'scatter', x = x, y = y - band, mode = 'lines', showlegend = False, line = line_band,
+                     fill = 'tonexty', fillcolor = 'rgba(0,0,255,0.15)'),
+                dict(type = 'scatter', x = x, y = y, mode = 'lines', showlegend = False, line = line_curve)]
 
-        fig.update_xaxes(x_axis)
-        fig.update_yaxes(y_axis)
-        fig.update_layout(plot_bgcolor = 'white',
-                            width = 800,
-                            height = 600,
-                            title = 'Sample Curve')
+        shapes = []
+        if self.n_control:
+            shape, annotation = vline(x = self.n_control, line_dash = 'dash', line_color = 'black', line_width = 2)
+            shapes.append(shape)
 
-        if show:
-            fig.show();
+        layout = dict(xaxis = x_axis,
+                      yaxis = y_axis,
+                      plot_bgcolor = 'white',
+                      width = 800,
+                      height = 600,
+                      title = dict(text = 'Simulated Power Curve'),
+                      shapes = shapes)
 
-        return fig
+        return render(dict(data = data, layout = layout), show = show, as_spec = spec)
 
-    def evaluate(self, plot = False, show = False, summary = True):
+    def evaluate(self, plot = False, show = False, summary = False, spec = False):
         """
         Calls other methods in this class in order to speed up the experiment evaluation
         process and make this class more intuitive to use.
 
         User can treat this class as a container for parameters of an experiment that has
         concluded. Calling evaluate on it will generate P, Power and some Plots if plot == True.
+        P values too small for the simulation to resolve are estimated by simulate_tail_significance().
+        After a CUPED-adjusted ingest_data(), the p value and intervals come from the normal
+        approximation on the adjusted variances instead (engine 'analytic'), and plots aren't
+        available since they simulate binomial counts.
+
+        Returns a core.EvaluationResult. If plot == True, returns (result, figs) instead.
+        Prints the readout only if summary == True.
 
-        Will call plt.show(); on each plot, if show == True.
+        Will call plt.show(); on each plot, if show == True. If spec == True, plots come back as
+        plain-dict figure specs rather than go.Figure objects.
         """
+        if plot and self.theta != None:
+            raise ValueError('Plots simulate binomial counts, so they aren\'t available for CUPED-adjusted rates.')
+
+        timings = []
+
+        engine = 'simulation'
+        start = time.perf_counter()
         self.get_p_sample()
-        self.simulate_significance()
+        if self.theta != None:
+            engine = 'analytic'
+            self.p_value_error = None
+            self.analyze_significance()
+        else:
+            self.simulate_significance()
+        if engine == 'simulation' and self.p_value < 1 / len(self.binom_null):
+            # Past what the simulation can resolve. Estimate the tail instead.
+            engine = 'importance'
+            self.simulate_tail_significance(seed = self.seed)
+        timings.append(('significance', time.perf_counter() - start))
+
+        start = time.perf_counter()
         self.simulate_power()
+        timings.append(('power', time.perf_counter() - start))
+
+        start = time.perf_counter()
         self.confidence_intervals()
+        timings.append(('intervals', time.perf_counter() - start))
+
+        result = self.result(engine = engine, timings = timings)
 
         if summary:
-            print(self)
+            print(result)
 
         if plot:
-            fig1 = self.plot_p(show = show)
-            fig2 = self.plot_power(show = show)
-            fig3 = self.plot_confidence(show = show)
+            fig1 = self.plot_p(show = show, spec = spec)
+            fig2 = self.plot_power(show = show, spec = spec)
+            fig3 = self.plot_confidence(show = show, spec = spec)
+
+            return result, (fig1, fig2, fig3)
 
-            return fig1, fig2, fig3
+        return result
 
-    def plan(self, plot = False, show = False, summary = True):
+    def plan(self, plot = False, show = False, summary = False, spec = False):
         """
         Call other methods in this class in order to speed up the experiment planning
         flow and make this class more intuitive to use.
@@ -631,25 +832,110 @@ class BinomialExperiment():
         Power is desired power level. p_control is status quo rate. p_treatment is minimum outcome
         rate required to be meaningful to the business. Alpha is desired significance level
         (almost always, 0.05 is desired).
+
+        Returns a core.EvaluationResult. If plot == True, returns (result, figs) instead.
+        Prints the readout only if summary == True.
+
+        If spec == True, plots come back as plain-dict figure specs rather than go.Figure objects.
         """
+        timings = []
+
+        start = time.perf_counter()
         self.estimate_sample()
-        self.n_control
+        timings.append(('sample_size', time.perf_counter() - start))
+
+        start = time.perf_counter()
         self.get_p_sample()
         self.simulate_significance()
+        timings.append(('significance', time.perf_counter() - start))
+
+        start = time.perf_counter()
         self.confidence_intervals()
+        timings.append(('intervals', time.perf_counter() - start))
+
+        result = self.result(engine = 'simulation', timings = timings)
 
         if summary:
-            print(self)
+            print(result)
 
         if plot:
-            fig1 = self.plot_p(show = show)
-            fig2 = self.plot_power(show = show)
-            fig3 = self.plot_power_curve(show = show)
-            fig4 = self.plot_confidence(show = show)
+            fig1 = self.plot_p(show = show, spec = spec)
+            fig2 = self.plot_power(show = show, spec = spec)
+            fig3 = self.plot_power_curve(show = show, spec = spec)
+            fig4 = self.plot_confidence(show = show, spec = spec)
 
-            return fig1, fig2, fig3, fig4
+            return result, (fig1, fig2, fig3, fig4)
+
+        return result
+
+    def result(self, engine = None, timings = ()):
+        """
+        Snapshot of this experiment's current parameters and results as a frozen core.EvaluationResult.
+        Anything not calculated yet is None.
+        """
+        interval_control = getattr(self, 'interval_control', None)
+        interval_treatment = getattr(self, 'interval_treatment', None)
+        if engine == 'importance':
+            draws = self.tail_draws
+        elif engine == 'simulation' and self.binom_null is not None:
+            draws = len(self.binom_null)
+        else:
+            draws = 0
+
+        return core.EvaluationResult(p_control = self.p_control,
+                                     p_treatment = self.p_treatment,
+                                     n_control = self.n_control,
+                                     n_treatment = self.n_treatment,
+                                     alpha = self.alpha,
+                                     power = self.power,
+                                     p_value = self.p_value,
+                                     p_sample = self.p_sample,
+                                     interval_control = (interval_control['lower'], interval_control['upper']) if interval_control else None,
+                                     interval_treatment = (interval_treatment['lower'], interval_treatment['upper']) if interval_treatment else None,
+                                     level = interval_control['level'] if interval_control else None,
+                                     engine = engine,
+                                     draws = draws,
+                                     p_value_error = self.p_value_error if engine in ('simulation', 'importance') else None,
+                                     timings = tuple(timings))
+
+    def clear_results(self):
+        """
+        Forget everything calculated from the current probabilities and sample sizes:
+        simulated and approximated distributions, p value, power curve, intervals and the
+        Bayesian summary. Called when new data replaces them, so result() reports None
+        for anything that hasn't been recalculated rather than a value for the old data.
 
-    def ingest_data(self, data, control_name, treatment_name, evaluate = True):
+        self.power is kept: it's an input as well as a result (the power that
+        estimate_sample() plans for), and a power the user set still applies to new data.
+        """
+        self.norm_null = None
+        self.norm_alt = None
+        self.sterror_null = None
+        self.sterror_alt = None
+
+        self.binom_null = None
+        self.binom_alt = None
+        self.binom_control = None
+        self.binom_treatment = None
+        self.binom_batches = None
+        self.binom_tail_sums = None
+        self.binom_tail_counts = None
+
+        self.p_value = None
+        self.p_value_error = None
+        self.tail_draws = None
+        self.power_curve = None
+
+        self.confidence_control = None
+        self.confidence_treatment = None
+        self.interval_control = None
+        self.interval_treatment = None
+
+        self.prob_beat = None
+        self.loss_treatment = None
+        self.loss_control = None
+
+    def ingest_data(self, data, control_name, treatment_name, evaluate = True, covariate = None, summary = False):
         """
         Give this a dataframe of two columns: group assignment and outcome (binary).
         For now, this is used to contrast two groups (like the rest of this class).
@@ -660,17 +946,29 @@ class BinomialExperiment():
 
         Just feed the dataset, view report out to validate results, and go.
 
+        If a third column holds a pre-experiment covariate for each user, name it in covariate
+        to run a CUPED-adjusted analysis. Rates and variances are then adjusted in one pass
+        over the data, and the p value comes from analyze_significance() on the adjusted
+        variances (the binomial simulation assumes unadjusted counts).
+
         args:
             data: two-column dataframe containing grouping variable and binary outcome variable
             control_name: name of the control group as appears in group column
             treatment_name: name of treatment group as appears in group column
             eval: when true, calcs power and p value for the class instance
+            covariate: optional name of a third, pre-experiment covariate column
+            summary: when true, prints the readout
+
+        Returns a core.EvaluationResult (None if the data couldn't be read).
         """
+        expected_columns = 2 if covariate == None else 3
+
         # Validate the most obvious source of mistakes: more than 2 columns in df.
         try:
-            assert(len(data.columns) == 2)
+            assert(len(data.columns) == expected_columns)
+            assert(covariate == None or covariate in data.columns)
         except AssertionError:
-            print("ERROR: Data must have only two columns: group column and outcome column")
+            print("ERROR: Data must have only two columns: group column and outcome column (plus the covariate column, if given)")
             print("Data currently has {} columns: {}.".format(len(data.columns), list(data.columns)))
             return
 
@@ -683,6 +981,8 @@ class BinomialExperiment():
 
         for idx in range(len(data.columns)):
             col = data.columns[idx]
+            if col == covariate:
+                continue
             if sorted(data[col].unique()) == [0,1]:
                 outcome_col = col
                 outcome_cols+=1
@@ -696,20 +996,190 @@ class BinomialExperiment():
             print('Multiple outcome columns found. To avoid confusion, make sure groups do not take [0,1] as values.')
             return
 
-        # Group data and aggregate outcome by mean and count
-        # We can then pull rates and sample sizes directly from the resulting frame
-        metrics = data.groupby(group_col)[outcome_col].agg(['mean','count'])
-        self.p_control = metrics.loc[control_name, 'mean']
-        self.n_control = metrics.loc[control_name, 'count']
+        # Group data and aggregate outcome by mean, count and variance in a single pass.
+        # Without a covariate, theta is 0 and these are the plain rates.
+        moments = cuped_moments(data, group_col, outcome_col, control_name, treatment_name, covariate_col = covariate)
+        self.p_control = moments['mean_control']
+        self.n_control = moments['n_control']
+
+        self.p_treatment = moments['mean_treatment']
+        self.n_treatment = moments['n_treatment']
+
+        if covariate != None:
+            self.theta = moments['theta']
+            self.variance_reduction = moments['variance_reduction']
+            self.var_control = moments['var_control']
+            self.var_treatment = moments['var_treatment']
+        else:
+            self.theta = None
+            self.variance_reduction = None
+            self.var_control = 1 * self.p_control * (1 - self.p_control)
+            self.var_treatment = 1 * self.p_treatment * (1 - self.p_treatment)
 
-        self.p_treatment = metrics.loc[treatment_name, 'mean']
-        self.n_treatment = metrics.loc[treatment_name, 'count']
+        # Anything simulated, approximated or concluded for previous parameters is stale now
+        self.clear_results()
+        self.get_p_sample()
 
+        engine = None
+        timings = []
         if evaluate:
-            self.simulate_significance()
+            start = time.perf_counter()
+            if covariate != None:
+                engine = 'analytic'
+                self.analyze_significance()
+            else:
+                engine = 'simulation'
+                self.simulate_significance()
+                if self.p_value < 1 / len(self.binom_null):
+                    # Past what the simulation can resolve, as in evaluate()
+                    engine = 'importance'
+                    self.simulate_tail_significance(seed = self.seed)
+            timings.append(('significance', time.perf_counter() - start))
+
+            start = time.perf_counter()
             self.simulate_power()
+            timings.append(('power', time.perf_counter() - start))
+
+        result = self.result(engine = engine, timings = timings)
+
+        if summary:
+            print(result)
+
+        return result
+
+    def ingest_segments(self, data, control_name, treatment_name, segments, group_col = None, outcome_col = None,
+                        correction = None, level = 95, chunk_size = 1000000):
+        """
+        Break an experiment's results down by segment (country, device, channel...) in one pass.
+
+        Successes and trials are summed per (segment, group) with one groupby per chunk,
+        then significance, power and level% confidence intervals are computed for every
+        segment at once with the normal approximation. Uses self.alpha as the threshold.
+
+        The per-segment table is returned and also kept in self.segment_results. The
+        instance's own probabilities and sample sizes aren't changed.
+
+        args:
+            data: dataframe (or iterable of dataframes) of group, binary outcome and segment columns
+            control_name: name of the control group as appears in group column
+            treatment_name: name of treatment group as appears in group column
+            segments: list of segment column names
+            group_col: name of the group column. Found automatically for a dataframe, if not given.
+            outcome_col: name of the binary outcome column. Found automatically for a dataframe, if not given.
+            correction: None, 'bonferroni', 'holm' or 'fdr_bh' to adjust p values across segments
+            level: confidence level of the intervals
+            chunk_size: rows per groupby
+        """
+        segments = [segments] if isinstance(segments, str) else list(segments)
+
+        if group_col == None or outcome_col == None:
+            if not hasattr(data, 'columns'):
+                raise ValueError('group_col and outcome_col are required when data is an iterable of chunks.')
+
+            remaining = [col for col in data.columns if col not in segments]
+            if len(remaining) != 2:
+                raise ValueError('Data must have a group column and an outcome column besides the segments. Found {}.'.format(remaining))
+
+            for col in remaining:
+                if set(data[col].unique()) <= {0, 1}:
+                    outcome_col = col if outcome_col == None else outcome_col
+                else:
+                    group_col = col if group_col == None else group_col
+
+            if group_col == None or outcome_col == None:
+                raise ValueError('Could not tell the group column from the outcome column. Please name them.')
+
+        counts = aggregate_segments(data, group_col, outcome_col, segments, chunk_size = chunk_size)
+        self.segment_results = segment_results(counts, control_name, treatment_name, alpha = self.alpha,
+                                               level = level, correction = correction)
+
+        return self.segment_results
+
+    def ingest_timeseries(self, data, control_name, treatment_name, timestamp_col = None, group_col = None, outcome_col = None,
+                          interval = '1D', level = 95, chunk_size = 1000000):
+        """
+        Evaluate an experiment as of the end of every interval of its lifetime, in one pass.
+
+        Replaces slicing the data by day and calling ingest_data() and evaluate() on each slice.
+        Rows are bucketed by timestamp, successes and trials are summed per (bucket, group),
+        and cumulative sums give the running totals, from which rates, p values, power and
+        level% confidence intervals for every bucket are computed at once with the normal
+        approximation. Uses self.alpha as the threshold.
+
+        The trajectory is returned and also kept in self.timeseries_results. Its last row covers
+        all of the data. The instance's own probabilities and sample sizes aren't changed.
+
+        args:
+            data: dataframe (or iterable of dataframes) of timestamp, group and binary outcome columns
+            control_name: name of the control group as appears in group column
+            treatment_name: name of treatment group as appears in group column
+            timestamp_col: name of the timestamp column. Found automatically for a dataframe, if not given.
+            group_col: name of the group column. Found automatically for a dataframe, if not given.
+            outcome_col: name of the binary outcome column. Found automatically for a dataframe, if not given.
+            interval: bucket width, as a pandas timedelta string ('1D', '6h', '15min'...)
+            level: confidence level of the intervals
+            chunk_size: rows per groupby
+        """
+        if timestamp_col == None or group_col == None or outcome_col == None:
+            if not hasattr(data, 'columns'):
+                raise ValueError('timestamp_col, group_col and outcome_col are required when data is an iterable of chunks.')
+
+            if len(data.columns) != 3:
+                raise ValueError('Data must have exactly three columns: timestamp, group and outcome. Found {}.'.format(list(data.columns)))
+
+            for col in data.columns:
+                if pd.api.types.is_datetime64_any_dtype(data[col]):
+                    timestamp_col = col if timestamp_col == None else timestamp_col
+                elif set(data[col].unique()) <= {0, 1}:
+                    outcome_col = col if outcome_col == None else outcome_col
+                else:
+                    group_col = col if group_col == None else group_col
+
+            if timestamp_col == None or group_col == None or outcome_col == None:
+                raise ValueError('Could not tell the timestamp, group and outcome columns apart. Please name them.')
+
+        counts = aggregate_timeseries(data, timestamp_col, group_col, outcome_col, control_name, treatment_name,
+                                      interval = interval, chunk_size = chunk_size)
+        self.timeseries_results = cumulative_results(counts, alpha = self.alpha, level = level)
+
+        return self.timeseries_results
+
+    # Attributes written by save() and restored by load(). Frozen scipy distributions
+    # (norm_null, norm_alt) are cheap to rebuild, so they aren't stored.
+    saved_params = ['p_control', 'p_treatment', 'n_control', 'n_treatment', 'var_control', 'var_treatment',
+                    'p_sample', 'power', 'alpha', 'p_value', 'p_value_error', 'draws', 'sampling', 'seed', 'theta', 'variance_reduction',
+                    'prob_beat', 'loss_treatment', 'loss_control', 'interval_control', 'interval_treatment', 'binom_batches']
+    saved_arrays = ['binom_null', 'binom_alt', 'binom_control', 'binom_treatment', 'binom_tail_sums', 'binom_tail_counts']
+
+    def save(self, path):
+        """
+        Save this experiment's parameters, results and simulated distributions to the
+        directory at path. Parameters go to experiment.json and each simulated array
+        to an .npy file, so a later load() can skip the simulation entirely.
+        """
+        params = {name: getattr(self, name, None) for name in self.saved_params}
+        arrays = {name: getattr(self, name, None) for name in self.saved_arrays}
+
+        save_state(path, type(self).__name__, params, arrays)
+
+    @classmethod
+    def load(cls, path, mmap_mode = 'r'):
+        """
+        Rebuild an experiment from a directory written by save().
+
+        Simulated arrays are opened with mmap_mode ('r' by default). Read-only memory maps
+        let many worker processes share a single copy through the page cache. Pass
+        mmap_mode = None to read the arrays fully into memory instead.
+        """
+        params, arrays = load_state(path, cls.__name__, mmap_mode = mmap_mode)
+
+        experiment = cls(alpha = params['alpha'])
+        for name, value in params.items():
+            setattr(experiment, name, value)
+        for name, array in arrays.items():
+            setattr(experiment, name, array)
 
-        print(self)
+        return experiment
 
     def __repr__(self):
         """
@@ -725,6 +1195,7 @@ class BinomialExperiment():
                ['',''],
                ['Statistical Power', '{:.3f}'.format(self.power) if self.power else 'None'],
                ['Significance Threshold', '{:.3f}'.format(self.alpha)],
-               ['P Value', '{:.3f}'.format(self.p_value) if self.p_value != None else 'None']]
+               ['P Value', '{:.3f}'.format(self.p_value) if self.p_value != None else 'None'],
+               ['Prob. Treatment Beats Control', '{:.3f}'.format(self.prob_beat) if self.prob_beat != None else 'None']]
 
         return header + str(pd.DataFrame(data = [x[1] for x in data], index = [x[0] for x in data], columns = ['']))
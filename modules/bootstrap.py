@@ -0,0 +1,103 @@
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from modules.functions import iter_chunks
+
+def _accumulate(control, treatment, replicates, seed):
+    """
+    Poisson bootstrap update for one chunk of rows.
+
+    Every row gets an independent Poisson(1) weight in each of the B replicates.
+    Returns the chunk's contribution to the per-replicate weight totals and
+    weighted outcome totals of each group. Memory used here is rows * B, so
+    chunk size is what keeps it bounded.
+    """
+    rng = np.random.default_rng(seed)
+    totals = []
+
+    for values in (control, treatment):
+        weights = rng.poisson(1, size = (len(values), replicates)).astype(np.float64)
+        totals.append(weights.sum(axis = 0))
+        totals.append(values @ weights)
+
+    return totals
+
+def poisson_bootstrap(data, group_col, outcome_col, control_name, treatment_name,
+                      replicates = 2000, chunk_size = 2000, workers = 1, seed = None):
+    """
+    Online (Poisson) bootstrap of the control and treatment means.
+
+    Rows are streamed through in chunks and each chunk updates all B replicate
+    accumulators at once, so the data are read a single time and memory scales with
+    B rather than with the number of rows. With workers > 1, chunks are sharded
+    across that many processes and their accumulators are summed at the end.
+
+    args:
+        data: dataframe, or iterable of dataframes, with a group column and an outcome column
+        group_col: name of the group assignment column
+        outcome_col: name of the continuous outcome column
+        control_name: name of the control group as appears in group column
+        treatment_name: name of treatment group as appears in group column
+        replicates: number of bootstrap replicates (B)
+        chunk_size: rows per vectorized update (memory is roughly chunk_size * B * 8 bytes per worker)
+        workers: number of processes to shard chunks across
+        seed: seed for reproducible replicates (results do not depend on workers)
+
+    Returns a dict with observed means, sample sizes and the B replicate means of each group.
+    """
+    seeds = np.random.SeedSequence(seed)
+    # w = replicate weight totals, wx = replicate weighted outcome totals
+    accumulators = [np.zeros(replicates) for i in range(4)]
+    observed = {'n_control': 0, 'n_treatment': 0, 'sum_control': 0.0, 'sum_treatment': 0.0}
+
+    def tasks():
+        for chunk in iter_chunks(data, chunk_size):
+            groups = chunk[group_col].to_numpy()
+            values = chunk[outcome_col].to_numpy(dtype = np.float64)
+
+            control = values[groups == control_name]
+            treatment = values[groups == treatment_name]
+
+            observed['n_control'] += len(control)
+            observed['n_treatment'] += len(treatment)
+            observed['sum_control'] += control.sum()
+            observed['sum_treatment'] += treatment.sum()
+
+            yield control, treatment, replicates, seeds.spawn(1)[0]
+
+    def add(totals):
+        for accumulator, total in zip(accumulators, totals):
+            accumulator += total
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            # Only keep a couple of chunks per worker in flight, so the stream is never
+            # read into memory ahead of the workers.
+            pending = set()
+            for task in tasks():
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                    for future in done:
+                        add(future.result())
+                pending.add(executor.submit(_accumulate, *task))
+
+            for future in pending:
+                add(future.result())
+    else:
+        for task in tasks():
+            add(_accumulate(*task))
+
+    if observed['n_control'] == 0 or observed['n_treatment'] == 0:
+        raise ValueError('No rows found for {} or {} in column {}.'.format(control_name, treatment_name, group_col))
+
+    w_control, wx_control, w_treatment, wx_treatment = accumulators
+
+    return {
+        'n_control': observed['n_control'],
+        'n_treatment': observed['n_treatment'],
+        'u_control': observed['sum_control'] / observed['n_control'],
+        'u_treatment': observed['sum_treatment'] / observed['n_treatment'],
+        'boot_control': wx_control / w_control,
+        'boot_treatment': wx_treatment / w_treatment
+    }
@@ -0,0 +1,123 @@
+"""
+Simulation budget and precision policy.
+
+How many draws a simulation may take, what type they're stored in, how many are
+generated at a time and how much memory one simulation may hold are deployment
+decisions (a latency-sensitive API tier wants fewer draws than an overnight report),
+so they live here rather than as literals in the simulation code.
+
+The process-wide config comes from environment variables when first needed:
+
+    EXPERIMENT_MAX_DRAWS     most draws any one simulation takes (default 1,000,000)
+    EXPERIMENT_DTYPE         float64 or float32, for stored simulated distributions (default float64)
+    EXPERIMENT_CHUNK_SIZE    draws generated at a time (default 1,000,000)
+    EXPERIMENT_MAX_MEMORY    bytes one simulation may hold, like 512M or 2G (default 512M)
+    EXPERIMENT_MAX_POINTS    most points in a plotted curve (default 10,000)
+
+set_config() replaces it from code, and BinomialExperiment(config = ...) overrides it for
+one instance. Requests for more than the config allows are cut down to fit, not refused,
+so one huge request can't exhaust a worker's memory.
+"""
+
+import os
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+DTYPES = ('float64', 'float32')
+UNITS = {'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30}
+
+# Working space per draw of a chunk being simulated, on top of what's stored: about 10 float64
+# temporaries (counts and proportions per arm, and the conditional tail of each null draw,
+# measured at about 70 bytes)
+CHUNK_BYTES = 80
+
+@dataclass(frozen = True)
+class SimulationConfig:
+    max_draws: int = 1000000
+    dtype: str = 'float64'
+    chunk_size: int = 1000000
+    max_memory: int = 512 * 2 ** 20
+    max_points: int = 10000
+
+    def __post_init__(self):
+        if self.dtype not in DTYPES:
+            raise ValueError('Unknown dtype {}. Use one of {}.'.format(self.dtype, ', '.join(DTYPES)))
+        for name in ('max_draws', 'chunk_size', 'max_memory', 'max_points'):
+            if getattr(self, name) < 1:
+                raise ValueError('{} must be at least 1. Is {}'.format(name, getattr(self, name)))
+
+    def limit_draws(self, draws, bytes_per_draw = None):
+        """
+        Draws a simulation may take when it asked for draws and holds bytes_per_draw bytes
+        per draw: at most max_draws, and few enough that its arrays (plus one chunk of
+        working space) fit in max_memory. bytes_per_draw defaults to the four stored
+        distributions of BinomialExperiment.binom_distribution() in this config's dtype.
+        """
+        bytes_per_draw = 4 * np.dtype(self.dtype).itemsize if bytes_per_draw == None else bytes_per_draw
+        # Memory is draws * bytes_per_draw + min(draws, chunk_size) * CHUNK_BYTES.
+        working = CHUNK_BYTES
+        fits = min(self.chunk_size, self.max_memory // (bytes_per_draw + working))
+        if self.max_memory > self.chunk_size * working:
+            fits = max(fits, (self.max_memory - self.chunk_size * working) // bytes_per_draw)
+
+        return int(max(1, min(draws, self.max_draws, fits)))
+
+    def limit_points(self, points):
+        """
+        Points a plotted curve may have when it asked for points.
+        """
+        return int(max(2, min(points, self.max_points)))
+
+def parse_bytes(value):
+    """
+    '512M' -> 536870912. Plain numbers are bytes.
+    """
+    value = str(value).strip().upper().rstrip('B')
+    if value and value[-1] in UNITS:
+        return int(float(value[:-1]) * UNITS[value[-1]])
+
+    return int(float(value))
+
+def from_env(environ = None):
+    """
+    SimulationConfig from EXPERIMENT_* environment variables. Unset ones keep their defaults.
+    """
+    environ = os.environ if environ == None else environ
+    settings = {}
+
+    for name, parse in (('max_draws', int), ('dtype', str), ('chunk_size', int),
+                        ('max_memory', parse_bytes), ('max_points', int)):
+        value = environ.get('EXPERIMENT_' + name.upper())
+        if value != None and value != '':
+            settings[name] = parse(value)
+
+    return SimulationConfig(**settings)
+
+_config = None
+
+def get_config():
+    """
+    The process-wide config, read from the environment the first time it's needed.
+    """
+    global _config
+    if _config == None:
+        _config = from_env()
+
+    return _config
+
+def set_config(config = None, **changes):
+    """
+    Replace the process-wide config, with a SimulationConfig and/or individual fields
+    (set_config(max_draws = 100000)). Returns the new config.
+    """
+    global _config
+    _config = replace(config if config != None else get_config(), **changes)
+
+    return _config
+
+def resolve(config = None):
+    """
+    config if given, otherwise the process-wide one.
+    """
+    return config if config != None else get_config()
@@ -0,0 +1,683 @@
+"""
+Pure functional core of BinomialExperiment.
+
+Inputs and outputs are frozen dataclasses and no function here touches global or
+shared state (simulations use their own random generator), so any of them can be
+called at the same time from many threads, e.g. a ThreadPoolExecutor serving
+requests from one warm process:
+
+    params = ExperimentParams(p_control = 0.10, p_treatment = 0.12, n_control = 2000, n_treatment = 2000)
+    result = evaluate(params)
+
+BinomialExperiment keeps its stateful interface, but its calculations are thin
+wrappers over these functions.
+"""
+
+from dataclasses import dataclass, replace
+import json
+import time
+import warnings
+
+import numpy as np
+import scipy.stats as stats
+from scipy.optimize import brentq
+from scipy.special import expit, logit, logsumexp, ndtri
+
+from modules import fastpath
+from modules.config import resolve
+
+@dataclass(frozen = True)
+class ExperimentParams:
+    """
+    Parameters of a two-way binomial split test.
+
+    var_control and var_treatment default to the binomial variances p * (1 - p).
+    Set them (e.g. to CUPED-adjusted variances) and significance is computed from
+    them directly instead of from the pooled probability.
+    """
+    p_control: float
+    p_treatment: float
+    n_control: int = 0
+    n_treatment: int = 0
+    power: float = None
+    alpha: float = 0.05
+    var_control: float = None
+    var_treatment: float = None
+
+    def variances(self):
+        """
+        (var_control, var_treatment), falling back to the binomial variances.
+        """
+        var_control = self.var_control if self.var_control is not None else self.p_control * (1 - self.p_control)
+        var_treatment = self.var_treatment if self.var_treatment is not None else self.p_treatment * (1 - self.p_treatment)
+
+        return var_control, var_treatment
+
+@dataclass(frozen = True, slots = True)
+class EvaluationResult:
+    """
+    Outcome of an evaluation or plan, returned by evaluate() and plan() here and by
+    BinomialExperiment's evaluate(), plan() and ingest_data().
+
+    Slotted and frozen, so it's cheap to build in tight loops, and it pickles, so it
+    can come back from a worker process. Intervals are
+    (lower, upper) tuples at level%. engine says where the p value came from
+    ('simulation', 'importance' or 'analytic'), draws how many simulated draws backed the p value (0 if
+    none), p_value_error the standard error of a simulated p value, and timings holds
+    (stage, seconds) pairs. Fields that weren't computed
+    are None.
+
+    to_dict() and to_json() are plain and fast. The pandas readout is only rendered
+    by readout() (or by printing the result).
+    """
+    p_control: float
+    p_treatment: float
+    n_control: int
+    n_treatment: int
+    alpha: float
+    power: float
+    p_value: float
+    p_sample: float
+    interval_control: tuple
+    interval_treatment: tuple
+    level: float
+    engine: str
+    draws: int
+    p_value_error: float
+    timings: tuple
+
+    def to_dict(self):
+        """
+        Fields as a dict of plain Python values (intervals as [lower, upper] lists, timings as a dict).
+        """
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            result[name] = value.item() if isinstance(value, np.generic) else value
+        for name in ('interval_control', 'interval_treatment'):
+            if result[name] is not None:
+                result[name] = list(result[name])
+        result['timings'] = dict(self.timings)
+
+        return result
+
+    def to_json(self):
+        """
+        JSON string of to_dict().
+        """
+        return json.dumps(self.to_dict())
+
+    def readout(self):
+        """
+        The same readout BinomialExperiment prints, rendered on request.
+        """
+        import pandas as pd
+
+        header = '|||Experiment Readout|||\n'
+        data = [['Control Probability', '{:.2%}'.format(self.p_control)],
+               ['Treatment Probability', '{:.2%}'.format(self.p_treatment)],
+               ['Effect Size', '{:.2%}'.format(self.p_treatment - self.p_control)],
+               ['',''],
+               ['Control Sample Size', '{:,}'.format(self.n_control)],
+               ['Treatment Sample Size', '{:,}'.format(self.n_treatment)],
+               ['',''],
+               ['Statistical Power', '{:.3f}'.format(self.power) if self.power else 'None'],
+               ['Significance Threshold', '{:.3f}'.format(self.alpha)],
+               ['P Value', '{:.3f}'.format(self.p_value) if self.p_value != None else 'None'],
+               ['P Value Std. Error', '{:.2e}'.format(self.p_value_error) if self.p_value_error != None else 'None'],
+               ['Engine', '{} ({:,} draws)'.format(self.engine, self.draws) if self.draws else str(self.engine)]]
+
+        return header + str(pd.DataFrame(data = [x[1] for x in data], index = [x[0] for x in data], columns = ['']))
+
+    def __str__(self):
+        return self.readout()
+
+def pooled_probability(params):
+    """
+    Probability of a positive outcome in control and treatment combined.
+    """
+    control = params.p_control * params.n_control
+    treatment = params.p_treatment * params.n_treatment
+
+    return (control + treatment) / (params.n_control + params.n_treatment)
+
+def sample_size(params, power = None, alpha = None):
+    """
+    Minimum sample size (one group) needed to detect the params' effect size at the
+    given power and alpha (defaulting to the params' own). power may be an array of
+    power levels, in which case an array of sample sizes comes back.
+    """
+    power = params.power if power is None else power
+    alpha = params.alpha if alpha is None else alpha
+
+    if power is None:
+        raise ValueError('A power level is needed to estimate sample size.')
+    if (not (power > 0 and power < 1)) if np.ndim(power) == 0 else (np.any(np.asarray(power) <= 0) or np.any(np.asarray(power) >= 1)):
+        raise ValueError('Power provided is impossible (1, 0 or negative). Please provide a positive power between 0 and 1.')
+    if not (alpha > 0 and alpha < 1):
+        raise ValueError('Alpha provided is impossible (1, 0 or negative). Please provide a positive power between 0 and 1.')
+
+    var_control, var_treatment = params.variances()
+
+    if np.ndim(power) == 0:
+        return fastpath.sample_size(params.p_control, params.p_treatment, power = power, alpha = alpha,
+                                    var_control = var_control, var_treatment = var_treatment)
+
+    z_null = fastpath.norm_ppf(1 - alpha)
+    z_alt = ndtri(1 - np.asarray(power))
+
+    stdev_null = np.sqrt(var_control + var_control)
+    stdev_alt = np.sqrt(var_control + var_treatment)
+
+    z_diff = (z_null * stdev_null) - (z_alt * stdev_alt)
+    p_diff = params.p_treatment - params.p_control
+
+    return np.ceil((z_diff / p_diff) ** 2).astype(np.int64)
+
+def standard_errors(params):
+    """
+    Standard errors of the difference in probabilities under the null and the alt hypotheses.
+    """
+    var_control, var_treatment = params.variances()
+
+    # Null: treatment = control, so the null distribution is control subtracted from itself
+    sterror_null = np.sqrt((var_control / params.n_control) + (var_control / params.n_control))
+    # Alt: variance of treatment - control is var(treatment) + var(control)
+    sterror_alt = np.sqrt((var_treatment / params.n_treatment) + (var_control / params.n_control))
+
+    return sterror_null, sterror_alt
+
+def significance(params):
+    """
+    One-tailed p value from the normal approximation.
+
+    Null: Treatment Prob - Control Prob <= 0
+    Alt: Treatment Prob - Control Prob > 0
+    """
+    return fastpath.significance(params.p_control, params.p_treatment, params.n_control, params.n_treatment,
+                                 var_control = params.var_control, var_treatment = params.var_treatment)
+
+def power(params):
+    """
+    Statistical power of the one-tailed test at the params' sample sizes and alpha.
+    """
+    var_control, var_treatment = params.variances()
+
+    return fastpath.power(params.p_control, params.p_treatment, params.n_control, params.n_treatment,
+                          alpha = params.alpha, var_control = var_control, var_treatment = var_treatment)
+
+SAMPLING_SCHEMES = ('random', 'crn', 'antithetic', 'sobol')
+
+def binom_inverse(u, n, p):
+    """
+    Binomial(n, p) inverse CDF at uniforms u: the smallest count whose CDF reaches u.
+
+    The CDF is tabulated once over mean +/- 12 standard deviations (everything outside
+    carries less than 1e-30 of the mass) and each uniform is placed with a binary
+    search, which is far quicker than scipy.stats.binom.ppf per draw.
+    """
+    sd = np.sqrt(n * p * (1 - p))
+    low = int(max(0, np.floor(n * p - 12 * sd - 1)))
+    high = int(min(n, np.ceil(n * p + 12 * sd + 1)))
+
+    counts = np.arange(low, high + 1)
+    cdf = stats.binom.cdf(counts, n, p)
+
+    return counts[np.minimum(np.searchsorted(cdf, u, side = 'left'), len(counts) - 1)]
+
+def uniforms(draws, sampling = 'random', batches = 10, seed = None, dimensions = 2):
+    """
+    draws x dimensions uniforms (by default column 0 for control, column 1 for treatment),
+    ordered so that reshaping any per-draw statistic to (batches, -1) gives independent batches.
+
+    random and crn: plain pseudo-random uniforms.
+    antithetic: pairs u and 1 - u, interleaved, so draws within a pair are negatively correlated.
+    sobol: scrambled Sobol points, one independent scramble per batch. Batches are rounded
+        down to a power of 2 points, so this can return fewer than draws (see sobol_batches()
+        to choose draws and batches that lose as little as possible).
+    """
+    if sampling not in SAMPLING_SCHEMES:
+        raise ValueError('Unknown sampling scheme {}. Use one of {}.'.format(sampling, ', '.join(SAMPLING_SCHEMES)))
+
+    per_batch = int(np.ceil(draws / batches))
+    seeds = np.random.SeedSequence(seed).spawn(batches)
+
+    if sampling == 'sobol':
+        # Sobol points are balanced in blocks of powers of 2. Round down, so draws stays a ceiling.
+        per_batch = 2 ** int(np.floor(np.log2(max(per_batch, 1))))
+    elif sampling == 'antithetic':
+        per_batch = 2 * int(np.ceil(per_batch / 2))
+
+    # Filled batch by batch, so only one batch is ever held on top of the result
+    u = np.empty((batches * per_batch, dimensions))
+    for batch, s in enumerate(seeds):
+        block = u[batch * per_batch:(batch + 1) * per_batch]
+        if sampling == 'sobol':
+            block[:] = stats.qmc.Sobol(d = dimensions, scramble = True, seed = np.random.default_rng(s)).random(per_batch)
+        elif sampling == 'antithetic':
+            half = np.random.default_rng(s).random((per_batch // 2, dimensions))
+            block[0::2] = half
+            block[1::2] = 1 - half
+        else:
+            block[:] = np.random.default_rng(s).random((per_batch, dimensions))
+
+    return u
+
+def sobol_batches(draws, batches = 10):
+    """
+    (draws, batches) that Sobol sampling actually runs for a request of draws in batches:
+    each batch is the largest power of 2 points that fits batches of them into draws, and
+    as many whole batches run as fit. At least batches batches run, and at most one batch
+    of the request goes unused, with a warning giving the count that runs.
+    """
+    per_batch = 2 ** int(np.floor(np.log2(max(draws // batches, 1))))
+    batches = max(batches, draws // per_batch)
+
+    if per_batch * batches < draws:
+        warnings.warn('Sobol sampling runs whole power-of-2 batches: {:,} of the {:,} draws requested.'.format(per_batch * batches, draws))
+
+    return per_batch * batches, batches
+
+def treatment_tail(params, control_counts, p_sample = None):
+    """
+    Probability that the treatment count reaches the observed difference, given each of
+    control_counts, when treatment draws at p_sample (the pooled probability by default).
+
+    The exact binomial survival function is tabulated once over the range of the counts.
+    Its mean over simulated null control counts is the simulated test's p value with the
+    treatment draw integrated out (Rao-Blackwellized), which has the same expectation as
+    the share of null draws past the observed difference and a much smaller variance.
+    """
+    p_sample = pooled_probability(params) if p_sample == None else p_sample
+    n_control, n_treatment = params.n_control, params.n_treatment
+    observed_difference = params.p_treatment - params.p_control
+
+    low = int(control_counts.min())
+    counts = np.arange(low, int(control_counts.max()) + 1)
+    # Smallest treatment count with treatment / n_treatment - control / n_control >= observed difference
+    needed = np.ceil(n_treatment * (observed_difference + counts / n_control) - 1e-9)
+    table = stats.binom.sf(needed - 1, n_treatment, p_sample)
+
+    return table[control_counts - low]
+
+def simulate_distributions(params, draws = 1000000, seed = None, sampling = 'random', batches = 10,
+                           dtype = 'float64', chunk_size = None):
+    """
+    Simulated sample probabilities under the null (both groups at the pooled probability)
+    and the alt (each group at its own probability). Returns a dict of arrays:
+    null (treatment - control under the null), alt (treatment - control under the alt),
+    control and treatment (alt sample probabilities of each group), plus the sampling
+    scheme and number of batches used, and tail_sums and tail_counts: per batch, the sum
+    of treatment_tail() over the null control draws and the number of draws. Those give
+    the p value with its error through conditional_significance().
+
+    sampling picks how draws are generated:
+        random: independent binomial draws (the default, and the only option without inverse CDFs)
+        crn: common random numbers. Null and alt are inverse CDFs of the same uniforms, so
+            comparisons between them (like power across sample sizes) carry much less noise.
+            A single p value is barely more precise than with random.
+        antithetic: crn with antithetic uniform pairs (u, 1 - u)
+        sobol: crn with scrambled Sobol quasi-random points. Runs whole power-of-2 batches
+            (see sobol_batches()), so it can run up to one batch fewer draws than requested.
+            It warns when it does, and the arrays' length is the count that ran.
+
+    With the treatment draw integrated out, the p value is a smooth, monotone function of
+    the control uniform, which antithetic pairs and Sobol points both balance. So with
+    conditional_significance(), every scheme needs far fewer draws than counting null
+    draws past the observed difference (simulated_significance()) for the same precision.
+    benchmark-sampling.py measures each combination across seeds.
+
+    Draws are laid out in batches independent of each other, which is what
+    batch_error() uses to report the achieved precision of each scheme.
+
+    The arrays are stored as dtype (float32 halves their memory) and filled chunk_size
+    draws at a time (all at once by default), which bounds the temporaries.
+    """
+    p_sample = pooled_probability(params)
+    n_control, n_treatment = params.n_control, params.n_treatment
+
+    if sampling == 'sobol':
+        draws, batches = sobol_batches(draws, batches)
+
+    if sampling == 'random':
+        rng = np.random.default_rng(seed)
+    else:
+        u = uniforms(draws, sampling = sampling, batches = batches, seed = seed)
+        draws = len(u)
+
+    per_batch = int(np.ceil(draws / batches))
+    chunk_size = draws if chunk_size == None else chunk_size
+    null = np.empty(draws, dtype = dtype)
+    alt = np.empty(draws, dtype = dtype)
+    control = np.empty(draws, dtype = dtype)
+    treatment = np.empty(draws, dtype = dtype)
+    tail_sums = np.zeros(batches)
+    tail_counts = np.zeros(batches, dtype = np.int64)
+
+    for start in range(0, draws, chunk_size):
+        stop = min(start + chunk_size, draws)
+
+        if sampling == 'random':
+            size = stop - start
+            null_counts = rng.binomial(n_control, p_sample, size = size)
+            null_treatment = rng.binomial(n_treatment, p_sample, size = size) / n_treatment
+
+            alt_control = rng.binomial(n_control, params.p_control, size = size) / n_control
+            alt_treatment = rng.binomial(n_treatment, params.p_treatment, size = size) / n_treatment
+        else:
+            null_counts = binom_inverse(u[start:stop, 0], n_control, p_sample)
+            null_treatment = binom_inverse(u[start:stop, 1], n_treatment, p_sample) / n_treatment
+
+            alt_control = binom_inverse(u[start:stop, 0], n_control, params.p_control) / n_control
+            alt_treatment = binom_inverse(u[start:stop, 1], n_treatment, params.p_treatment) / n_treatment
+
+        null[start:stop] = null_treatment - null_counts / n_control
+        alt[start:stop] = alt_treatment - alt_control
+        control[start:stop] = alt_control
+        treatment[start:stop] = alt_treatment
+
+        tail = treatment_tail(params, null_counts, p_sample)
+        for batch in range(start // per_batch, (stop - 1) // per_batch + 1):
+            first, last = max(start, batch * per_batch), min(stop, (batch + 1) * per_batch)
+            tail_sums[batch] += tail[first - start:last - start].sum()
+            tail_counts[batch] += last - first
+
+    return {
+        'null': null,
+        'alt': alt,
+        'control': control,
+        'treatment': treatment,
+        'sampling': sampling,
+        'batches': batches,
+        'tail_sums': tail_sums,
+        'tail_counts': tail_counts
+    }
+
+def conditional_significance(tail_sums, tail_counts):
+    """
+    Rao-Blackwellized p value and its batch standard error, from the tail_sums and
+    tail_counts of simulate_distributions() (see treatment_tail()).
+    """
+    p_value = float(tail_sums.sum() / tail_counts.sum())
+    used = tail_counts > 0
+    means = tail_sums[used] / tail_counts[used]
+    error = float(means.std(ddof = 1) / np.sqrt(len(means))) if len(means) > 1 else None
+
+    return p_value, error
+
+# Bytes per draw of the tail estimate in tail_significance(), which isn't chunked: float64
+# proportions, differences and log weights, the tail mask and the normalized weights
+TAIL_BYTES = 80
+
+def simulation_bytes(dtype = 'float64', sampling = 'random'):
+    """
+    Bytes per draw that an evaluation by simulation holds at its peak, on top of one chunk of
+    working space (see config.SimulationConfig.limit_draws()): the four arrays of
+    simulate_distributions(), plus whichever is larger of the two float64 uniforms per draw
+    the inverse CDF schemes hold while simulating, and the copy percentile_interval()
+    partitions afterwards (with a byte of slack for batch_error()'s comparisons).
+    """
+    itemsize = np.dtype(dtype).itemsize
+
+    return 4 * itemsize + max(0 if sampling == 'random' else 16, itemsize + 1)
+
+def power_curve_bytes(points):
+    """
+    Bytes per draw power_curve() holds for a grid of points sample sizes: four float64
+    uniforms, a rejection flag per size, and the null and alt arrays, their sort and the
+    p values of the size being simulated.
+    """
+    return 32 + points + 56
+
+def batch_error(simulated, statistic, batches = 10):
+    """
+    Standard error of a simulated estimate, from the spread of the estimate across
+    independent batches of draws (the batch means method). Works the same for every
+    sampling scheme, because simulate_distributions() lays batches out contiguously.
+
+    statistic takes a (batches, draws per batch) array and returns one estimate per batch.
+    """
+    usable = (len(simulated) // batches) * batches
+    rows = np.asarray(simulated[:usable]).reshape(batches, -1)
+    # One batch at a time, so statistic's temporaries are a batch long rather than all draws
+    estimates = np.concatenate([np.atleast_1d(statistic(rows[batch:batch + 1])) for batch in range(batches)])
+
+    return float(np.std(estimates, ddof = 1) / np.sqrt(batches))
+
+def simulated_significance(params, null_differences):
+    """
+    Share of simulated null differences at least as large as the observed difference.
+    The plain estimate of the p value. conditional_significance() is far more precise
+    from the same draws.
+    """
+    observed_difference = params.p_treatment - params.p_control
+
+    # Counted a chunk at a time, so there's no full-length comparison array
+    chunk = 1000000
+    extreme = sum(int(np.count_nonzero(null_differences[start:start + chunk] >= observed_difference))
+                  for start in range(0, len(null_differences), chunk))
+
+    return extreme / len(null_differences)
+
+def power_curve(params, n_grid, draws = 20000, seed = None, sampling = 'crn', batches = 10, monotone = False):
+    """
+    Simulated power of the binomial test (the test simulated_significance() runs) at every
+    sample size per group in n_grid, with both groups at that size. Returns a dict of arrays: n, power and error (batch
+    standard error of each power estimate).
+
+    Every n reuses one set of uniforms (common random numbers): binomial counts at each n
+    are inverse CDFs of the same draws, so neighbouring sample sizes see nearly the same
+    randomness and their difference in power is mostly signal. Columns 0 and 1 of the
+    uniforms drive the null, columns 2 and 3 the alt. For each n, the alt draws' p values
+    against the null draws come from a single searchsorted over the sorted null.
+
+    Binomial power isn't strictly monotone in n (the discrete rejection region moves in
+    steps), and the estimates carry Monte Carlo noise, reported in error. With
+    monotone == True, the curve is made non-decreasing with a running maximum for display.
+    That lifts each point to the largest estimate at a smaller n, so it biases power
+    upward and error no longer describes it. Off by default.
+    """
+    n_grid = np.asarray(n_grid, dtype = int)
+    if sampling == 'random':
+        sampling = 'crn' # inverse CDFs are what make the draws common across n
+
+    p_sample = (params.p_control + params.p_treatment) / 2 # pooled probability of two groups of size n
+    difference = params.p_treatment - params.p_control
+    if sampling == 'sobol':
+        draws, batches = sobol_batches(draws, batches)
+    u = uniforms(draws, sampling = sampling, batches = batches, seed = seed, dimensions = 4)
+    usable = (len(u) // batches) * batches
+
+    rejected = np.empty((usable, len(n_grid)), dtype = bool)
+    for column, n in enumerate(n_grid):
+        null = (binom_inverse(u[:usable, 1], n, p_sample) - binom_inverse(u[:usable, 0], n, p_sample)) / n
+        alt = (binom_inverse(u[:usable, 3], n, params.p_treatment) - binom_inverse(u[:usable, 2], n, params.p_control)) / n
+
+        # share of null differences at least as large as each alt difference
+        p_values = (usable - np.searchsorted(np.sort(null), alt, side = 'left')) / usable
+        rejected[:, column] = p_values <= params.alpha
+
+    estimates = rejected.reshape(batches, -1, len(n_grid)).mean(axis = 1)
+    achieved_power = rejected.mean(axis = 0)
+    error = estimates.std(axis = 0, ddof = 1) / np.sqrt(batches)
+
+    if monotone:
+        order = np.argsort(n_grid)
+        achieved_power[order] = np.maximum.accumulate(achieved_power[order]) if difference >= 0 else np.minimum.accumulate(achieved_power[order])
+
+    return {'n': n_grid, 'power': achieved_power, 'error': error}
+
+def tail_significance(params, draws = 5000, seed = None):
+    """
+    Importance-sampled p value, for differences far enough into the null's tail that
+    plain simulation never reaches them (1,000,000 draws can't resolve p below ~1e-6).
+
+    The null draws both groups at the pooled probability p0. Here they are drawn from
+    the exponentially tilted null instead, treatment at q_t = expit(logit(p0) + theta / n_t)
+    and control at q_c = expit(logit(p0) - theta / n_c), with theta chosen so that
+    q_t - q_c equals the observed difference. Half the draws then land in the tail, and
+    each is reweighted by its likelihood ratio under the null,
+
+    exp(kappa(theta) - theta * difference)
+
+    where kappa is the null's cumulant generating function of the difference. The relative
+    error stays bounded however small the p value is.
+
+    Weights are summed in log space. Returns (p_value, relative_error), where relative_error
+    is the estimate's standard error over the estimate itself. relative_error is None when
+    there's no usable estimate: no draw reached the tail (p_value 0.0), or the p value is
+    below the smallest positive float, in which case that float (about 5e-324) is returned
+    as an upper bound.
+    """
+    observed_difference = params.p_treatment - params.p_control
+    p_sample = pooled_probability(params)
+    n_control, n_treatment = params.n_control, params.n_treatment
+
+    if p_sample <= 0 or p_sample >= 1:
+        # Degenerate null: every simulated difference is exactly 0
+        return (1.0 if observed_difference <= 0 else 0.0), 0.0
+
+    base = logit(p_sample)
+    log_fail, log_success = np.log1p(-p_sample), np.log(p_sample)
+
+    def cumulant(theta):
+        return (n_treatment * np.logaddexp(log_fail, log_success + theta / n_treatment)
+                + n_control * np.logaddexp(log_fail, log_success - theta / n_control))
+
+    def tilted_difference(theta):
+        return expit(base + theta / n_treatment) - expit(base - theta / n_control) - observed_difference
+
+    if observed_difference <= 0:
+        # Not a tail event, so no tilt is needed
+        theta = 0.0
+    else:
+        upper = 1.0
+        while tilted_difference(upper) < 0:
+            upper *= 2
+        theta = brentq(tilted_difference, 0, upper)
+
+    rng = np.random.default_rng(seed)
+    treatment = rng.binomial(n_treatment, expit(base + theta / n_treatment), size = draws) / n_treatment
+    control = rng.binomial(n_control, expit(base - theta / n_control), size = draws) / n_control
+    differences = treatment - control
+
+    tail = differences >= observed_difference
+    if not tail.any():
+        return 0.0, None
+
+    log_weights = np.where(tail, cumulant(theta) - theta * differences, -np.inf)
+    log_p_value = logsumexp(log_weights) - np.log(draws)
+
+    p_value = float(np.exp(log_p_value))
+    if p_value == 0:
+        # Past the smallest float. Report that float as an upper bound rather than 0.
+        return float(np.finfo(np.float64).smallest_subnormal), None
+
+    # Weights relative to the p value, which can't underflow however small it is
+    relative_error = float(np.exp(log_weights - log_p_value).std(ddof = 1) / np.sqrt(draws))
+
+    return p_value, relative_error
+
+def tail_error(p_value, relative_error):
+    """
+    Standard error of a tail_significance() estimate, or None where it has none.
+    """
+    return None if relative_error == None else p_value * relative_error
+
+def percentile_interval(simulated, level = 95):
+    """
+    Middle level% of a simulated distribution, as a (lower, upper) tuple.
+    """
+    margin = (100 - level) / 2 # interval is middle level% of vals, so this is margin to either side of it
+    lower, upper = np.percentile(a = simulated, q = [margin, level + margin])
+
+    return float(lower), float(upper)
+
+def normal_intervals(params, level = 95):
+    """
+    level% normal-approximation intervals of the control and treatment probabilities,
+    from the params' variances, as (lower, upper) tuples.
+    """
+    z = fastpath.norm_ppf(1 - (100 - level) / 200)
+    var_control, var_treatment = params.variances()
+    margin_control = float(z * np.sqrt(var_control / params.n_control))
+    margin_treatment = float(z * np.sqrt(var_treatment / params.n_treatment))
+
+    return ((float(params.p_control - margin_control), float(params.p_control + margin_control)),
+            (float(params.p_treatment - margin_treatment), float(params.p_treatment + margin_treatment)))
+
+def evaluate(params, level = 95, simulate = True, draws = 1000000, seed = None, sampling = 'random', config = None):
+    """
+    Significance, power and confidence intervals of a completed experiment.
+
+    With simulate == True, the p value and intervals come from binomial simulation
+    (p values below the simulation's resolution from tail_significance()), drawn with
+    the given sampling scheme (see simulate_distributions()). Otherwise they come from
+    the normal approximation.
+
+    draws is cut down to what config (a config.SimulationConfig, the process-wide one by
+    default) allows, and the simulation uses its dtype and chunk size.
+    """
+    config = resolve(config)
+    engine = 'simulation' if simulate else 'analytic'
+    p_value_error = None
+    timings = []
+    start = time.perf_counter()
+
+    if simulate:
+        draws = config.limit_draws(draws, bytes_per_draw = simulation_bytes(config.dtype, sampling))
+        simulated = simulate_distributions(params, draws = draws, seed = seed, sampling = sampling,
+                                           dtype = config.dtype, chunk_size = config.chunk_size)
+        draws = len(simulated['null'])
+        timings.append(('simulation', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        p_value, p_value_error = conditional_significance(simulated['tail_sums'], simulated['tail_counts'])
+        if p_value < 1 / draws:
+            # Past what the simulation can resolve: the null draws that decide p values this small
+            # are rarer than 1 in draws. Estimate the tail instead.
+            engine = 'importance'
+            draws = config.limit_draws(5000, bytes_per_draw = TAIL_BYTES)
+            p_value, relative_error = tail_significance(params, draws = draws, seed = seed)
+            p_value_error = tail_error(p_value, relative_error)
+        interval_control = percentile_interval(simulated['control'], level = level)
+        interval_treatment = percentile_interval(simulated['treatment'], level = level)
+    else:
+        p_value = significance(params)
+        interval_control, interval_treatment = normal_intervals(params, level = level)
+    timings.append(('significance', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    achieved_power = power(params)
+    timings.append(('power', time.perf_counter() - start))
+
+    return EvaluationResult(p_control = params.p_control,
+                            p_treatment = params.p_treatment,
+                            n_control = params.n_control,
+                            n_treatment = params.n_treatment,
+                            alpha = params.alpha,
+                            power = achieved_power,
+                            p_value = p_value,
+                            p_sample = pooled_probability(params),
+                            interval_control = interval_control,
+                            interval_treatment = interval_treatment,
+                            level = level,
+                            engine = engine,
+                            draws = draws if simulate else 0,
+                            p_value_error = p_value_error,
+                            timings = tuple(timings))
+
+def plan(params, level = 95, simulate = True, draws = 1000000, seed = None, sampling = 'random', config = None):
+    """
+    Size an experiment for the params' effect size, power and alpha, then evaluate it
+    as if it ran at that size. The result's power is the desired power the size was
+    chosen for.
+    """
+    start = time.perf_counter()
+    n = sample_size(params)
+    elapsed = time.perf_counter() - start
+
+    sized = replace(params, n_control = n, n_treatment = n)
+    result = evaluate(sized, level = level, simulate = simulate, draws = draws, seed = seed, sampling = sampling, config = config)
+
+    return replace(result, power = params.power, timings = (('sample_size', elapsed),) + result.timings)
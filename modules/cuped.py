@@ -0,0 +1,101 @@
+import numpy as np
+
+from modules.functions import iter_chunks
+
+class Moments():
+    """
+    Running count, means, sums of squares and co-moment of an (outcome, covariate)
+    stream. Chunks are merged with the pairwise update of Chan et al., which stays
+    numerically stable where naive sums of squares would not.
+    """
+    def __init__(self):
+        self.n = 0
+        self.mean_y = 0.0
+        self.mean_x = 0.0
+        self.m2_y = 0.0
+        self.m2_x = 0.0
+        self.c_xy = 0.0
+
+    def update(self, y, x):
+        """
+        Fold one chunk of outcomes (y) and covariates (x) into the running moments.
+        """
+        n_b = len(y)
+        if n_b == 0:
+            return
+
+        mean_y_b = y.mean()
+        mean_x_b = x.mean()
+        dev_y = y - mean_y_b
+        dev_x = x - mean_x_b
+
+        n = self.n + n_b
+        delta_y = mean_y_b - self.mean_y
+        delta_x = mean_x_b - self.mean_x
+        weight = self.n * n_b / n
+
+        self.m2_y += dev_y @ dev_y + delta_y * delta_y * weight
+        self.m2_x += dev_x @ dev_x + delta_x * delta_x * weight
+        self.c_xy += dev_x @ dev_y + delta_x * delta_y * weight
+        self.mean_y += delta_y * n_b / n
+        self.mean_x += delta_x * n_b / n
+        self.n = n
+
+def cuped_moments(data, group_col, outcome_col, control_name, treatment_name, covariate_col = None, chunk_size = 100000):
+    """
+    CUPED-adjusted means and variances of each group, computed in a single streaming
+    pass over (group, outcome, covariate) rows.
+
+    The regression coefficient theta is the pooled within-group covariance of outcome
+    and covariate over the pooled within-group covariate variance. Each group's mean is
+    then adjusted by theta * (group covariate mean - overall covariate mean), and its
+    variance becomes var(y - theta * x). With no covariate_col, theta is 0 and the
+    plain means and variances come back.
+
+    args:
+        data: dataframe, or iterable of dataframes, holding the group, outcome and covariate columns
+        group_col: name of the group assignment column
+        outcome_col: name of the outcome column
+        control_name: name of the control group as appears in group column
+        treatment_name: name of treatment group as appears in group column
+        covariate_col: name of the pre-experiment covariate column
+        chunk_size: rows read per update
+
+    Returns a dict of theta, variance_reduction and n, mean and variance for each group.
+    """
+    moments = {control_name: Moments(), treatment_name: Moments()}
+
+    for chunk in iter_chunks(data, chunk_size):
+        groups = chunk[group_col].to_numpy()
+        y = chunk[outcome_col].to_numpy(dtype = np.float64)
+        x = chunk[covariate_col].to_numpy(dtype = np.float64) if covariate_col != None else np.zeros(len(y))
+
+        for name, group in moments.items():
+            mask = groups == name
+            group.update(y[mask], x[mask])
+
+    control = moments[control_name]
+    treatment = moments[treatment_name]
+
+    if control.n < 2 or treatment.n < 2:
+        raise ValueError('Need at least two rows each for {} and {} in column {}.'.format(control_name, treatment_name, group_col))
+
+    m2_x = control.m2_x + treatment.m2_x
+    theta = (control.c_xy + treatment.c_xy) / m2_x if m2_x > 0 else 0.0
+    mean_x = (control.mean_x * control.n + treatment.mean_x * treatment.n) / (control.n + treatment.n)
+
+    result = {'theta': theta}
+    m2_raw = 0.0
+    m2_adjusted = 0.0
+    for label, group in (('control', control), ('treatment', treatment)):
+        m2 = group.m2_y - 2 * theta * group.c_xy + theta ** 2 * group.m2_x
+        m2_raw += group.m2_y
+        m2_adjusted += m2
+
+        result['n_' + label] = group.n
+        result['mean_' + label] = group.mean_y - theta * (group.mean_x - mean_x)
+        result['var_' + label] = m2 / (group.n - 1)
+
+    result['variance_reduction'] = 1 - (m2_adjusted / m2_raw) if m2_raw > 0 else 0.0
+
+    return result
@@ -0,0 +1,88 @@
+"""
+Low-latency scalar kernels for the analytic (normal approximation) calculations.
+
+scipy.stats.norm methods validate arguments and build arrays on every call, which
+costs tens of microseconds and swamps the arithmetic when a single experiment is
+evaluated. These kernels use math.erfc for the normal CDF and scipy.special.ndtri
+for its inverse, with quantiles cached (alpha and power come from a handful of
+values in practice), and never allocate frozen distributions.
+
+Array versions of the same calculations live in modules/analytic.py.
+See benchmark-analytic.py for timings.
+"""
+
+from functools import lru_cache
+from math import ceil, erfc, sqrt
+
+from scipy.special import ndtri
+
+SQRT2 = sqrt(2)
+
+def norm_cdf(z):
+    """
+    Standard normal CDF.
+    """
+    return 0.5 * erfc(-z / SQRT2)
+
+def norm_sf(z):
+    """
+    Standard normal survival function (1 - CDF), accurate far into the upper tail.
+    """
+    return 0.5 * erfc(z / SQRT2)
+
+@lru_cache(maxsize = 256)
+def norm_ppf(q):
+    """
+    Standard normal quantile function.
+    """
+    return float(ndtri(q))
+
+def significance(p_control, p_treatment, n_control, n_treatment, var_control = None, var_treatment = None):
+    """
+    One-tailed p value of treatment - control > 0. Uses the pooled probability's variance
+    unless both variances are given.
+    """
+    if var_control is None or var_treatment is None:
+        p_sample = (p_control * n_control + p_treatment * n_treatment) / (n_control + n_treatment)
+        var_control = var_treatment = p_sample * (1 - p_sample)
+
+    sigma = sqrt((var_control / n_control) + (var_treatment / n_treatment))
+
+    return norm_sf((p_treatment - p_control) / sigma)
+
+def power(p_control, p_treatment, n_control, n_treatment, alpha = 0.05, var_control = None, var_treatment = None):
+    """
+    Statistical power of the one-tailed test. Variances default to p * (1 - p).
+    """
+    if var_control is None:
+        var_control = p_control * (1 - p_control)
+    if var_treatment is None:
+        var_treatment = p_treatment * (1 - p_treatment)
+
+    difference = p_treatment - p_control
+    thresh = 1 - alpha if difference < 0 else alpha
+
+    sterror_null = sqrt((var_control / n_control) + (var_control / n_control))
+    sterror_alt = sqrt((var_treatment / n_treatment) + (var_control / n_control))
+
+    p_crit = norm_ppf(1 - thresh) * sterror_null
+    beta = norm_cdf((p_crit - difference) / sterror_alt)
+
+    return (1 - beta) if difference >= 0 else beta
+
+def sample_size(p_control, p_treatment, power = 0.8, alpha = 0.05, var_control = None, var_treatment = None):
+    """
+    Minimum sample size per group. Variances default to p * (1 - p).
+    """
+    if var_control is None:
+        var_control = p_control * (1 - p_control)
+    if var_treatment is None:
+        var_treatment = p_treatment * (1 - p_treatment)
+
+    z_null = norm_ppf(1 - alpha)
+    z_alt = norm_ppf(1 - power)
+
+    z_diff = (z_null * sqrt(var_control + var_control)) - (z_alt * sqrt(var_control + var_treatment))
+    n = (z_diff / (p_treatment - p_control)) ** 2
+
+    return ceil(n)
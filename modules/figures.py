@@ -0,0 +1,110 @@
+"""
+Plain-dict plotly figure specs.
+
+Building go.Scatter and go.Figure objects runs plotly's property validation on every
+trace, which is the bulk of a plot's cost when the figure is only going to be serialized
+for a browser. The plot_* methods of BinomialExperiment can instead return a spec:
+{'data': [trace dicts], 'layout': layout dict}, in the same schema plotly.js reads.
+Specs are turned into go.Figure objects only when something needs one (like
+save_images(), which writes images through kaleido).
+"""
+
+import json
+import numpy as np
+
+def vline(x, line_width = 2, line_dash = 'dash', line_color = 'black', annotation_text = None, annotation_position = 'top right'):
+    """
+    Shape and annotation dicts for a vertical line spanning the plot's height, like go.Figure.add_vline().
+    Returns (shape, annotation). annotation is None when there's no annotation_text.
+    """
+    shape = dict(type = 'line', xref = 'x', yref = 'y domain', x0 = x, x1 = x, y0 = 0, y1 = 1,
+                 line = dict(width = line_width, dash = line_dash, color = line_color))
+
+    if annotation_text == None:
+        return shape, None
+
+    vertical, horizontal = annotation_position.split(' ')
+    annotation = dict(text = annotation_text, showarrow = False, xref = 'x', yref = 'y domain', x = x,
+                      y = 1 if vertical == 'top' else 0,
+                      xanchor = 'left' if horizontal == 'right' else 'right',
+                      yanchor = 'top' if vertical == 'top' else 'bottom')
+
+    return shape, annotation
+
+def _encode(value):
+    """
+    json.dumps fallback for numpy values found in specs.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+def to_json(spec):
+    """
+    Serialize a figure spec to a JSON string that plotly.js can render directly.
+    """
+    return json.dumps(spec, default = _encode, separators = (',', ':'))
+
+def compact(spec, max_points = 500, digits = 6):
+    """
+    Smaller copy of a spec for embedding in HTML: traces with more than max_points points are
+    thinned to max_points evenly spaced ones (always keeping the ends), and numbers are rounded
+    to digits significant figures. Curves of a few hundred points look the same on screen as
+    curves of a few hundred thousand.
+    """
+    def shrink(values, keep):
+        values = np.asarray(values)
+        if keep is not None:
+            values = values[keep]
+        if values.dtype.kind == 'f':
+            values = np.array([float('{:.{}g}'.format(v, digits)) for v in values])
+        return values
+
+    data = []
+    for trace in spec.get('data', []):
+        trace = dict(trace)
+        lengths = [len(trace[axis]) for axis in ('x', 'y') if isinstance(trace.get(axis), (list, np.ndarray))]
+        keep = None
+        if lengths and max(lengths) > max_points:
+            keep = np.unique(np.linspace(0, max(lengths) - 1, max_points).round().astype(int))
+        for axis in ('x', 'y'):
+            if isinstance(trace.get(axis), (list, np.ndarray)) and len(trace[axis]):
+                trace[axis] = shrink(trace[axis], keep if len(trace[axis]) == max(lengths) else None)
+        data.append(trace)
+
+    return dict(spec, data = data)
+
+def to_figure(spec):
+    """
+    Build a validated go.Figure from a spec. go.Figure objects pass through untouched.
+    """
+    if not isinstance(spec, dict):
+        return spec
+
+    import plotly.graph_objects as go
+
+    return go.Figure(spec)
+
+def render(spec, show = False, as_spec = False):
+    """
+    Shared ending of the plot_* methods. Returns the spec itself when as_spec == True,
+    otherwise a go.Figure. Either way, show == True displays the figure.
+    """
+    fig = to_figure(spec) if (show or not as_spec) else None
+
+    if show:
+        fig.show()
+
+    return spec if as_spec else fig
+
+def figure_title(fig):
+    """
+    Title text of a figure or a spec.
+    """
+    if isinstance(fig, dict):
+        title = fig.get('layout', {}).get('title', '')
+        return title.get('text', '') if isinstance(title, dict) else title
+
+    return fig.layout.title.text
@@ -1,22 +1,24 @@
-import plotly.graph_objects as go
+import numpy as np
 import os
 from PIL import Image
 
+from modules.figures import to_figure, figure_title
+
 def create_dashboard(figs, filename):
     """
-    Takes a list of plotly figures and creates from them an HTML document. The document
-    displays the charts in list order down its length.
+    Takes a list of plotly figures (or figure specs) and creates from them an HTML document.
+    The document displays the charts in list order down its length.
     """
     with open(filename, 'w') as f:
         f.write('<html><head></head><body>' + '\n')
         for fig in figs:
-            innerhtml = fig.to_html().split('<body>')[1].split('</body>')[0]
+            innerhtml = to_figure(fig).to_html().split('<body>')[1].split('</body>')[0]
             f.write(innerhtml)
         f.write('</body></html>' + '\n')
 
 def save_images(figs, save_path):
     """
-    Takes a list of plotly figures and saves them to save_path as .webp files.
+    Takes a list of plotly figures (or figure specs) and saves them to save_path as .webp files.
 
     Webp is pro-web format. That's why it's used, here.
     """
@@ -24,10 +26,67 @@ def save_images(figs, save_path):
         os.mkdir(save_path)
 
     for fig in figs:
-        filename = fig.layout.title.text.lower().replace(' ','_')
+        filename = figure_title(fig).lower().replace(' ','_')
         file = save_path + '/' + filename + '.webp'
 
-        fig.write_image(file)
+        to_figure(fig).write_image(file)
 
         im = Image.open(file)
         im.show()
+
+def iter_chunks(data, chunk_size):
+    """
+    Yields dataframes of at most chunk_size rows.
+
+    data can be a single dataframe or any iterable of dataframes (for instance,
+    the reader returned by pd.read_csv(..., chunksize = n)). Either way, callers
+    only ever hold one chunk in memory at a time.
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive number of rows. Is {}'.format(chunk_size))
+
+    frames = [data] if hasattr(data, 'columns') else data
+
+    for frame in frames:
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+
+def adjust_p_values(p_values, method = 'holm'):
+    """
+    Adjust an array of p values for multiple comparisons. NaN p values (tests that
+    couldn't be run) are left as NaN and don't count toward the number of comparisons.
+
+    args:
+        p_values: array of raw p values
+        method: 'bonferroni' or 'holm' (family-wise error rate) or 'fdr_bh'
+            (Benjamini-Hochberg false discovery rate)
+    """
+    p_values = np.asarray(p_values, dtype = np.float64)
+    adjusted = np.full(p_values.shape, np.nan)
+
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if m == 0:
+        return adjusted
+
+    order = np.argsort(p)
+    ranked = p[order]
+    ranks = np.arange(1, m + 1)
+
+    if method == 'bonferroni':
+        result = np.minimum(p * m, 1)
+    elif method == 'holm':
+        stepped = np.minimum(np.maximum.accumulate((m - ranks + 1) * ranked), 1)
+        result = np.empty(m)
+        result[order] = stepped
+    elif method == 'fdr_bh':
+        stepped = np.minimum(np.minimum.accumulate((ranked * m / ranks)[::-1])[::-1], 1)
+        result = np.empty(m)
+        result[order] = stepped
+    else:
+        raise ValueError('Unknown correction method {}. Use bonferroni, holm or fdr_bh.'.format(method))
+
+    adjusted[valid] = result
+
+    return adjusted
@@ -0,0 +1,108 @@
+"""
+Health checks run across a whole portfolio of experiments before any of them is
+evaluated, so broken tests are filtered out before expensive simulations run.
+
+    Sample ratio mismatch (SRM): a chi-square test of the observed split against the
+    intended allocation. A tiny p value means assignment or logging is broken, and
+    the experiment's results can't be trusted however significant they look.
+
+    Zero variance: an arm with no successes (or nothing but successes) has p * (1 - p) = 0,
+    which breaks the normal approximation and makes simulations degenerate.
+
+    Minimum sample: arms too small for the normal approximation or to be worth simulating.
+
+Every argument broadcasts, as in modules/analytic.py, so one call checks any number
+of experiments.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.special import chdtrc
+
+def health_checks(n_control, n_treatment, s_control, s_treatment, expected_share = 0.5, names = None,
+                  srm_alpha = 0.001, min_sample = 100):
+    """
+    Vectorized SRM, zero variance and minimum sample checks.
+
+    args:
+        n_control: trials in each experiment's control arm
+        n_treatment: trials in each experiment's treatment arm
+        s_control: successes in each experiment's control arm
+        s_treatment: successes in each experiment's treatment arm
+        expected_share: intended share of traffic sent to control (0.5 for an even split)
+        names: experiment names for the table's index. Defaults to 0, 1, 2...
+        srm_alpha: SRM p values below this flag a mismatch. Strict by default, since
+            assignment at scale matches its allocation very closely when it works.
+        min_sample: arms with fewer trials than this are flagged
+
+    Returns one row per experiment: the checks, their flags, healthy (no flags raised)
+    and issues (comma separated names of the flags raised).
+    """
+    n_control, n_treatment, s_control, s_treatment, expected_share = np.broadcast_arrays(
+        *[np.asarray(a, dtype = np.float64) for a in (n_control, n_treatment, s_control, s_treatment, expected_share)])
+
+    if np.any((expected_share <= 0) | (expected_share >= 1)):
+        raise ValueError('expected_share must be between 0 and 1 (exclusive).')
+
+    total = n_control + n_treatment
+    expected_control = total * expected_share
+    expected_treatment = total - expected_control
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        chi_square = ((n_control - expected_control) ** 2 / expected_control
+                      + (n_treatment - expected_treatment) ** 2 / expected_treatment)
+        srm_p_value = chdtrc(1, chi_square)
+        observed_share = n_control / total
+        p_control = s_control / n_control
+        p_treatment = s_treatment / n_treatment
+        p_sample = (s_control + s_treatment) / total
+
+    flags = {
+        'srm': srm_p_value < srm_alpha,
+        'zero_variance_control': ~(p_control * (1 - p_control) > 0),
+        'zero_variance_treatment': ~(p_treatment * (1 - p_treatment) > 0),
+        'p_sample_undefined': ~(p_sample * (1 - p_sample) > 0),
+        'small_sample': np.minimum(n_control, n_treatment) < min_sample,
+        'invalid_counts': ((s_control > n_control) | (s_treatment > n_treatment)
+                           | (np.minimum(s_control, s_treatment) < 0) | (np.minimum(n_control, n_treatment) < 0))
+    }
+
+    raised = np.stack(list(flags.values()), axis = -1).reshape(-1, len(flags))
+    healthy = ~raised.any(axis = 1)
+
+    # Issue strings are only built for flagged experiments, which should be the few
+    labels = np.array(list(flags))
+    issues = np.full(len(raised), '', dtype = object)
+    issues[~healthy] = [', '.join(labels[row]) for row in raised[~healthy]]
+
+    results = pd.DataFrame({
+        'n_control': n_control.ravel().astype(np.int64),
+        'n_treatment': n_treatment.ravel().astype(np.int64),
+        'expected_share': expected_share.ravel(),
+        'observed_share': observed_share.ravel(),
+        'srm_chi_square': chi_square.ravel(),
+        'srm_p_value': srm_p_value.ravel(),
+        'p_control': p_control.ravel(),
+        'p_treatment': p_treatment.ravel(),
+        **{name: flag.ravel() for name, flag in flags.items()},
+        'healthy': healthy,
+        'issues': issues
+    }, index = names)
+
+    return results
+
+def check_experiments(experiments, expected_share = 0.5, srm_alpha = 0.001, min_sample = 100):
+    """
+    health_checks() over a dict of name -> BinomialExperiment (or a list, named by position).
+    Successes are recovered from each experiment's probabilities and sample sizes.
+    """
+    if not isinstance(experiments, dict):
+        experiments = dict(enumerate(experiments))
+
+    n_control = np.array([e.n_control for e in experiments.values()], dtype = np.float64)
+    n_treatment = np.array([e.n_treatment for e in experiments.values()], dtype = np.float64)
+    s_control = np.round(np.array([e.p_control for e in experiments.values()]) * n_control)
+    s_treatment = np.round(np.array([e.p_treatment for e in experiments.values()]) * n_treatment)
+
+    return health_checks(n_control, n_treatment, s_control, s_treatment, expected_share = expected_share,
+                         names = list(experiments), srm_alpha = srm_alpha, min_sample = min_sample)
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from modules import analytic, core
+from modules.functions import adjust_p_values
+
+class MultiArmExperiment():
+    """
+    Represents an n-way split test with binary outcomes: one control arm and any
+    number of treatment arms.
+
+    Arm probabilities and sample sizes are held in arrays, and every comparison is
+    scored together. Simulation draws uniforms for all K arms at once as a K x draws
+    matrix, so each arm's randomness is drawn a single time no matter how many
+    comparisons it's in. Each comparison's null is pooled from its own two arms, as in
+    BinomialExperiment.
+
+    Each comparison is one-tailed, like BinomialExperiment:
+
+    Null: Treatment Probability - Control Probability <= 0
+    Alt: Treatment Probability - Control Probability > 0
+
+    With pairwise comparisons, the later arm in the list plays the treatment.
+    """
+    def __init__(self, p_arms = None, n_arms = None, names = None, control = 0, alpha = 0.05):
+        """
+        p_arms and n_arms are equal-length sequences of each arm's probability and sample size.
+        names labels the arms (defaults to arm_0, arm_1, ...). control is the position of the
+        control arm (or its name, if names are given).
+        """
+        self.p_arms = np.asarray(p_arms if p_arms is not None else [], dtype = np.float64)
+        self.n_arms = np.asarray(n_arms if n_arms is not None else [], dtype = np.int64)
+
+        if len(self.p_arms) != len(self.n_arms):
+            raise ValueError('p_arms and n_arms must be the same length. Are {} and {}.'.format(len(self.p_arms), len(self.n_arms)))
+
+        self.names = list(names) if names is not None else ['arm_{}'.format(i) for i in range(len(self.p_arms))]
+        self.control = self.names.index(control) if isinstance(control, str) else control
+
+        self.alpha = alpha
+        self.arm_uniforms = None
+        self.results = None
+
+    def ingest_data(self, data, control_name, group_col = None, outcome_col = None):
+        """
+        Populate arm probabilities and sample sizes from a two-column dataframe of group
+        assignment and binary outcome. Every distinct group becomes an arm.
+
+        args:
+            data: dataframe of group column and binary outcome column
+            control_name: name of the control group as appears in group column
+            group_col: name of the group column. Defaults to the first column.
+            outcome_col: name of the outcome column. Defaults to the second column.
+        """
+        group_col = data.columns[0] if group_col == None else group_col
+        outcome_col = data.columns[1] if outcome_col == None else outcome_col
+
+        metrics = data.groupby(group_col)[outcome_col].agg(['mean', 'count'])
+
+        self.names = list(metrics.index)
+        self.p_arms = metrics['mean'].to_numpy(dtype = np.float64)
+        self.n_arms = metrics['count'].to_numpy(dtype = np.int64)
+        self.control = self.names.index(control_name)
+        self.arm_uniforms = None
+
+    def comparisons(self, pairwise = False):
+        """
+        Returns two index arrays (control side, treatment side) listing the comparisons to run.
+        Every treatment against control by default, or every pair of arms if pairwise == True.
+        """
+        arms = np.arange(len(self.p_arms))
+
+        if pairwise:
+            return np.triu_indices(len(arms), k = 1)
+
+        treatments = arms[arms != self.control]
+
+        return np.full(len(treatments), self.control), treatments
+
+    def binom_distribution(self, draws = 1000000, seed = None):
+        """
+        Draws one uniform per arm and draw in one call, a K x draws matrix stored in
+        self.arm_uniforms. Each comparison turns its arms' rows into binomial counts under
+        its own null (see simulate_significance()) with inverse CDFs, so the uniforms are
+        shared by every comparison an arm is in.
+        """
+        self.arm_uniforms = np.random.default_rng(seed).random((len(self.n_arms), draws))
+
+        return self.arm_uniforms
+
+    def simulate_significance(self, first, second):
+        """
+        Simulated one-tailed p values for the comparisons given by index arrays first
+        (control side) and second (treatment side). Needs self.arm_uniforms.
+
+        Each comparison's null draws both of its arms at their pooled probability, so it's
+        the same test BinomialExperiment simulates for the pair, whatever the other arms
+        hold. Control-side counts come from the control arm's uniforms, and the treatment
+        draw is integrated out exactly (see core.treatment_tail()), so only one row of
+        draws is held at a time.
+        """
+        p_values = np.empty(len(first))
+
+        for i, (a, b) in enumerate(zip(first, second)):
+            params = core.ExperimentParams(p_control = self.p_arms[a], p_treatment = self.p_arms[b],
+                                           n_control = int(self.n_arms[a]), n_treatment = int(self.n_arms[b]))
+            p_sample = core.pooled_probability(params)
+            counts = core.binom_inverse(self.arm_uniforms[a], params.n_control, p_sample)
+            p_values[i] = core.treatment_tail(params, counts, p_sample).mean()
+
+        return p_values
+
+    def evaluate(self, pairwise = False, correction = 'holm', simulate = True, draws = 1000000, seed = None, summary = False):
+        """
+        Score every comparison in one pass and adjust the p values for multiple comparisons.
+
+        args:
+            pairwise: when true, compare all pairs of arms instead of only treatments vs control
+            correction: None, 'bonferroni', 'holm' (family-wise) or 'fdr_bh' (false discovery rate)
+            simulate: when true, p values come from the K x draws null simulation. Otherwise,
+                from the normal approximation. Simulated p values below 1 / draws (past the
+                simulation's resolution) are estimated with core.tail_significance() instead.
+            draws: simulated draws per arm
+            seed: seed for reproducible simulation
+            summary: print the results table
+
+        Returns a dataframe with one row per comparison, also kept in self.results. Its
+        engine column says where each p value came from ('simulation', 'importance' or 'analytic').
+        """
+        first, second = self.comparisons(pairwise = pairwise)
+
+        p_first = self.p_arms[first]
+        p_second = self.p_arms[second]
+        n_first = self.n_arms[first]
+        n_second = self.n_arms[second]
+
+        if simulate:
+            if self.arm_uniforms is None or self.arm_uniforms.shape != (len(self.p_arms), draws):
+                self.binom_distribution(draws = draws, seed = seed)
+            p_values = self.simulate_significance(first, second)
+            unresolved = p_values < 1 / draws
+            engines = np.where(unresolved, 'importance', 'simulation')
+            for i in np.flatnonzero(unresolved):
+                params = core.ExperimentParams(p_control = p_first[i], p_treatment = p_second[i],
+                                               n_control = int(n_first[i]), n_treatment = int(n_second[i]))
+                p_values[i], _ = core.tail_significance(params, seed = seed)
+        else:
+            p_values = analytic.significance(p_first, p_second, n_first, n_second)
+            engines = np.full(len(p_values), 'analytic')
+
+        results = pd.DataFrame({
+            'control': [self.names[i] for i in first],
+            'treatment': [self.names[i] for i in second],
+            'p_control': p_first,
+            'p_treatment': p_second,
+            'effect_size': p_second - p_first,
+            'p_value': p_values,
+            'power': analytic.power(p_first, p_second, n_first, n_second, alpha = self.alpha),
+            'engine': engines
+        })
+
+        if correction:
+            results['p_adjusted'] = adjust_p_values(p_values, method = correction)
+            results['significant'] = results['p_adjusted'] < self.alpha
+        else:
+            results['significant'] = results['p_value'] < self.alpha
+
+        self.results = results
+
+        if summary:
+            print(self)
+
+        return results
+
+    def __repr__(self):
+        """
+        Magic method that outputs the arms and, once evaluated, the comparisons.
+        """
+        header = '|||Multi-Arm Experiment Readout|||\n'
+        arms = pd.DataFrame({'Probability': ['{:.2%}'.format(p) for p in self.p_arms],
+                             'Sample Size': ['{:,}'.format(n) for n in self.n_arms]},
+                            index = [str(name) + (' (control)' if i == self.control else '') for i, name in enumerate(self.names)])
+        readout = header + str(arms)
+
+        if self.results is not None:
+            readout += '\n\n' + str(self.results)
+
+        return readout
@@ -6,6 +6,10 @@ import os
 
 import plotly.graph_objects as go
 
+from modules.bootstrap import poisson_bootstrap
+from modules.cuped import cuped_moments
+from modules import fastpath
+
 class NormalExperiment():
     """
     Used to plan and evaluate experiments that contrast averages (rather than
@@ -24,7 +28,8 @@ class NormalExperiment():
     Also, this class is designed to be used as the backend of a web application
     that helps marketers plan and understand optimization experiments.
     """
-    def __init__(self, u_control = 0, u_treatment = 0, n_control = 0, n_treatment = 0, power = None, alpha = 0.05):
+    def __init__(self, u_control = 0, u_treatment = 0, n_control = 0, n_treatment = 0, power = None, alpha = 0.05,
+                 var_control = None, var_treatment = None):
         """
         Only two required args are u_control and u_treatment (the means).
 
@@ -33,6 +38,11 @@ class NormalExperiment():
         experiment's results worthwhile.
 
         So, those two values are already on-hand.
+
+        Unlike proportions, means don't imply their own variance. var_control and
+        var_treatment (per-observation variances) are needed for significance, power and
+        sample size. ingest_data() fills them in from a dataset. Until one or the other
+        sets them, those methods raise a ValueError.
         """
         self.u_control = u_control
         self.u_treatment = u_treatment
@@ -40,6 +50,13 @@ class NormalExperiment():
         self.n_control = n_control
         self.n_treatment = n_treatment
 
+        self.var_control = var_control
+        self.var_treatment = var_treatment
+
+        # CUPED regression coefficient. Stays None unless ingest_data() is given a covariate.
+        self.theta = None
+        self.variance_reduction = None
+
         self.norm_null = None
         self.norm_alt = None
 
@@ -66,3 +83,222 @@ class NormalExperiment():
 
         self.alpha = alpha
         self.p_value = None
+
+    def estimate_sample(self, power = None, alpha = None):
+        """
+        Take desired effect size, alpha and desired power level from self. Return a minimum sample size (one group)
+        that would be necessary to acheive the desired experiment results.
+
+        Mirrors BinomialExperiment.estimate_sample(), but with the variances stored on self.
+        So, CUPED-adjusted variances from ingest_data() translate directly into smaller samples.
+        A power supplied here is a what-if and does not change self.n_control or self.n_treatment.
+        """
+        if power == None:
+            power = self.power
+        elif not (power > 0 and power < 1):
+            raise ValueError('Power provided is impossible (1, 0 or negative). Please provide a positive power between 0 and 1.')
+
+        if alpha == None:
+            alpha = self.alpha
+        elif not (alpha > 0 and alpha < 1):
+            raise ValueError('Alpha provided is impossible (1, 0 or negative). Please provide a positive power between 0 and 1.')
+
+        self.check_variances()
+        sample_size = fastpath.sample_size(self.u_control, self.u_treatment, power = power, alpha = alpha,
+                                           var_control = self.var_control, var_treatment = self.var_treatment)
+
+        if power == self.power:
+            self.n_control = sample_size
+            self.n_treatment = sample_size
+
+        return sample_size
+
+    def check_variances(self):
+        """
+        Raise a ValueError unless both per-observation variances are known. Called by every
+        method that needs them, since means alone don't imply a variance.
+        """
+        missing = [name for name in ('var_control', 'var_treatment') if getattr(self, name) == None]
+        if missing:
+            raise ValueError('{} needed. Pass them to the constructor, or call ingest_data() on a dataset.'.format(' and '.join(missing)))
+
+    def norm_distribution(self):
+        """
+        Normal sampling distributions of the difference in means under the null (mean 0)
+        and the alt (mean u_treatment - u_control). Same construction as
+        BinomialExperiment.norm_distribution().
+        """
+        self.check_variances()
+        sterror_null = np.sqrt((self.var_control / self.n_control) + (self.var_control / self.n_control))
+        sterror_alt = np.sqrt((self.var_treatment / self.n_treatment) + (self.var_control / self.n_control))
+
+        self.sterror_null = sterror_null
+        self.sterror_alt = sterror_alt
+
+        self.norm_null = stats.norm(loc = 0, scale = sterror_null)
+        self.norm_alt = stats.norm(loc = self.u_treatment - self.u_control, scale = sterror_alt)
+
+    def analyze_significance(self):
+        """
+        One-tailed z test of the difference in means, using each group's own variance.
+
+        Null: Treatment Mean - Control Mean <= 0
+        Alt: Treatment Mean - Control Mean > 0
+        """
+        self.check_variances()
+        self.p_value = fastpath.significance(self.u_control, self.u_treatment, self.n_control, self.n_treatment,
+                                             var_control = self.var_control, var_treatment = self.var_treatment)
+
+        return self.p_value
+
+    def simulate_power(self):
+        """
+        Takes results of a completed experiment and reveals the statistical power of the significance conclusion.
+        """
+        self.check_variances()
+        self.power = fastpath.power(self.u_control, self.u_treatment, self.n_control, self.n_treatment, alpha = self.alpha,
+                                    var_control = self.var_control, var_treatment = self.var_treatment)
+
+        return self.power
+
+    def ingest_data(self, data, control_name, treatment_name, group_col = None, outcome_col = None,
+                    covariate = None, evaluate = True, chunk_size = 100000, summary = False):
+        """
+        Populate means, variances and sample sizes from a dataset of group assignments
+        and continuous outcomes, in one streaming pass.
+
+        When covariate names a column of pre-experiment values (e.g. each user's spend
+        in the month before the test), the analysis is CUPED-adjusted: the means and
+        variances stored on self are those of y - theta * (x - mean(x)). Significance,
+        power and sample size methods then work off the reduced variance as-is.
+
+        args:
+            data: dataframe (or iterable of dataframes) of group, outcome and optional covariate columns
+            control_name: name of the control group as appears in group column
+            treatment_name: name of treatment group as appears in group column
+            group_col: name of the group column. Defaults to the first column.
+            outcome_col: name of the outcome column. Defaults to the second column.
+            covariate: name of the pre-experiment covariate column. None skips the adjustment.
+            evaluate: when true, calcs power and p value for the class instance
+            chunk_size: rows read per update
+            summary: when true, prints the readout
+        """
+        if group_col == None or outcome_col == None:
+            if not hasattr(data, 'columns'):
+                raise ValueError('group_col and outcome_col are required when data is an iterable of chunks.')
+            columns = [col for col in data.columns if col != covariate]
+            group_col = columns[0] if group_col == None else group_col
+            outcome_col = columns[1] if outcome_col == None else outcome_col
+
+        moments = cuped_moments(data, group_col, outcome_col, control_name, treatment_name,
+                                covariate_col = covariate, chunk_size = chunk_size)
+
+        self.u_control = moments['mean_control']
+        self.u_treatment = moments['mean_treatment']
+        self.n_control = moments['n_control']
+        self.n_treatment = moments['n_treatment']
+        self.var_control = moments['var_control']
+        self.var_treatment = moments['var_treatment']
+
+        control = self.u_control * self.n_control
+        treatment = self.u_treatment * self.n_treatment
+        self.u_sample = (control + treatment) / (self.n_control + self.n_treatment)
+
+        if covariate != None:
+            self.theta = moments['theta']
+            self.variance_reduction = moments['variance_reduction']
+        else:
+            self.theta = None
+            self.variance_reduction = None
+
+        if evaluate:
+            self.analyze_significance()
+            self.simulate_power()
+
+        if summary:
+            print(self)
+
+    def bootstrap(self, data, control_name, treatment_name, group_col = None, outcome_col = None,
+                  replicates = 2000, level = 95, chunk_size = 2000, workers = 1, seed = None):
+        """
+        Evaluate a completed experiment with a Poisson bootstrap instead of a normal
+        approximation. Intended for heavy-tailed metrics like revenue, where sample means
+        converge to normal too slowly for the usual z test to be trusted.
+
+        Populates means, sample sizes, p value and level% percentile intervals for each
+        group and for the difference. Replicate means are kept in self.boot_control and
+        self.boot_treatment.
+
+        args:
+            data: dataframe (or iterable of dataframes, like pd.read_csv(..., chunksize = n))
+                with a group column and an outcome column
+            control_name: name of the control group as appears in group column
+            treatment_name: name of treatment group as appears in group column
+            group_col: name of the group column. Defaults to the first column.
+            outcome_col: name of the outcome column. Defaults to the second column.
+            replicates: number of bootstrap replicates
+            level: confidence level of the percentile intervals
+            chunk_size: rows processed per vectorized update
+            workers: processes to shard the chunks across
+            seed: seed for reproducible replicates
+        """
+        if group_col == None or outcome_col == None:
+            if not hasattr(data, 'columns'):
+                raise ValueError('group_col and outcome_col are required when data is an iterable of chunks.')
+            group_col = data.columns[0] if group_col == None else group_col
+            outcome_col = data.columns[1] if outcome_col == None else outcome_col
+
+        boot = poisson_bootstrap(data, group_col, outcome_col, control_name, treatment_name,
+                                 replicates = replicates, chunk_size = chunk_size,
+                                 workers = workers, seed = seed)
+
+        self.u_control = boot['u_control']
+        self.u_treatment = boot['u_treatment']
+        self.n_control = boot['n_control']
+        self.n_treatment = boot['n_treatment']
+
+        control = self.u_control * self.n_control
+        treatment = self.u_treatment * self.n_treatment
+        self.u_sample = (control + treatment) / (self.n_control + self.n_treatment)
+
+        self.boot_control = boot['boot_control']
+        self.boot_treatment = boot['boot_treatment']
+        differences = self.boot_treatment - self.boot_control
+
+        # Shift replicate differences to be centered on 0 (null: treatment - control <= 0),
+        # then see how often the null produces a difference as large as the one observed.
+        observed_difference = self.u_treatment - self.u_control
+        self.p_value = ((differences - observed_difference) >= observed_difference).mean()
+
+        margin = (100 - level) / 2
+        intervals = []
+        for replicate_means in (self.boot_control, self.boot_treatment, differences):
+            lower, upper = np.percentile(a = replicate_means, q = [margin, level + margin])
+            intervals.append({'lower': lower, 'upper': upper, 'level': level})
+
+        self.interval_control, self.interval_treatment, self.interval_difference = intervals
+
+        return self.p_value
+
+    # Readout row labels, renamed by subclasses that measure something other than a mean per observation
+    metric_label = 'Mean'
+    sample_label = 'Sample Size'
+
+    def __repr__(self):
+        """
+        Magic method that outputs the experiment's parameters, so far.
+        """
+        header = '|||Experiment Readout|||\n'
+        data = [['Control ' + self.metric_label, '{:,.4f}'.format(self.u_control)],
+               ['Treatment ' + self.metric_label, '{:,.4f}'.format(self.u_treatment)],
+               ['Effect Size', '{:,.4f}'.format(self.u_treatment - self.u_control)],
+               ['',''],
+               ['Control ' + self.sample_label, '{:,}'.format(self.n_control)],
+               ['Treatment ' + self.sample_label, '{:,}'.format(self.n_treatment)],
+               ['',''],
+               ['CUPED Variance Reduction', '{:.1%}'.format(self.variance_reduction) if self.variance_reduction != None else 'None'],
+               ['Statistical Power', '{:.3f}'.format(self.power) if self.power else 'None'],
+               ['Significance Threshold', '{:.3f}'.format(self.alpha)],
+               ['P Value', '{:.3f}'.format(self.p_value) if self.p_value != None else 'None']]
+
+        return header + str(pd.DataFrame(data = [x[1] for x in data], index = [x[0] for x in data], columns = ['']))
@@ -0,0 +1,191 @@
+"""
+Ratio metrics (clicks per session, orders per visit, revenue per pageview...) analyzed
+with the delta method.
+
+When units are randomized but the metric is a ratio of sums over events, events of the
+same unit aren't independent, so treating each event as its own Bernoulli trial
+understates the variance. Instead, numerator and denominator are summed per unit and
+the variance of the ratio of their means is approximated to first order (the delta
+method). That per-unit variance plugs straight into NormalExperiment's significance,
+power and sample size calculations.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules import core
+from modules.cuped import Moments
+from modules.functions import iter_chunks
+from modules.normal import NormalExperiment
+
+def aggregate_units(data, group_col, unit_col, numerator_col, denominator_col = None, chunk_size = 1000000,
+                    consolidate_rows = 5000000):
+    """
+    Sum numerator and denominator per (group, unit) in one pass over event-level rows.
+
+    Each chunk is reduced with one groupby. Partial sums are consolidated whenever they
+    hold more than consolidate_rows rows, so memory is bounded by the number of units
+    rather than the number of events. With no denominator_col, each row counts 1 toward
+    its unit's denominator (e.g. rows are sessions, the numerator is clicks).
+
+    Returns a dataframe indexed by (group, unit) with numerator and denominator columns.
+    """
+    partials = []
+    held = 0
+
+    for chunk in iter_chunks(data, chunk_size):
+        columns = {'numerator': chunk[numerator_col].to_numpy(dtype = np.float64),
+                   'denominator': chunk[denominator_col].to_numpy(dtype = np.float64) if denominator_col != None else np.ones(len(chunk))}
+        partial = pd.DataFrame(columns).groupby([chunk[group_col].to_numpy(), chunk[unit_col].to_numpy()]).sum()
+
+        partials.append(partial)
+        held += len(partial)
+
+        if held > consolidate_rows:
+            partials = [pd.concat(partials).groupby(level = [0, 1]).sum()]
+            held = len(partials[0])
+
+    if not partials:
+        raise ValueError('No rows found in data.')
+
+    totals = pd.concat(partials).groupby(level = [0, 1]).sum()
+    totals.index.names = [group_col, unit_col]
+
+    return totals
+
+def delta_moments(units, control_name, treatment_name, chunk_size = 1000000):
+    """
+    Ratio of means and its delta method variance for each group.
+
+    With per-unit numerators y and denominators x, the ratio is R = mean(y) / mean(x) and
+    var(R) ~ (var(y) - 2 * R * cov(x, y) + R^2 * var(x)) / (n * mean(x)^2). The returned
+    variance is that bracket over mean(x)^2, a per-unit variance, so dividing it by the
+    number of units gives var(R) just like a plain mean's variance.
+
+    args:
+        units: output of aggregate_units()
+        control_name: name of the control group as appears in group column
+        treatment_name: name of treatment group as appears in group column
+        chunk_size: units folded into the moments per update
+
+    Returns a dict of n (units), ratio, var, mean_numerator and mean_denominator for each group.
+    """
+    groups = units.index.get_level_values(0)
+    result = {}
+
+    for label, name in (('control', control_name), ('treatment', treatment_name)):
+        group = units[groups == name]
+        moments = Moments()
+
+        for start in range(0, len(group), chunk_size):
+            block = group.iloc[start:start + chunk_size]
+            moments.update(block['numerator'].to_numpy(), block['denominator'].to_numpy())
+
+        if moments.n < 2:
+            raise ValueError('Need at least two units each for {} and {}.'.format(control_name, treatment_name))
+        if moments.mean_x == 0:
+            raise ValueError('Denominator of {} sums to 0, so its ratio is undefined.'.format(name))
+
+        ratio = moments.mean_y / moments.mean_x
+        var_y = moments.m2_y / (moments.n - 1)
+        var_x = moments.m2_x / (moments.n - 1)
+        cov_xy = moments.c_xy / (moments.n - 1)
+
+        result['n_' + label] = moments.n
+        result['ratio_' + label] = ratio
+        result['var_' + label] = (var_y - 2 * ratio * cov_xy + ratio ** 2 * var_x) / moments.mean_x ** 2
+        result['mean_numerator_' + label] = moments.mean_y
+        result['mean_denominator_' + label] = moments.mean_x
+
+    return result
+
+class RatioExperiment(NormalExperiment):
+    """
+    Used to plan and evaluate experiments on ratio metrics, where units (users, devices)
+    are randomized but the metric is a ratio of event sums (clicks per session, orders
+    per visit).
+
+    u_control and u_treatment are the ratios, n_control and n_treatment the number of
+    randomized units, and var_control and var_treatment the delta method per-unit variances
+    (see modules/ratio.py). With those in place, significance, power, sample size and the
+    readout all come from NormalExperiment unchanged. confidence_intervals() adds delta
+    method intervals of each ratio and of their difference.
+
+    Null: Treatment Ratio - Control Ratio <= 0
+    Alt: Treatment Ratio - Control Ratio > 0
+    """
+    metric_label = 'Ratio'
+    sample_label = 'Units'
+
+    def ingest_data(self, data, control_name, treatment_name, unit_col, numerator_col, denominator_col = None,
+                    group_col = None, evaluate = True, chunk_size = 1000000, summary = False):
+        """
+        Populate ratios, delta method variances and unit counts from event-level rows,
+        in one streaming pass.
+
+        args:
+            data: dataframe (or iterable of dataframes) of event rows
+            control_name: name of the control group as appears in group column
+            treatment_name: name of treatment group as appears in group column
+            unit_col: name of the randomization unit column (user id, device id...)
+            numerator_col: name of the column summed into the numerator (clicks, orders...)
+            denominator_col: name of the column summed into the denominator. None counts rows (sessions, visits...).
+            group_col: name of the group column. Defaults to the first column not named above.
+            evaluate: when true, calcs power, p value and 95% intervals for the class instance
+            chunk_size: rows per groupby
+            summary: when true, prints the readout
+        """
+        if group_col == None:
+            if not hasattr(data, 'columns'):
+                raise ValueError('group_col is required when data is an iterable of chunks.')
+            named = (unit_col, numerator_col, denominator_col)
+            group_col = [col for col in data.columns if col not in named][0]
+
+        units = aggregate_units(data, group_col, unit_col, numerator_col, denominator_col = denominator_col,
+                                chunk_size = chunk_size)
+        moments = delta_moments(units, control_name, treatment_name, chunk_size = chunk_size)
+
+        self.u_control = moments['ratio_control']
+        self.u_treatment = moments['ratio_treatment']
+        self.n_control = moments['n_control']
+        self.n_treatment = moments['n_treatment']
+        self.var_control = moments['var_control']
+        self.var_treatment = moments['var_treatment']
+
+        control = self.u_control * self.n_control
+        treatment = self.u_treatment * self.n_treatment
+        self.u_sample = (control + treatment) / (self.n_control + self.n_treatment)
+
+        if evaluate:
+            self.analyze_significance()
+            self.simulate_power()
+            self.confidence_intervals()
+
+        if summary:
+            print(self)
+
+    def confidence_intervals(self, level = 95):
+        """
+        level% delta method confidence intervals of the control ratio, the treatment ratio
+        and their difference, stored like bootstrap()'s in self.interval_control,
+        self.interval_treatment and self.interval_difference.
+
+        Each ratio's standard error is sqrt(var / n) with the per-unit delta method variance
+        (see delta_moments()). The groups are independent, so the difference's variance is
+        the sum of theirs.
+        """
+        self.check_variances()
+        params = core.ExperimentParams(p_control = self.u_control, p_treatment = self.u_treatment,
+                                       n_control = self.n_control, n_treatment = self.n_treatment,
+                                       var_control = self.var_control, var_treatment = self.var_treatment)
+        interval_control, interval_treatment = core.normal_intervals(params, level = level)
+
+        # Half widths add in quadrature, as the variances they come from do
+        margin = np.hypot(interval_control[1] - interval_control[0], interval_treatment[1] - interval_treatment[0]) / 2
+        difference = self.u_treatment - self.u_control
+        interval_difference = (float(difference - margin), float(difference + margin))
+
+        self.interval_control, self.interval_treatment, self.interval_difference = [
+            {'lower': lower, 'upper': upper, 'level': level} for lower, upper in (interval_control, interval_treatment, interval_difference)]
+
+        return self.interval_control, self.interval_treatment, self.interval_difference
@@ -0,0 +1,226 @@
+"""
+One HTML report for a whole portfolio of experiments.
+
+Experiments are evaluated in parallel worker processes, and each one's section (a
+readout table plus its figures) is appended to the file as soon as it's ready, so
+memory stays flat however many experiments there are and a partial report is readable
+while the rest is still running. An overview table of every experiment is written last
+and moved to the top of the page when it's opened.
+
+Figures are embedded as compact JSON specs (see figures.compact()) rather than rendered
+HTML. plotly.js draws each one only when it scrolls into view, so a report of hundreds
+of experiments opens as fast as a report of one.
+"""
+
+import html
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from modules.figures import compact, to_json
+
+# figure name -> BinomialExperiment plot method, shared with app/run.py's /api/figure
+FIGURES = {'p': 'plot_p',
+           'power': 'plot_power',
+           'confidence': 'plot_confidence',
+           'power_curve': 'plot_power_curve',
+           'simulated_power': 'plot_simulated_power'}
+
+HEAD = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
+<style>
+body {{font-family: sans-serif; margin: 2em;}}
+table {{border-collapse: collapse; margin-bottom: 1em;}}
+td, th {{border: 1px solid #ccc; padding: 0.2em 0.6em; text-align: right;}}
+.figures {{display: flex; flex-wrap: wrap;}}
+.figure {{width: 800px; height: 600px;}}
+.error {{color: #b00;}}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+"""
+
+# Draws each figure from its JSON spec once it's near the viewport, and moves the
+# overview (written last) to the top of the page.
+TAIL = """<script>
+const draw = (div) => {
+    const spec = JSON.parse(document.getElementById(div.dataset.spec).textContent);
+    Plotly.newPlot(div, spec.data, spec.layout);
+};
+const observer = new IntersectionObserver((entries) => {
+    for (const entry of entries) {
+        if (entry.isIntersecting) {
+            observer.unobserve(entry.target);
+            draw(entry.target);
+        }
+    }
+}, {rootMargin: '400px'});
+document.querySelectorAll('.figure').forEach((div) => observer.observe(div));
+const overview = document.getElementById('overview');
+document.querySelector('h1').after(overview);
+</script>
+</body>
+</html>
+"""
+
+READOUT = [('Control Probability', 'p_control', '{:.2%}'),
+           ('Treatment Probability', 'p_treatment', '{:.2%}'),
+           ('Control Sample Size', 'n_control', '{:,}'),
+           ('Treatment Sample Size', 'n_treatment', '{:,}'),
+           ('Statistical Power', 'power', '{:.3f}'),
+           ('Significance Threshold', 'alpha', '{:.3f}'),
+           ('P Value', 'p_value', '{:.3g}'),
+           ('Engine', 'engine', '{}')]
+
+def _format(value, template):
+    return 'None' if value == None else template.format(value)
+
+def evaluate_section(name, fields, figures = ('p', 'power', 'confidence'), draws = 100000, seed = None):
+    """
+    Evaluate (or, without sample sizes, plan) one experiment and build its figure specs.
+    Runs in a worker process, so it only takes and returns plain values.
+
+    Returns (name, result dict, [(figure name, compact spec JSON)], error message or None).
+    """
+    from modules.binomial import BinomialExperiment
+
+    try:
+        experiment = BinomialExperiment(p_control = fields['p_control'],
+                                        p_treatment = fields['p_treatment'],
+                                        n_control = fields.get('n_control', 0),
+                                        n_treatment = fields.get('n_treatment', 0),
+                                        power = fields.get('power', 0.8),
+                                        alpha = fields.get('alpha', 0.05),
+                                        draws = draws,
+                                        seed = seed)
+
+        planned = not (experiment.n_control > 0 and experiment.n_treatment > 0)
+        result = experiment.plan() if planned else experiment.evaluate()
+
+        specs = [(figure, to_json(compact(getattr(experiment, FIGURES[figure])(spec = True)))) for figure in figures]
+    except KeyError as error:
+        return name, None, [], 'Missing field {}.'.format(error.args[0])
+    except (TypeError, ValueError, ZeroDivisionError) as error:
+        return name, None, [], str(error) or type(error).__name__
+    except Exception as error:
+        # Anything else is a bug, but it's this experiment's alone. Report it in its
+        # section and keep going, rather than losing the rest of the portfolio.
+        return name, None, [], '{}: {}'.format(type(error).__name__, error)
+
+    return name, result.to_dict(), specs, None
+
+def render_section(index, name, result, specs, error):
+    """
+    HTML of one experiment's section.
+    """
+    anchor = 'experiment-{}'.format(index)
+    parts = ['<section id="{}">'.format(anchor), '<h2>{}</h2>'.format(html.escape(str(name)))]
+
+    if error != None:
+        parts.append('<p class="error">Could not evaluate: {}</p>'.format(html.escape(error)))
+    else:
+        rows = ''.join('<tr><th>{}</th><td>{}</td></tr>'.format(label, _format(result[key], template))
+                       for label, key, template in READOUT)
+        parts.append('<table>{}</table>'.format(rows))
+
+        parts.append('<div class="figures">')
+        for figure, spec in specs:
+            spec_id = '{}-{}-spec'.format(anchor, figure)
+            # </ can't appear inside a script element, so escape it in the JSON
+            parts.append('<script type="application/json" id="{}">{}</script>'.format(spec_id, spec.replace('</', '<\\/')))
+            parts.append('<div class="figure" data-spec="{}"></div>'.format(spec_id))
+        parts.append('</div>')
+
+    parts.append('</section>\n')
+
+    return '\n'.join(parts)
+
+def render_overview(rows):
+    """
+    HTML of the overview table: one linked row per experiment, in input order.
+    """
+    header = ''.join('<th>{}</th>'.format(label) for label in ['Experiment'] + [r[0] for r in READOUT])
+    body = []
+    for index, name, result, error in rows:
+        cells = ['<td style="text-align: left"><a href="#experiment-{}">{}</a></td>'.format(index, html.escape(str(name)))]
+        if error != None:
+            cells.append('<td class="error" colspan="{}">{}</td>'.format(len(READOUT), html.escape(error)))
+        else:
+            cells += ['<td>{}</td>'.format(_format(result[key], template)) for label, key, template in READOUT]
+        body.append('<tr>{}</tr>'.format(''.join(cells)))
+
+    return '<section id="overview"><h2>Overview</h2><table><tr>{}</tr>{}</table></section>\n'.format(header, ''.join(body))
+
+def write_report(experiments, filename, title = 'Experiment Portfolio', figures = ('p', 'power', 'confidence'),
+                 draws = 100000, seed = None, workers = None):
+    """
+    Evaluate a portfolio of experiments and write them all to one HTML file.
+
+    args:
+        experiments: dict of name -> experiment fields (p_control, p_treatment and either
+            n_control and n_treatment to evaluate, or power and alpha to plan), or a list of
+            such dicts, named by position
+        filename: HTML file to write
+        title: page title
+        figures: figures for each experiment, any of p, power, confidence, power_curve and simulated_power
+        draws: simulation draws per experiment
+        seed: seed for reproducible simulations
+        workers: worker processes. Defaults to the number of CPUs. 0 evaluates in this process.
+
+    Sections are written in the order experiments finish. Returns the overview rows:
+    (position, name, result dict or None, error message or None), in input order.
+    """
+    if not isinstance(experiments, dict):
+        experiments = dict(enumerate(experiments))
+
+    unknown = [figure for figure in figures if figure not in FIGURES]
+    if unknown:
+        raise ValueError('Unknown figures {}. Use any of {}.'.format(unknown, ', '.join(FIGURES)))
+
+    workers = os.cpu_count() if workers == None else workers
+    positions = {name: index for index, name in enumerate(experiments)}
+    rows = []
+
+    with open(filename, 'w') as f:
+        f.write(HEAD.format(title = html.escape(title)))
+
+        def write(section):
+            name, result, specs, error = section
+            f.write(render_section(positions[name], name, result, specs, error))
+            f.flush()
+            rows.append((positions[name], name, result, error))
+
+        if workers > 0:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                # Bounded in flight, so finished sections never pile up in memory
+                in_flight = deque()
+                for name, fields in experiments.items():
+                    in_flight.append(executor.submit(evaluate_section, name, fields, figures, draws, seed))
+                    if len(in_flight) >= 2 * workers:
+                        write(_first_done(in_flight))
+                while in_flight:
+                    write(_first_done(in_flight))
+        else:
+            for name, fields in experiments.items():
+                write(evaluate_section(name, fields, figures, draws, seed))
+
+        rows.sort(key = lambda row: row[0])
+        f.write(render_overview(rows))
+        f.write(TAIL)
+
+    return rows
+
+def _first_done(in_flight):
+    """
+    Remove and return the result of whichever future in the deque finishes first.
+    """
+    done, _ = wait(in_flight, return_when = FIRST_COMPLETED)
+    future = next(iter(done))
+    in_flight.remove(future)
+
+    return future.result()
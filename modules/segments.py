@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from modules import analytic
+from modules.functions import iter_chunks, adjust_p_values
+
+def aggregate_segments(data, group_col, outcome_col, segment_cols, chunk_size = 1000000):
+    """
+    Sum successes and count trials per (segment, arm) in one pass over the data.
+
+    Each chunk is reduced with a single groupby and the partial sums are folded into
+    a running table, so memory is bounded by the number of segments rather than rows.
+    Returns a dataframe indexed by the segment columns and the group column.
+    """
+    keys = list(segment_cols) + [group_col]
+    totals = None
+
+    for chunk in iter_chunks(data, chunk_size):
+        partial = chunk.groupby(keys, observed = True)[outcome_col].agg(['sum', 'count'])
+        totals = partial if totals is None else totals.add(partial, fill_value = 0)
+
+    if totals is None:
+        raise ValueError('No rows found in data.')
+
+    return totals.rename(columns = {'sum': 'successes', 'count': 'trials'})
+
+def segment_results(counts, control_name, treatment_name, alpha = 0.05, level = 95, correction = None):
+    """
+    Significance, power and confidence intervals for every segment at once.
+
+    args:
+        counts: output of aggregate_segments()
+        control_name: name of the control group as appears in group column
+        treatment_name: name of treatment group as appears in group column
+        alpha: significance threshold
+        level: confidence level of the intervals
+        correction: None, 'bonferroni', 'holm' or 'fdr_bh' to adjust p values across segments
+
+    Returns one row per segment. Segments missing an arm get NaN statistics.
+    """
+    group_col = counts.index.names[-1]
+    wide = counts.unstack(group_col)
+
+    n_control = wide['trials'].get(control_name, pd.Series(0, index = wide.index)).fillna(0).to_numpy()
+    n_treatment = wide['trials'].get(treatment_name, pd.Series(0, index = wide.index)).fillna(0).to_numpy()
+    s_control = wide['successes'].get(control_name, pd.Series(0, index = wide.index)).fillna(0).to_numpy()
+    s_treatment = wide['successes'].get(treatment_name, pd.Series(0, index = wide.index)).fillna(0).to_numpy()
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        p_control = s_control / n_control
+        p_treatment = s_treatment / n_treatment
+
+    control_lower, control_upper = analytic.intervals(p_control, n_control, level = level)
+    treatment_lower, treatment_upper = analytic.intervals(p_treatment, n_treatment, level = level)
+
+    results = pd.DataFrame({
+        'n_control': n_control.astype(np.int64),
+        'n_treatment': n_treatment.astype(np.int64),
+        'p_control': p_control,
+        'p_treatment': p_treatment,
+        'effect_size': p_treatment - p_control,
+        'p_value': analytic.significance(p_control, p_treatment, n_control, n_treatment),
+        'power': analytic.power(p_control, p_treatment, n_control, n_treatment, alpha = alpha),
+        'control_lower': control_lower,
+        'control_upper': control_upper,
+        'treatment_lower': treatment_lower,
+        'treatment_upper': treatment_upper
+    }, index = wide.index)
+
+    if correction:
+        results['p_adjusted'] = adjust_p_values(results['p_value'].to_numpy(), method = correction)
+        results['significant'] = results['p_adjusted'] < alpha
+    else:
+        results['significant'] = results['p_value'] < alpha
+
+    return results.reset_index()
@@ -0,0 +1,246 @@
+"""
+Long-running experiment server for the command line scripts.
+
+Every run of eval-experiment.py or plan-experiment.py pays for interpreter startup,
+the numpy/scipy/pandas imports and a cold simulation before doing any work. serve()
+pays those once: it keeps a pool of worker processes with everything imported and
+warmed up, and answers newline-delimited JSON requests over a Unix domain socket or
+stdin/stdout. request() is the matching client. It only needs the standard library,
+so forwarding a request costs a few milliseconds.
+
+One request per line:
+    {"id": 1, "action": "evaluate", "p_control": 0.1, "p_treatment": 0.12, "n_control": 5000, "n_treatment": 5000}
+    {"id": 2, "action": "plan", "p_control": 0.1, "p_treatment": 0.12, "power": 0.8, "alpha": 0.05}
+
+Optional fields are alpha, power, level, simulate (false for the analytic engine,
+which answers in microseconds), draws, seed and sampling (see core.evaluate()).
+Each request gets one line back, in the order received: {"id": ..., "result": {...}},
+where result is EvaluationResult.to_dict(), or {"id": ..., "error": "..."}. A request
+that fails for any reason gets an error line, and the server carries on with the next.
+Values that aren't finite numbers (NaN, infinity) are sent as null, so every line is
+strict JSON.
+"""
+
+import json
+import math
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+ACTIONS = ('evaluate', 'plan')
+PARAM_FIELDS = ('p_control', 'p_treatment', 'n_control', 'n_treatment', 'power', 'alpha')
+OPTION_FIELDS = ('level', 'simulate', 'draws', 'seed', 'sampling')
+VALIDATION_ERRORS = (TypeError, ValueError, KeyError, ZeroDivisionError)
+
+def _finite(value):
+    """
+    value with NaN and infinite floats (at any depth of dicts and lists) replaced by None.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+
+    return value
+
+def _request_id(line):
+    """
+    The id of a request line, if it can be read, for error lines about it.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+
+    return request.get('id') if isinstance(request, dict) else None
+
+def handle(request):
+    """
+    Answer one decoded request. Returns the response dict. Bad requests come back
+    as {'id': ..., 'error': message} rather than raising.
+    """
+    from dataclasses import replace
+
+    from modules import core
+
+    request_id = request.get('id') if isinstance(request, dict) else None
+
+    try:
+        if not isinstance(request, dict):
+            raise ValueError('Request must be a JSON object.')
+
+        action = request.get('action', 'evaluate')
+        if action not in ACTIONS:
+            raise ValueError('Unknown action {}. Use one of {}.'.format(action, ', '.join(ACTIONS)))
+
+        params = core.ExperimentParams(**{name: request[name] for name in PARAM_FIELDS if request.get(name) != None})
+        options = {name: request[name] for name in OPTION_FIELDS if request.get(name) != None}
+
+        if action == 'plan':
+            if params.power == None:
+                params = replace(params, power = 0.8)
+            result = core.plan(params, **options)
+        else:
+            if not (params.n_control > 0 and params.n_treatment > 0):
+                raise ValueError('evaluate needs n_control and n_treatment greater than 0.')
+            result = core.evaluate(params, **options)
+
+        return {'id': request_id, 'result': _finite(result.to_dict())}
+    except VALIDATION_ERRORS as error:
+        return {'id': request_id, 'error': str(error)}
+    except Exception as error:
+        # Anything else (like OverflowError from absurd sample sizes) fails this request only
+        return {'id': request_id, 'error': '{}: {}'.format(type(error).__name__, error)}
+
+def handle_line(line):
+    """
+    Answer one NDJSON request line with one NDJSON response line (no trailing newline).
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as error:
+        return json.dumps({'id': None, 'error': 'Invalid JSON: {}'.format(error)})
+
+    return json.dumps(handle(request), allow_nan = False)
+
+def _collect(future, line):
+    """
+    Response line of a submitted request, or an error line if its worker failed.
+    """
+    try:
+        return future.result()
+    except Exception as error:
+        return json.dumps({'id': _request_id(line), 'error': '{}: {}'.format(type(error).__name__, error)})
+
+def _warm():
+    """
+    Worker initializer: import everything and run one small evaluation, so the first
+    real request doesn't pay for imports, scipy's lazy setup or the quantile caches.
+    """
+    handle({'action': 'evaluate', 'p_control': 0.1, 'p_treatment': 0.11, 'n_control': 1000, 'n_treatment': 1000, 'draws': 1000})
+    handle({'action': 'plan', 'p_control': 0.1, 'p_treatment': 0.11, 'simulate': False})
+
+def _answer(lines, write, executor, workers):
+    """
+    Answer request lines in order, keeping up to two requests per worker in flight.
+    Without an executor, requests are answered in this process, one at a time.
+    """
+    if executor == None:
+        for line in lines:
+            if line.strip():
+                write(handle_line(line))
+        return
+
+    in_flight = deque()
+    limit = 2 * workers
+
+    for line in lines:
+        if not line.strip():
+            continue
+        in_flight.append((executor.submit(handle_line, line), line))
+        if len(in_flight) >= limit:
+            write(_collect(*in_flight.popleft()))
+
+    while in_flight:
+        write(_collect(*in_flight.popleft()))
+
+def serve(path = None, workers = None):
+    """
+    Answer NDJSON requests until interrupted (or, on stdin, until end of input).
+
+    args:
+        path: Unix domain socket to listen on. None or '-' reads stdin and writes stdout.
+        workers: worker processes, warmed up before the first request. Defaults to the
+            number of CPUs. 0 answers requests in the serving process itself.
+    """
+    workers = os.cpu_count() if workers == None else workers
+
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers = workers, initializer = _warm)
+        # Start every worker now, rather than on the first requests
+        for future in [executor.submit(int) for _ in range(workers)]:
+            future.result()
+    else:
+        executor = None
+        _warm()
+
+    try:
+        if path == None or path == '-':
+            def write(response):
+                sys.stdout.write(response + '\n')
+                sys.stdout.flush()
+
+            _answer(sys.stdin, write, executor, workers)
+            return
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                def write(response):
+                    self.wfile.write((response + '\n').encode('utf-8'))
+                    self.wfile.flush()
+
+                _answer((line.decode('utf-8') for line in self.rfile), write, executor, workers)
+
+        if os.path.exists(path):
+            os.remove(path) # left behind by a server that didn't shut down cleanly
+
+        def stop(signum, frame):
+            raise KeyboardInterrupt
+
+        # Shut down (and remove the socket) on kill as well as on Ctrl+C
+        signal.signal(signal.SIGTERM, stop)
+
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            server.daemon_threads = True
+            print('Serving on {} with {} worker(s).'.format(path, workers), file = sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.remove(path)
+    finally:
+        if executor != None:
+            executor.shutdown()
+
+def request(path, requests):
+    """
+    Send requests to a server listening on the Unix domain socket at path. Requests are
+    dicts, or strings forwarded as-is (lines of JSON read from elsewhere, which the server
+    validates). Returns the response dicts, in order.
+
+    The server answers while it's still reading, so requests are sent from a separate
+    thread while this one reads responses. Sending everything first would deadlock on a
+    large batch once both socket buffers fill up.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        failed = []
+
+        def send():
+            try:
+                for r in requests:
+                    line = (r.strip() if isinstance(r, str) else json.dumps(r)) + '\n'
+                    client.sendall(line.encode('utf-8'))
+                client.shutdown(socket.SHUT_WR)
+            except OSError as error:
+                failed.append(error)
+
+        sender = threading.Thread(target = send, daemon = True)
+        sender.start()
+
+        with client.makefile('r', encoding = 'utf-8') as responses:
+            answers = [json.loads(line) for line in responses if line.strip()]
+
+        sender.join()
+        if failed:
+            raise failed[0]
+
+        return answers
@@ -0,0 +1,70 @@
+"""
+On-disk experiment state: parameters and results go to experiment.json, and each
+simulated array goes to its own .npy file beside it. .npy files can be opened with
+mmap_mode, so any number of processes can share one read-only copy of a simulation
+through the OS page cache instead of each holding (or regenerating) its own.
+"""
+
+import json
+import os
+
+import numpy as np
+
+STATE_FILE = 'experiment.json'
+
+def _encode(value):
+    """
+    json.dumps fallback for numpy scalars found among experiment attributes.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+def _write_atomic(path, write):
+    """
+    Write to a temporary file beside path, then rename it into place. Readers see
+    either the old file or the new one, never a partial write.
+    """
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        write(f)
+    os.replace(temp, path)
+
+def save_state(path, kind, params, arrays):
+    """
+    Save an experiment's state to the directory at path (created if needed).
+
+    args:
+        path: directory to write to
+        kind: class name of the experiment, checked on load
+        params: dict of JSON-serializable parameters and results
+        arrays: dict of name -> numpy array (None values are skipped)
+    """
+    os.makedirs(path, exist_ok = True)
+
+    saved = []
+    for name, array in arrays.items():
+        if array is None:
+            continue
+        _write_atomic(os.path.join(path, name + '.npy'), lambda f: np.save(f, np.asarray(array)))
+        saved.append(name)
+
+    state = {'kind': kind, 'params': params, 'arrays': saved}
+    _write_atomic(os.path.join(path, STATE_FILE), lambda f: f.write(json.dumps(state, default = _encode, indent = 2).encode('utf-8')))
+
+def load_state(path, kind, mmap_mode = 'r'):
+    """
+    Load what save_state() wrote. Returns (params, arrays).
+
+    With mmap_mode = 'r' (the default), arrays are read-only memory maps and nothing
+    is read from disk until it's used. mmap_mode = None reads them fully into memory.
+    """
+    with open(os.path.join(path, STATE_FILE)) as f:
+        state = json.load(f)
+
+    if state['kind'] != kind:
+        raise ValueError('{} holds a saved {}, not a {}.'.format(path, state['kind'], kind))
+
+    arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode = mmap_mode) for name in state['arrays']}
+
+    return state['params'], arrays
@@ -0,0 +1,117 @@
+"""
+Cumulative evaluation of an experiment over its lifetime.
+
+Rather than re-running ingest_data() and evaluate() on every day's slice of the data,
+rows are bucketed by time once, successes and trials are summed per (bucket, arm), and
+cumulative sums turn those into the running totals as of the end of each bucket. The
+whole trajectory of rates, p values, power and intervals is then one call to each of
+the array kernels in modules/analytic.py.
+
+P values along the trajectory are what a single evaluation at that point would report.
+They aren't corrected for looking at the experiment repeatedly.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules import analytic
+from modules.functions import iter_chunks
+
+def aggregate_timeseries(data, timestamp_col, group_col, outcome_col, control_name, treatment_name,
+                         interval = '1D', chunk_size = 1000000):
+    """
+    Sum successes and count trials per (time bucket, arm) in one pass over the data.
+
+    Buckets are interval wide (any pandas timedelta string: '1D', '6h', '15min'...) and
+    aligned to the epoch, like Series.dt.floor(). Rows of groups other than control and
+    treatment are dropped. Returns a dataframe indexed by bucket start, with successes
+    and trials columns for each arm (0 where an arm had no rows in a bucket).
+
+    Timezone-aware timestamps are bucketed on their own local clock, so daily buckets
+    start at local midnight (and the index keeps the timezone). Days where the clock
+    changes for daylight saving are 23 or 25 hours long. If chunks come in different
+    timezones, all are converted to the first chunk's. Mixing timezone-aware and naive
+    timestamps raises a ValueError.
+    """
+    step = pd.Timedelta(interval).value
+    if step <= 0:
+        raise ValueError('interval must be a positive length of time. Got {}.'.format(interval))
+
+    totals = None
+    tz = None
+    aware = None
+
+    for chunk in iter_chunks(data, chunk_size):
+        chunk = chunk[chunk[group_col].isin([control_name, treatment_name])]
+        stamps = pd.to_datetime(chunk[timestamp_col])
+
+        if aware == None:
+            aware = stamps.dt.tz is not None
+            tz = stamps.dt.tz
+        elif aware != (stamps.dt.tz is not None):
+            raise ValueError('{} mixes timezone-aware and naive timestamps.'.format(timestamp_col))
+        if aware:
+            # Local wall-clock time, so buckets split where the input's days do
+            stamps = stamps.dt.tz_convert(tz).dt.tz_localize(None)
+
+        timestamps = stamps.to_numpy(dtype = 'datetime64[ns]').view(np.int64)
+
+        partial = chunk[outcome_col].groupby([timestamps // step, chunk[group_col].to_numpy()]).agg(['sum', 'count'])
+        totals = partial if totals is None else totals.add(partial, fill_value = 0)
+
+    if totals is None or totals.empty:
+        raise ValueError('No {} or {} rows found in data.'.format(control_name, treatment_name))
+
+    wide = totals.unstack(fill_value = 0).sort_index()
+    wide.index = pd.to_datetime(wide.index.to_numpy() * step)
+    if aware:
+        # A bucket starting in a repeated hour is the first one. One in a skipped hour starts after it.
+        wide.index = wide.index.tz_localize(tz, ambiguous = np.ones(len(wide.index), dtype = bool),
+                                            nonexistent = 'shift_forward')
+    wide.index.name = timestamp_col
+
+    counts = pd.DataFrame(index = wide.index)
+    for arm, name in (('control', control_name), ('treatment', treatment_name)):
+        counts['successes_' + arm] = wide['sum'][name] if name in wide['sum'] else 0
+        counts['trials_' + arm] = wide['count'][name] if name in wide['count'] else 0
+
+    return counts
+
+def cumulative_results(counts, alpha = 0.05, level = 95):
+    """
+    Significance, power and confidence intervals as of the end of every time bucket.
+
+    args:
+        counts: output of aggregate_timeseries()
+        alpha: significance threshold
+        level: confidence level of the intervals
+
+    Returns one row per bucket. Buckets before both arms have data get NaN statistics.
+    """
+    totals = counts.cumsum().to_numpy(dtype = np.float64)
+    s_control, n_control, s_treatment, n_treatment = totals.T
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        p_control = s_control / n_control
+        p_treatment = s_treatment / n_treatment
+
+    control_lower, control_upper = analytic.intervals(p_control, n_control, level = level)
+    treatment_lower, treatment_upper = analytic.intervals(p_treatment, n_treatment, level = level)
+    p_values = analytic.significance(p_control, p_treatment, n_control, n_treatment)
+
+    results = pd.DataFrame({
+        'n_control': n_control.astype(np.int64),
+        'n_treatment': n_treatment.astype(np.int64),
+        'p_control': p_control,
+        'p_treatment': p_treatment,
+        'effect_size': p_treatment - p_control,
+        'p_value': p_values,
+        'power': analytic.power(p_control, p_treatment, n_control, n_treatment, alpha = alpha),
+        'control_lower': control_lower,
+        'control_upper': control_upper,
+        'treatment_lower': treatment_lower,
+        'treatment_upper': treatment_upper,
+        'significant': p_values < alpha
+    }, index = counts.index)
+
+    return results.reset_index()
@@ -1,12 +1,10 @@
 import argparse
+import json
 import os
 import sys
-from PIL import Image
 import webbrowser
 
-from modules.binomial import BinomialExperiment
-from modules.functions import create_dashboard
-from modules.functions import save_images
+from modules.server import serve, request
 
 os.chdir(os.path.dirname(sys.argv[0]))
 
@@ -16,9 +14,11 @@ parser = argparse.ArgumentParser(description = 'Plan an experiment by providing
 
 # Add command line arguments to interpret
 parser.add_argument('p_control',
+                    nargs = '?',
                     type = float,
                     help = 'The expected outcome rate of your control group (status quo outcome rate)')
 parser.add_argument('p_treatment',
+                    nargs = '?',
                     type = float,
                     help = 'The expected outcome rate of your treatment group (target outcome rate of the change you want to test)')
 parser.add_argument('--power',
@@ -30,6 +30,15 @@ parser.add_argument('--alpha',
 parser.add_argument('--show',
                     type = str,
                     help = 'Optional (default no). Yes will generate plots in your default web browser. No skips that step.')
+parser.add_argument('--serve',
+                    type = str,
+                    help = 'Optional. Run as a server on this Unix socket path ("-" for stdin/stdout), answering newline-delimited JSON requests (see modules/server.py).')
+parser.add_argument('--workers',
+                    type = int,
+                    help = 'Optional (default: number of CPUs). Warm worker processes for --serve.')
+parser.add_argument('--connect',
+                    type = str,
+                    help = 'Optional. Send this plan to the server on this Unix socket path and print its JSON response. With no plan arguments, forwards JSON requests from stdin instead.')
 
 def validate_cmd(args):
     """
@@ -68,17 +77,46 @@ def validate_cmd(args):
 
     return p_control, p_treatment, power, alpha, show
 
+def forward(args):
+    """
+    Client mode: send this plan (or, with no plan arguments, the JSON requests on stdin)
+    to the server at args.connect and print the responses, one JSON line each.
+    """
+    if args.p_control == None:
+        requests = [line for line in sys.stdin if line.strip()]
+    else:
+        p_control, p_treatment, power, alpha, show = validate_cmd(args)
+        requests = [{'action': 'plan', 'p_control': p_control, 'p_treatment': p_treatment,
+                     'power': power, 'alpha': alpha}]
+
+    for response in request(args.connect, requests):
+        print(json.dumps(response))
+
 def main():
     """
     Function controlling the app's flow. Execute this when this file is run, directly.
     """
     args = parser.parse_args()
+
+    # Server and client modes are dispatched before the analysis imports below, which are
+    # most of this script's startup time.
+    if args.serve:
+        return serve(args.serve, workers = args.workers)
+    if args.connect:
+        return forward(args)
+
+    if None in (args.p_control, args.p_treatment):
+        parser.error('p_control and p_treatment are required.')
+
+    from modules.binomial import BinomialExperiment
+    from modules.functions import create_dashboard, save_images
+
     p_control, p_treatment, power, alpha, show = validate_cmd(args)
     experiment = BinomialExperiment(p_control = p_control,
                                     p_treatment = p_treatment,
                                     power = power,
                                     alpha = alpha)
-    figs = experiment.plan(plot = True)
+    result, figs = experiment.plan(plot = True, summary = True)
     if show:
         save_location = 'images/plan'
         filename = '/dashboard.html'
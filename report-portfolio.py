@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import webbrowser as wb
+
+import pandas as pd
+
+from modules.report import write_report, FIGURES
+
+# No matter how this script is run, make sure it treats its own directory as the working directory
+os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
+
+# Parse command line arguments
+# Instantiate parser
+parser = argparse.ArgumentParser(description = 'Evaluate (or plan) every experiment in a CSV file and write them all to one HTML report.')
+
+# Add command line arguments to interpret
+parser.add_argument('experiments',
+                    type = str,
+                    help = 'CSV with a name column and p_control, p_treatment, and either n_control and n_treatment (evaluate) or power and alpha (plan) columns.')
+parser.add_argument('--output',
+                    type = str,
+                    default = 'images/portfolio.html',
+                    help = 'Optional (default images/portfolio.html). Where to write the report.')
+parser.add_argument('--figures',
+                    type = str,
+                    default = 'p,power,confidence',
+                    help = 'Optional (default p,power,confidence). Comma separated figures per experiment, any of: {}.'.format(', '.join(FIGURES)))
+parser.add_argument('--draws',
+                    type = int,
+                    default = 100000,
+                    help = 'Optional (default 100,000). Simulation draws per experiment.')
+parser.add_argument('--workers',
+                    type = int,
+                    help = 'Optional (default: number of CPUs). Experiments evaluated in parallel.')
+parser.add_argument('--show',
+                    type = str,
+                    help = 'Optional (default no). When yes, open the report in the default web browser.')
+
+def main():
+    """
+    Function controlling the app's flow. Execute this when this file is run, directly.
+    """
+    args = parser.parse_args()
+
+    table = pd.read_csv(args.experiments)
+    if 'name' not in table.columns:
+        raise ValueError('{} needs a name column.'.format(args.experiments))
+    duplicated = table['name'][table['name'].duplicated()].unique()
+    if len(duplicated):
+        raise ValueError('{} has duplicate names, which would overwrite each other: {}.'.format(args.experiments, ', '.join(map(str, duplicated))))
+
+    # Drop empty cells, so plans don't pick up NaN sample sizes
+    experiments = {row['name']: {key: value for key, value in row.items() if key != 'name' and pd.notna(value)}
+                   for row in table.to_dict(orient = 'records')}
+    for fields in experiments.values():
+        for key in ('n_control', 'n_treatment'):
+            if key in fields:
+                fields[key] = int(fields[key])
+
+    folder = os.path.dirname(args.output)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    rows = write_report(experiments, args.output, figures = args.figures.split(','), draws = args.draws, workers = args.workers)
+    failed = sum(1 for row in rows if row[3] != None)
+    print('Wrote {} experiments to {} ({} could not be evaluated).'.format(len(rows), args.output, failed))
+
+    if args.show and args.show.lower() == 'yes':
+        wb.open('file://' + os.path.abspath(args.output))
+
+if __name__ == '__main__':
+    main()
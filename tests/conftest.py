@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules/ lives one directory up from the tests, like it does for the scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+"""
+The Flask API in app/run.py.
+"""
+
+import pytest
+
+pytest.importorskip('flask')
+
+from app.run import app
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+def test_evaluate(client):
+    response = client.post('/api/evaluate', json = {'p_control': 0.1, 'p_treatment': 0.12, 'n_control': 5000,
+                                                    'n_treatment': 5000, 'simulate': False})
+
+    assert response.status_code == 200
+    result = response.get_json()['result']
+    assert result['engine'] == 'analytic'
+    assert 0 < result['p_value'] < 0.01
+
+def test_errors_are_400(client):
+    assert client.post('/api/evaluate', json = {'p_control': 0.1}).status_code == 400
+    assert client.post('/api/figure', json = {'p_control': 0.1, 'p_treatment': 0.12, 'figure': 'pie'}).status_code == 400
+    assert client.post('/api/batch', json = {'requests': 'no'}).status_code == 400
+
+def test_batch_answers_each_request(client):
+    response = client.post('/api/batch', json = {'requests': [
+        {'action': 'plan', 'p_control': 0.1, 'p_treatment': 0.12, 'simulate': False},
+        {'action': 'evaluate', 'p_control': 0.1}]})
+
+    assert response.status_code == 200
+    responses = response.get_json()['responses']
+    assert 'result' in responses[0] and 'error' in responses[1]
+
+def test_figure(client):
+    response = client.post('/api/figure', json = {'p_control': 0.1, 'p_treatment': 0.12, 'figure': 'power', 'draws': 10000})
+
+    assert response.status_code == 200
+    spec = response.get_json()
+    assert 'data' in spec and 'layout' in spec
@@ -0,0 +1,64 @@
+"""
+Closed-form Beta-Binomial comparisons (modules/bayesian.py), against numerical integration.
+"""
+
+import numpy as np
+import pytest
+import scipy.stats as stats
+from scipy.integrate import quad
+
+from modules.bayesian import bayesian_summary, prob_greater
+
+def integrated(a_c, b_c, a_t, b_t):
+    """
+    P(p_t > p_c), E[max(p_c - p_t, 0)] and E[max(p_t - p_c, 0)] by quadrature over p_t.
+    """
+    control, treatment = stats.beta(a_c, b_c), stats.beta(a_t, b_t)
+    options = dict(points = treatment.ppf([0.001, 0.5, 0.999]), limit = 200)
+
+    prob = quad(lambda p: treatment.pdf(p) * control.cdf(p), 0, 1, **options)[0]
+    # E[max(p_t - p_c, 0) | p_t] = p_t F_c(p_t) - E[p_c 1{p_c < p_t}], with E[p_c 1{p_c < x}] = mean_c F'(x)
+    shifted = stats.beta(a_c + 1, b_c)
+    mean_c = a_c / (a_c + b_c)
+    loss_control = quad(lambda p: treatment.pdf(p) * (p * control.cdf(p) - mean_c * shifted.cdf(p)), 0, 1, **options)[0]
+    loss_treatment = loss_control + mean_c - a_t / (a_t + b_t)
+
+    return prob, loss_treatment, loss_control
+
+@pytest.mark.parametrize('s_control, n_control, s_treatment, n_treatment', [
+    (10, 100, 15, 100),
+    (120, 1000, 100, 1000),   # the sum runs over control's smaller alpha
+    (3, 40, 0, 25),
+    (450, 5000, 520, 5200)
+])
+def test_matches_quadrature(s_control, n_control, s_treatment, n_treatment):
+    summary = bayesian_summary(s_control, n_control, s_treatment, n_treatment)
+    prob, loss_treatment, loss_control = integrated(1 + s_control, 1 + n_control - s_control,
+                                                    1 + s_treatment, 1 + n_treatment - s_treatment)
+
+    assert float(summary['prob_beat']) == pytest.approx(prob, abs = 1e-8)
+    assert float(summary['loss_treatment']) == pytest.approx(loss_treatment, abs = 1e-8)
+    assert float(summary['loss_control']) == pytest.approx(loss_control, abs = 1e-8)
+
+def test_normal_approximation_past_exact_limit():
+    """
+    Past exact_limit, the normal approximation stays close to the exact sum.
+    """
+    exact = prob_greater(1201, 8801, 1261, 8741, exact_limit = 2000)
+    approximate = prob_greater(1201, 8801, 1261, 8741, exact_limit = 1000)
+
+    assert approximate == pytest.approx(exact, abs = 2e-4)
+
+def test_vectorized_and_chunked():
+    """
+    Many experiments in one call give the same answers as one at a time, however the
+    exact terms are chunked.
+    """
+    rng = np.random.default_rng(0)
+    a_c, a_t = rng.integers(1, 300, size = (2, 40))
+    b_c, b_t = rng.integers(1, 3000, size = (2, 40))
+
+    together = prob_greater(a_c, b_c, a_t, b_t, chunk_size = 500)
+    alone = [float(prob_greater(*args)) for args in zip(a_c, b_c, a_t, b_t)]
+
+    assert together == pytest.approx(alone, abs = 1e-12)
@@ -0,0 +1,28 @@
+"""
+BinomialExperiment state: what new data clears and what it keeps.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules.binomial import BinomialExperiment
+
+def test_ingest_data_keeps_set_power():
+    """
+    New data clears results of the old data, but not the power the user planned for.
+    """
+    rng = np.random.default_rng(0)
+    n = 5000
+    data = pd.DataFrame({'group': np.repeat(['control', 'treatment'], n),
+                         'outcome': np.r_[rng.random(n) < 0.10, rng.random(n) < 0.11].astype(int)})
+
+    experiment = BinomialExperiment(0.1, 0.12, 5000, 5000, power = 0.9, draws = 10000, seed = 1)
+    experiment.simulate_significance()
+    assert experiment.p_value != None
+
+    result = experiment.ingest_data(data, 'control', 'treatment', evaluate = False)
+
+    assert experiment.power == 0.9
+    assert result.power == 0.9
+    assert result.p_value == None and result.p_value_error == None
+    assert experiment.binom_null is None and experiment.binom_tail_sums is None
@@ -0,0 +1,66 @@
+"""
+Poisson bootstrap of means (modules/bootstrap.py and NormalExperiment.bootstrap()).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+
+from modules.bootstrap import poisson_bootstrap
+from modules.normal import NormalExperiment
+
+def revenue(rng, rows = 20000, lift = 1.0):
+    """
+    Heavy-tailed (lognormal) outcomes, with treatment's scaled by lift.
+    """
+    group = rng.choice(['control', 'treatment'], size = rows)
+    values = rng.lognormal(1, 1.2, size = rows) * np.where(group == 'treatment', lift, 1)
+
+    return pd.DataFrame({'group': group, 'revenue': values})
+
+def test_replicate_spread_is_the_standard_error():
+    """
+    Replicate means spread like the sample mean's standard error, and center on it.
+    """
+    data = revenue(np.random.default_rng(0))
+    boot = poisson_bootstrap(data, 'group', 'revenue', 'control', 'treatment', replicates = 2000, seed = 1)
+
+    control = data.loc[data['group'] == 'control', 'revenue']
+    standard_error = control.std() / np.sqrt(len(control))
+
+    assert boot['n_control'] == len(control)
+    assert boot['u_control'] == pytest.approx(control.mean())
+    assert boot['boot_control'].std() == pytest.approx(standard_error, rel = 0.08)
+    assert boot['boot_control'].mean() == pytest.approx(control.mean(), abs = 4 * standard_error / np.sqrt(2000) + 1e-3)
+
+def test_workers_do_not_change_results():
+    data = revenue(np.random.default_rng(2), rows = 6000)
+    one = poisson_bootstrap(data, 'group', 'revenue', 'control', 'treatment', replicates = 200, chunk_size = 1000, seed = 3)
+    two = poisson_bootstrap(data, 'group', 'revenue', 'control', 'treatment', replicates = 200, chunk_size = 1000, seed = 3,
+                            workers = 2)
+
+    assert one['boot_treatment'] == pytest.approx(two['boot_treatment'], rel = 1e-12)
+
+def test_p_value_and_interval_agree_with_z_test():
+    """
+    With thousands of rows, the bootstrap p value and difference interval are close to
+    the z test's, since the sample means are nearly normal by then.
+    """
+    data = revenue(np.random.default_rng(4), rows = 20000, lift = 1.05)
+    experiment = NormalExperiment()
+    p_value = experiment.bootstrap(data, 'control', 'treatment', replicates = 2000, seed = 5)
+
+    groups = [data.loc[data['group'] == name, 'revenue'] for name in ('control', 'treatment')]
+    difference = groups[1].mean() - groups[0].mean()
+    standard_error = np.sqrt(sum(g.var() / len(g) for g in groups))
+
+    assert p_value == pytest.approx(stats.norm.sf(difference / standard_error), abs = 0.02)
+    assert experiment.interval_difference['lower'] == pytest.approx(difference - 1.96 * standard_error, abs = 0.2 * standard_error)
+    assert experiment.interval_difference['upper'] == pytest.approx(difference + 1.96 * standard_error, abs = 0.2 * standard_error)
+
+def test_missing_group():
+    data = revenue(np.random.default_rng(6), rows = 100)
+
+    with pytest.raises(ValueError, match = 'No rows found'):
+        poisson_bootstrap(data, 'group', 'revenue', 'control', 'holdout')
@@ -0,0 +1,96 @@
+"""
+SimulationConfig limits (modules/config.py) and the memory ceiling they promise.
+"""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from modules import config, core
+from modules.binomial import BinomialExperiment
+
+PARAMS = core.ExperimentParams(p_control = 0.1, p_treatment = 0.12, n_control = 5000, n_treatment = 5000)
+
+def peak_bytes(function):
+    """
+    Peak memory traced while function runs.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+@pytest.mark.filterwarnings('ignore:Sobol sampling runs')
+@pytest.mark.parametrize('dtype', config.DTYPES)
+@pytest.mark.parametrize('sampling', core.SAMPLING_SCHEMES)
+def test_evaluate_stays_under_ceiling(dtype, sampling):
+    """
+    A request for far more draws than fit is cut down so the whole evaluation, statistics
+    included, peaks under max_memory.
+    """
+    ceiling = config.SimulationConfig(max_draws = 10 ** 9, dtype = dtype, chunk_size = 100000, max_memory = 16 * 2 ** 20)
+
+    result = []
+    peak = peak_bytes(lambda: result.append(core.evaluate(PARAMS, draws = 10 ** 9, seed = 1, sampling = sampling, config = ceiling)))
+
+    assert peak < ceiling.max_memory
+    # and the ceiling is used, not just respected
+    budgeted = result[0].draws * core.simulation_bytes(dtype, sampling) + ceiling.chunk_size * config.CHUNK_BYTES
+    assert budgeted > ceiling.max_memory / 2
+
+def test_experiment_stays_under_ceiling():
+    """
+    The same holds for each simulation BinomialExperiment runs: its evaluation, power
+    curve and tail estimate.
+    """
+    ceiling = config.SimulationConfig(chunk_size = 100000, max_memory = 16 * 2 ** 20)
+    experiment = BinomialExperiment(0.1, 0.12, 5000, 5000, seed = 1, config = ceiling)
+
+    assert peak_bytes(experiment.evaluate) < ceiling.max_memory
+    assert peak_bytes(lambda: experiment.simulate_power_curve(draws = 10 ** 9)) < ceiling.max_memory
+    assert peak_bytes(lambda: experiment.simulate_tail_significance(draws = 10 ** 9)) < ceiling.max_memory
+
+def test_limits():
+    """
+    Draws are capped by max_draws and by memory, and plotted points by max_points.
+    """
+    limits = config.SimulationConfig(max_draws = 1000, max_points = 50)
+
+    assert limits.limit_draws(10 ** 6) == 1000
+    assert limits.limit_draws(10) == 10
+    assert limits.limit_points(10 ** 6) == 50
+    assert limits.limit_points(0) == 2
+
+    small = config.SimulationConfig(chunk_size = 1000, max_memory = 2 ** 20)
+    draws = small.limit_draws(10 ** 9, bytes_per_draw = 32)
+    assert draws * 32 + 1000 * config.CHUNK_BYTES <= small.max_memory < (draws + 1) * 32 + 1000 * config.CHUNK_BYTES
+
+def test_from_env():
+    """
+    EXPERIMENT_* variables set the fields they name, and bad values are rejected.
+    """
+    settings = config.from_env({'EXPERIMENT_MAX_DRAWS': '5000', 'EXPERIMENT_DTYPE': 'float32',
+                                'EXPERIMENT_MAX_MEMORY': '64M', 'EXPERIMENT_MAX_POINTS': ''})
+
+    assert settings == config.SimulationConfig(max_draws = 5000, dtype = 'float32', max_memory = 64 * 2 ** 20)
+    assert config.parse_bytes('2G') == 2 ** 31
+    assert config.parse_bytes('1.5K') == 1536
+
+    with pytest.raises(ValueError):
+        config.from_env({'EXPERIMENT_DTYPE': 'int8'})
+    with pytest.raises(ValueError):
+        config.SimulationConfig(max_draws = 0)
+
+def test_dtype_is_used():
+    """
+    Simulated distributions are stored in the config's dtype.
+    """
+    experiment = BinomialExperiment(0.1, 0.12, 5000, 5000, draws = 1000, seed = 1,
+                                    config = config.SimulationConfig(dtype = 'float32'))
+    experiment.binom_distribution()
+
+    assert experiment.binom_null.dtype == np.float32
+    assert len(experiment.binom_null) == 1000
@@ -0,0 +1,19 @@
+"""
+Tests for the functional core in modules/core.py.
+"""
+
+import copy
+import pickle
+
+from modules import core
+
+def test_evaluation_result_pickles():
+    """
+    Results survive pickling and deep copies, so they can come back from worker processes.
+    """
+    params = core.ExperimentParams(p_control = 0.1, p_treatment = 0.12, n_control = 5000, n_treatment = 5000)
+    result = core.evaluate(params, simulate = False)
+
+    assert pickle.loads(pickle.dumps(result)) == result
+    assert copy.deepcopy(result) == result
+    assert not hasattr(result, '__dict__')
@@ -0,0 +1,55 @@
+"""
+Plain-dict figure specs (modules/figures.py) and the plot methods that build them.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from modules.binomial import BinomialExperiment
+from modules.figures import compact, to_json, vline
+from modules.report import FIGURES
+
+go = pytest.importorskip('plotly.graph_objects')
+
+@pytest.fixture(scope = 'module')
+def experiment():
+    return BinomialExperiment(0.1, 0.12, 5000, 5000, draws = 20000, seed = 1)
+
+@pytest.mark.parametrize('name', FIGURES)
+def test_specs_are_valid_plotly(experiment, name):
+    """
+    Every figure's spec passes plotly's validation and survives JSON as plotly.js gets it.
+    """
+    spec = getattr(experiment, FIGURES[name])(spec = True)
+    figure = go.Figure(spec)
+
+    assert len(figure.data) == len(spec['data'])
+    assert json.loads(to_json(spec)).keys() == {'data', 'layout'}
+    # Built without a spec, the method returns the equivalent figure
+    assert getattr(experiment, FIGURES[name])().layout.title.text == figure.layout.title.text
+
+def test_vline_matches_add_vline():
+    shape, annotation = vline(0.3, annotation_text = 'P Crit', annotation_position = 'top right')
+
+    figure = go.Figure()
+    figure.add_vline(x = 0.3, line_width = 2, line_dash = 'dash', line_color = 'black', annotation_text = 'P Crit',
+                     annotation_position = 'top right')
+
+    assert go.layout.Shape(shape).to_plotly_json() == figure.layout.shapes[0].to_plotly_json()
+    assert go.layout.Annotation(annotation).to_plotly_json() == figure.layout.annotations[0].to_plotly_json()
+
+def test_compact_thins_and_rounds():
+    x = np.linspace(0, 1, 10001)
+    spec = {'data': [{'type': 'scatter', 'x': x, 'y': np.sin(x), 'mode': 'lines'},
+                     {'type': 'scatter', 'x': [0.123456789], 'y': [1]}],
+            'layout': {'title': 'T'}}
+    small = compact(spec, max_points = 500, digits = 4)
+
+    trace = small['data'][0]
+    assert len(trace['x']) <= 500 and len(trace['x']) == len(trace['y'])
+    assert trace['x'][0] == 0 and trace['x'][-1] == 1
+    assert small['data'][1]['x'][0] == 0.1235
+    assert small['layout'] == spec['layout']
+    assert len(spec['data'][0]['x']) == 10001
@@ -0,0 +1,56 @@
+"""
+Portfolio health checks (modules/health.py).
+"""
+
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+from modules.binomial import BinomialExperiment
+from modules.health import check_experiments, health_checks
+
+def test_srm_matches_chisquare():
+    """
+    SRM statistics and p values are scipy's chi-square goodness of fit, experiment by experiment.
+    """
+    rng = np.random.default_rng(0)
+    n_control = rng.integers(1000, 100000, size = 50)
+    n_treatment = rng.integers(1000, 100000, size = 50)
+    share = rng.uniform(0.2, 0.8, size = 50)
+    results = health_checks(n_control, n_treatment, n_control // 10, n_treatment // 10, expected_share = share)
+
+    for i in range(50):
+        total = n_control[i] + n_treatment[i]
+        expected = [total * share[i], total * (1 - share[i])]
+        statistic, p_value = stats.chisquare([n_control[i], n_treatment[i]], expected)
+        assert results['srm_chi_square'].iloc[i] == pytest.approx(statistic)
+        assert results['srm_p_value'].iloc[i] == pytest.approx(p_value, rel = 1e-9, abs = 1e-300)
+
+def test_srm_false_positive_rate():
+    """
+    Splits assigned correctly get flagged at about srm_alpha.
+    """
+    rng = np.random.default_rng(1)
+    total = 20000
+    n_control = rng.binomial(total, 0.5, size = 100000)
+    results = health_checks(n_control, total - n_control, 100, 100, srm_alpha = 0.01)
+
+    assert results['srm'].mean() == pytest.approx(0.01, abs = 0.002)
+
+def test_flags_and_issues():
+    results = health_checks([10000, 10000, 50, 10000, 11000], [10000, 10000, 50, 10000, 9000],
+                            [1000, 0, 5, 1000, 1100], [1100, 1000, 5, 10001, 900],
+                            names = ['ok', 'zero', 'small', 'invalid', 'srm'])
+
+    assert results['healthy'].to_dict() == {'ok': True, 'zero': False, 'small': False, 'invalid': False, 'srm': False}
+    assert results.loc['zero', 'issues'] == 'zero_variance_control'
+    assert results.loc['small', 'issues'] == 'small_sample'
+    assert 'invalid_counts' in results.loc['invalid', 'issues']
+    assert results.loc['srm', 'issues'] == 'srm'
+
+def test_check_experiments():
+    experiments = {'a': BinomialExperiment(0.1, 0.12, 5000, 5000), 'b': BinomialExperiment(0.1, 0.12, 5500, 4500)}
+    results = check_experiments(experiments)
+
+    assert list(results.index) == ['a', 'b']
+    assert list(results['healthy']) == [True, False]
@@ -0,0 +1,50 @@
+"""
+MultiArmExperiment: per-comparison nulls and multiple comparison corrections.
+"""
+
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+from modules.multiarm import MultiArmExperiment
+
+def exact_p_value(p_control, p_treatment, n_control, n_treatment):
+    """
+    Exact p value of the simulated test for one pair, with both arms at their pooled probability.
+    """
+    p_sample = (p_control * n_control + p_treatment * n_treatment) / (n_control + n_treatment)
+    control = np.arange(n_control + 1)
+    needed = np.ceil((p_treatment - p_control + control / n_control) * n_treatment - 1e-9)
+
+    return float(np.sum(stats.binom.pmf(control, n_control, p_sample) * stats.binom.sf(needed - 1, n_treatment, p_sample)))
+
+def test_pairwise_nulls_are_pooled_per_pair():
+    """
+    Each pair's p value is its own two-arm test, however different the other arms are.
+    """
+    p_arms, n_arms = [0.10, 0.11, 0.12, 0.20], [4000, 5000, 6000, 3000]
+    experiment = MultiArmExperiment(p_arms, n_arms)
+    results = experiment.evaluate(pairwise = True, draws = 200000, seed = 2)
+
+    for row, (a, b) in zip(results.itertuples(), zip(*experiment.comparisons(pairwise = True))):
+        exact = exact_p_value(p_arms[a], p_arms[b], n_arms[a], n_arms[b])
+        if row.engine == 'simulation':
+            assert row.p_value == pytest.approx(exact, rel = 0.05, abs = 1e-4)
+        else:
+            assert row.p_value < 1 / 200000
+
+def test_holm_correction():
+    """
+    Holm's step-down adjustment: sorted p values times (m - rank), made non-decreasing.
+    """
+    experiment = MultiArmExperiment([0.10, 0.105, 0.11, 0.115], [20000] * 4)
+    results = experiment.evaluate(simulate = False, correction = 'holm')
+
+    p_values = results['p_value'].to_numpy()
+    order = np.argsort(p_values)
+    m = len(p_values)
+    expected = np.empty(m)
+    expected[order] = np.minimum(np.maximum.accumulate(p_values[order] * (m - np.arange(m))), 1)
+
+    assert results['p_adjusted'].to_numpy() == pytest.approx(expected)
+    assert (results['significant'] == (expected < 0.05)).all()
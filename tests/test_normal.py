@@ -0,0 +1,61 @@
+"""
+NormalExperiment: means with their own variances, and CUPED adjustment.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+
+from modules.normal import NormalExperiment
+
+def test_missing_variances_raise():
+    """
+    Means don't imply a variance, so methods that need one say so rather than dividing by zero.
+    """
+    experiment = NormalExperiment(u_control = 10, u_treatment = 11, n_control = 1000, n_treatment = 1000)
+
+    for method in (experiment.analyze_significance, experiment.simulate_power, experiment.estimate_sample):
+        with pytest.raises(ValueError, match = 'var_control and var_treatment needed'):
+            method()
+
+def test_significance_is_a_z_test():
+    """
+    P value and power match the closed-form one-tailed z test with each group's variance
+    (power's null spread is control's alone, as in BinomialExperiment).
+    """
+    experiment = NormalExperiment(u_control = 10, u_treatment = 10.5, n_control = 1000, n_treatment = 800,
+                                  var_control = 25, var_treatment = 36)
+    se = np.sqrt(25 / 1000 + 36 / 800)
+    z = 0.5 / se
+
+    assert experiment.analyze_significance() == pytest.approx(stats.norm.sf(z), rel = 1e-6)
+    critical = stats.norm.ppf(0.95) * np.sqrt(2 * 25 / 1000)
+    assert experiment.simulate_power() == pytest.approx(stats.norm.sf((critical - 0.5) / se), rel = 1e-6)
+
+def test_cuped_matches_adjusted_outcome():
+    """
+    CUPED-adjusted means and variances are those of y - theta (x - mean(x)), with theta
+    the regression of y on x within groups, and they shrink the variance by about the
+    squared correlation.
+    """
+    rng = np.random.default_rng(0)
+    n = 20000
+    x = rng.normal(50, 10, size = n)
+    group = np.where(np.arange(n) % 2 == 0, 'control', 'treatment')
+    y = x + rng.normal(0, 5, size = n) + (group == 'treatment') * 0.3
+    data = pd.DataFrame({'group': group, 'y': y, 'x': x})
+
+    experiment = NormalExperiment()
+    experiment.ingest_data(data, 'control', 'treatment', covariate = 'x')
+
+    within = {name: (x[group == name] - x[group == name].mean(), y[group == name] - y[group == name].mean())
+              for name in ('control', 'treatment')}
+    theta = sum((dx * dy).sum() for dx, dy in within.values()) / sum((dx ** 2).sum() for dx, dy in within.values())
+    adjusted = y - theta * (x - x.mean())
+    control = adjusted[group == 'control']
+
+    assert experiment.theta == pytest.approx(theta, rel = 1e-6)
+    assert experiment.u_control == pytest.approx(control.mean(), rel = 1e-9)
+    assert experiment.var_control == pytest.approx(control.var(ddof = 1), rel = 1e-3)
+    assert experiment.variance_reduction == pytest.approx(np.corrcoef(x, y)[0, 1] ** 2, abs = 0.01)
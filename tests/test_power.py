@@ -0,0 +1,28 @@
+"""
+Power at and around zero effect, where the one-tailed test's rejection rate is alpha.
+"""
+
+import pytest
+
+from modules import analytic, core
+from modules.binomial import BinomialExperiment
+from modules.normal import NormalExperiment
+
+def test_power_at_zero_effect_is_alpha():
+    """
+    With no effect, the test rejects at its false positive rate, alpha (not 1 - alpha),
+    in every implementation of power.
+    """
+    params = core.ExperimentParams(p_control = 0.1, p_treatment = 0.1, n_control = 5000, n_treatment = 5000, alpha = 0.05)
+
+    assert analytic.power(0.1, 0.1, 5000, 5000, alpha = 0.05) == pytest.approx(0.05)
+    assert core.power(params) == pytest.approx(0.05)
+    assert BinomialExperiment(0.1, 0.1, 5000, 5000).simulate_power() == pytest.approx(0.05)
+    assert NormalExperiment(10, 10, 500, 500, var_control = 4, var_treatment = 4).simulate_power() == pytest.approx(0.05)
+
+def test_power_is_continuous_at_zero_effect():
+    """
+    Tiny effects either side of zero have power just above alpha, so zero isn't a jump.
+    """
+    for p_treatment in (0.1 + 1e-7, 0.1 - 1e-7):
+        assert analytic.power(0.1, p_treatment, 5000, 5000, alpha = 0.05) == pytest.approx(0.05, abs = 1e-4)
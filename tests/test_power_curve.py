@@ -0,0 +1,76 @@
+"""
+Simulated power curves with common random numbers (core.power_curve()).
+"""
+
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+from modules import core
+
+PARAMS = core.ExperimentParams(p_control = 0.1, p_treatment = 0.12, alpha = 0.05)
+
+def difference_pmf(n, p_control, p_treatment):
+    """
+    Exact distribution of treatment rate - control rate for two groups of n, as
+    (values, probabilities) sorted by value.
+    """
+    counts = np.arange(n + 1)
+    joint = np.outer(stats.binom.pmf(counts, n, p_control), stats.binom.pmf(counts, n, p_treatment))
+    differences = (counts[None, :] - counts[:, None]).ravel()
+    probabilities = np.bincount(differences + n, weights = joint.ravel())
+
+    return np.arange(-n, n + 1) / n, probabilities
+
+def exact_power(n, params):
+    """
+    Power of the simulated test at n per group: the alt's chance of reaching the smallest
+    difference the null reaches with probability at most alpha.
+    """
+    p_sample = (params.p_control + params.p_treatment) / 2
+    values, null = difference_pmf(n, p_sample, p_sample)
+    tail = np.cumsum(null[::-1])[::-1]
+    critical = values[np.argmax(tail <= params.alpha)]
+
+    values, alt = difference_pmf(n, params.p_control, params.p_treatment)
+
+    return alt[values >= critical].sum()
+
+def test_matches_exact_power():
+    """
+    Each point is within a few standard errors of the exact power, plus a little for the
+    simulated null's own estimate of the critical value.
+    """
+    n_grid = [200, 600, 1200, 2000]
+    curve = core.power_curve(PARAMS, n_grid, draws = 40000, seed = 4)
+
+    for n, estimate, error in zip(curve['n'], curve['power'], curve['error']):
+        assert abs(estimate - exact_power(n, PARAMS)) < 4 * error + 0.01
+
+def test_common_random_numbers_steady_differences():
+    """
+    Differences in power between neighbouring sizes vary far less across seeds than
+    those of independently simulated points.
+    """
+    common, independent = [], []
+    for seed in range(12):
+        curve = core.power_curve(PARAMS, [1000, 1100], draws = 5000, seed = seed)
+        common.append(curve['power'][1] - curve['power'][0])
+
+        first = core.power_curve(PARAMS, [1000], draws = 5000, seed = 100 + seed)['power'][0]
+        second = core.power_curve(PARAMS, [1100], draws = 5000, seed = 200 + seed)['power'][0]
+        independent.append(second - first)
+
+    assert np.std(common) * 2 < np.std(independent)
+
+def test_monotone_is_opt_in():
+    """
+    By default the curve is the raw estimates. monotone = True is their running maximum.
+    """
+    n_grid = np.arange(100, 2100, 100)
+    raw = core.power_curve(PARAMS, n_grid, draws = 2000, seed = 5)
+    smoothed = core.power_curve(PARAMS, n_grid, draws = 2000, seed = 5, monotone = True)
+
+    assert smoothed['power'] == pytest.approx(np.maximum.accumulate(raw['power']))
+    assert (smoothed['power'] >= raw['power']).all()
+    assert (smoothed['error'] == raw['error']).all()
@@ -0,0 +1,67 @@
+"""
+Delta method ratio metrics (modules/ratio.py).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+
+from modules.ratio import RatioExperiment
+
+def sessions(rng, units, rate):
+    """
+    Event rows (group, unit, clicks) for one group: each unit has its own click rate and
+    a random number of sessions, so a unit's sessions aren't independent.
+    """
+    counts = rng.poisson(4, size = units) + 1
+    unit_rates = rng.beta(rate * 20, (1 - rate) * 20, size = units)
+    unit = np.repeat(np.arange(units), counts)
+
+    return unit, rng.binomial(1, unit_rates[unit])
+
+def experiment_data(rng, units = 2000, rates = (0.10, 0.10)):
+    frames = []
+    for group, rate in zip(('control', 'treatment'), rates):
+        unit, clicks = sessions(rng, units, rate)
+        frames.append(pd.DataFrame({'group': group, 'unit': unit, 'clicks': clicks}))
+
+    return pd.concat(frames, ignore_index = True)
+
+def test_delta_variance_matches_closed_form():
+    """
+    The per-unit variance is the delta method's, computed here directly from unit sums.
+    """
+    data = experiment_data(np.random.default_rng(0))
+    experiment = RatioExperiment()
+    experiment.ingest_data(data, 'control', 'treatment', unit_col = 'unit', numerator_col = 'clicks')
+
+    units = data[data['group'] == 'control'].groupby('unit')['clicks'].agg(['sum', 'count'])
+    y, x = units['sum'].to_numpy(float), units['count'].to_numpy(float)
+    ratio = y.mean() / x.mean()
+    cov = np.cov(y, x)
+    expected = (cov[0, 0] - 2 * ratio * cov[0, 1] + ratio ** 2 * cov[1, 1]) / x.mean() ** 2
+
+    assert experiment.u_control == pytest.approx(ratio)
+    assert experiment.var_control == pytest.approx(expected, rel = 1e-9)
+
+    z = stats.norm.ppf(0.975)
+    margin = z * np.sqrt(expected / len(units))
+    assert experiment.interval_control['lower'] == pytest.approx(ratio - margin)
+    assert experiment.interval_control['upper'] == pytest.approx(ratio + margin)
+
+def test_difference_interval_covers():
+    """
+    Over repeated experiments with no effect, the 95% difference interval covers 0 about
+    95% of the time, even though a unit's sessions are correlated.
+    """
+    rng = np.random.default_rng(1)
+    covered = []
+    for _ in range(200):
+        experiment = RatioExperiment()
+        experiment.ingest_data(experiment_data(rng, units = 500), 'control', 'treatment', unit_col = 'unit',
+                               numerator_col = 'clicks')
+        covered.append(experiment.interval_difference['lower'] <= 0 <= experiment.interval_difference['upper'])
+
+    # 95% +/- about 3 binomial standard errors over 200 experiments
+    assert 0.9 <= np.mean(covered) <= 0.99
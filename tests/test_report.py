@@ -0,0 +1,58 @@
+"""
+Portfolio reports (modules/report.py and report-portfolio.py).
+"""
+
+import os
+import subprocess
+import sys
+
+from modules import report
+from modules.binomial import BinomialExperiment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_failures_stay_in_their_section(tmp_path, monkeypatch):
+    """
+    An experiment that fails, even with an unexpected exception, gets an error row and
+    section of its own, and the rest of the portfolio is still written.
+    """
+    evaluate = BinomialExperiment.evaluate
+    def crash(self, *args, **kwargs):
+        if self.p_control == 0.3:
+            raise RuntimeError('boom')
+        return evaluate(self, *args, **kwargs)
+    monkeypatch.setattr(BinomialExperiment, 'evaluate', crash)
+
+    experiments = {'good': {'p_control': 0.1, 'p_treatment': 0.12, 'n_control': 5000, 'n_treatment': 5000},
+                   'missing': {'p_control': 0.1},
+                   'crash': {'p_control': 0.3, 'p_treatment': 0.32, 'n_control': 5000, 'n_treatment': 5000},
+                   'plan': {'p_control': 0.1, 'p_treatment': 0.12}}
+    filename = str(tmp_path / 'report.html')
+    rows = report.write_report(experiments, filename, figures = ('p',), draws = 10000, seed = 1, workers = 0)
+
+    assert [row[1] for row in rows] == list(experiments)
+    errors = {row[1]: row[3] for row in rows}
+    assert errors == {'good': None, 'missing': 'Missing field p_treatment.', 'crash': 'RuntimeError: boom', 'plan': None}
+    assert rows[0][2]['engine'] == 'simulation'
+
+    with open(filename) as f:
+        page = f.read()
+    assert page.count('<section id="experiment-') == 4
+    assert 'RuntimeError: boom' in page
+    assert page.rstrip().endswith('</html>')
+
+def test_duplicate_names_rejected(tmp_path):
+    """
+    Experiments sharing a name would overwrite each other, so the script refuses them.
+    """
+    table = tmp_path / 'experiments.csv'
+    table.write_text('name,p_control,p_treatment,n_control,n_treatment\n'
+                     'a,0.1,0.12,5000,5000\nb,0.1,0.11,5000,5000\na,0.2,0.22,5000,5000\n')
+
+    run = subprocess.run([sys.executable, os.path.join(ROOT, 'report-portfolio.py'), str(table),
+                          '--output', str(tmp_path / 'report.html'), '--workers', '0'],
+                         capture_output = True, text = True, timeout = 120)
+
+    assert run.returncode != 0
+    assert 'ValueError' in run.stderr and 'duplicate names' in run.stderr and ': a.' in run.stderr
+    assert not (tmp_path / 'report.html').exists()
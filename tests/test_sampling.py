@@ -0,0 +1,72 @@
+"""
+Sampling schemes of core.simulate_distributions() and the conditional p value, pinned
+against the exact p value of the simulated test.
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+from modules import core
+from modules.binomial import BinomialExperiment
+
+PARAMS = core.ExperimentParams(p_control = 0.1, p_treatment = 0.12, n_control = 5000, n_treatment = 5000)
+
+def exact_p_value(params):
+    """
+    Probability that the treatment rate minus the control rate reaches the observed
+    difference with both groups at the pooled probability (as in benchmark-sampling.py).
+    """
+    p_sample = core.pooled_probability(params)
+    control = np.arange(params.n_control + 1)
+    needed = np.ceil((params.p_treatment - params.p_control + control / params.n_control) * params.n_treatment - 1e-9)
+
+    return float(np.sum(stats.binom.pmf(control, params.n_control, p_sample) * stats.binom.sf(needed - 1, params.n_treatment, p_sample)))
+
+@pytest.mark.parametrize('sampling', ['random', 'crn', 'antithetic'])
+def test_conditional_matches_exact(sampling):
+    """
+    The conditional p value is within a few of its reported standard errors of the exact one.
+    """
+    simulated = core.simulate_distributions(PARAMS, draws = 100000, seed = 3, sampling = sampling, chunk_size = 30000)
+    p_value, error = core.conditional_significance(simulated['tail_sums'], simulated['tail_counts'])
+
+    assert abs(p_value - exact_p_value(PARAMS)) < 4 * error
+
+def test_conditional_needs_far_fewer_draws():
+    """
+    Across seeds, the conditional p value's variance is at least 10 times smaller than
+    counting null draws past the observed difference, from the same draws.
+    """
+    counted, conditional = [], []
+    for seed in range(20):
+        simulated = core.simulate_distributions(PARAMS, draws = 20000, seed = seed)
+        counted.append(core.simulated_significance(PARAMS, simulated['null']))
+        conditional.append(core.conditional_significance(simulated['tail_sums'], simulated['tail_counts'])[0])
+
+    assert np.var(counted) > 10 * np.var(conditional)
+
+def test_sobol_draws():
+    """
+    Sobol runs whole power-of-2 batches, as many as fit, and warns with the count it runs
+    when that's short of the request.
+    """
+    with pytest.warns(UserWarning, match = '98,304 of the 100,000'):
+        simulated = core.simulate_distributions(PARAMS, draws = 100000, seed = 1, sampling = 'sobol')
+
+    assert len(simulated['null']) == 98304
+    assert simulated['batches'] == 12
+    assert simulated['tail_counts'].sum() == 98304
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert core.sobol_batches(2 ** 17) == (2 ** 17, 16)
+
+    # The experiment's result reports the draws that ran
+    experiment = BinomialExperiment(0.1, 0.12, 5000, 5000, draws = 100000, sampling = 'sobol', seed = 1)
+    with pytest.warns(UserWarning):
+        result = experiment.evaluate()
+    assert result.draws == 98304
+    assert abs(result.p_value - exact_p_value(PARAMS)) < 4 * result.p_value_error
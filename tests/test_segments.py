@@ -0,0 +1,69 @@
+"""
+Segmented analysis (modules/segments.py): every segment at once, in one pass.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+
+from modules.binomial import BinomialExperiment
+from modules.segments import aggregate_segments, segment_results
+
+def segmented_data(rng, rows = 40000):
+    data = pd.DataFrame({'group': rng.choice(['control', 'treatment'], size = rows),
+                         'country': rng.choice(['us', 'uk', 'de', 'fr'], size = rows),
+                         'device': rng.choice(['mobile', 'desktop'], size = rows)})
+    rate = 0.1 + 0.02 * (data['group'] == 'treatment') * (data['device'] == 'mobile')
+    data['outcome'] = rng.binomial(1, rate)
+
+    return data
+
+def test_each_segment_is_its_own_experiment():
+    """
+    Every segment's row matches a two-arm evaluation of that segment's rows alone.
+    """
+    data = segmented_data(np.random.default_rng(0))
+    counts = aggregate_segments(data, 'group', 'outcome', ['country', 'device'], chunk_size = 7000)
+    results = segment_results(counts, 'control', 'treatment')
+
+    assert len(results) == 8
+    for row in results.itertuples():
+        rows = data[(data['country'] == row.country) & (data['device'] == row.device)]
+        experiment = BinomialExperiment()
+        experiment.ingest_data(rows[['group', 'outcome']], 'control', 'treatment', evaluate = False)
+
+        assert (row.n_control, row.n_treatment) == (experiment.n_control, experiment.n_treatment)
+        assert row.p_value == pytest.approx(experiment.analyze_significance())
+        assert row.power == pytest.approx(experiment.simulate_power())
+
+def test_intervals():
+    data = segmented_data(np.random.default_rng(1))
+    results = segment_results(aggregate_segments(data, 'group', 'outcome', ['device']), 'control', 'treatment', level = 90)
+
+    z = stats.norm.ppf(0.95)
+    margin = z * np.sqrt(results['p_control'] * (1 - results['p_control']) / results['n_control'])
+    assert results['control_lower'].to_numpy() == pytest.approx((results['p_control'] - margin).to_numpy())
+    assert results['control_upper'].to_numpy() == pytest.approx((results['p_control'] + margin).to_numpy())
+
+def test_missing_arm_and_correction():
+    """
+    A segment without a treatment arm gets NaN statistics and doesn't count toward the
+    Benjamini-Hochberg adjustment of the rest.
+    """
+    data = segmented_data(np.random.default_rng(2))
+    data = data[~((data['country'] == 'fr') & (data['group'] == 'treatment'))]
+    results = segment_results(aggregate_segments(data, 'group', 'outcome', ['country']), 'control', 'treatment',
+                              correction = 'fdr_bh')
+
+    missing = results['country'] == 'fr'
+    assert results.loc[missing, 'p_value'].isna().all() and results.loc[missing, 'p_adjusted'].isna().all()
+    assert not results.loc[missing, 'significant'].any()
+
+    p_values = results.loc[~missing, 'p_value'].to_numpy()
+    m = len(p_values)
+    order = np.argsort(p_values)
+    stepped = np.minimum.accumulate((p_values[order] * m / np.arange(1, m + 1))[::-1])[::-1]
+    expected = np.empty(m)
+    expected[order] = np.minimum(stepped, 1)
+    assert results.loc[~missing, 'p_adjusted'].to_numpy() == pytest.approx(expected)
@@ -0,0 +1,66 @@
+"""
+Round trips through the NDJSON server and its --connect client.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'eval-experiment.py')
+
+def test_connect_large_batch(tmp_path):
+    """
+    Thousands of requests through --connect come back complete and in order, rather
+    than deadlocking once the socket buffers fill.
+    """
+    path = str(tmp_path / 'server.sock')
+    server = subprocess.Popen([sys.executable, SCRIPT, '--serve', path, '--workers', '0'],
+                              stderr = subprocess.DEVNULL)
+    try:
+        for _ in range(300):
+            if os.path.exists(path):
+                break
+            time.sleep(0.1)
+
+        count = 5000
+        lines = ''.join(json.dumps({'id': i, 'action': 'plan', 'p_control': 0.1, 'p_treatment': 0.12,
+                                    'simulate': False}) + '\n' for i in range(count))
+        client = subprocess.run([sys.executable, SCRIPT, '--connect', path], input = lines,
+                                capture_output = True, text = True, timeout = 60)
+
+        assert client.returncode == 0, client.stderr
+        responses = [json.loads(line) for line in client.stdout.splitlines()]
+        assert [r['id'] for r in responses] == list(range(count))
+        assert all('result' in r for r in responses)
+    finally:
+        server.terminate()
+        server.wait(timeout = 10)
+
+def test_bad_request_does_not_stop_server():
+    """
+    A request that fails outside validation (an OverflowError from an absurd sample size)
+    gets an error line, and the requests after it still get answered. Every line is
+    strict JSON, with no NaN tokens.
+    """
+    lines = [{'id': 1, 'p_control': 0.1, 'p_treatment': 0.12, 'n_control': 1e300, 'n_treatment': 1e300},
+             {'id': 2, 'p_control': 0.1, 'p_treatment': 0.6, 'n_control': 50000, 'n_treatment': 50000, 'draws': 10000},
+             {'id': 3, 'p_control': 0.1, 'p_treatment': 0.12, 'n_control': 5000, 'n_treatment': 5000, 'simulate': False}]
+    stdin = 'not json\n' + ''.join(json.dumps(line) + '\n' for line in lines)
+
+    server = subprocess.run([sys.executable, SCRIPT, '--serve', '-', '--workers', '0'], input = stdin,
+                            capture_output = True, text = True, timeout = 60)
+
+    assert server.returncode == 0, server.stderr
+    strict = lambda constant: pytest.fail('non-standard JSON constant {}'.format(constant))
+    responses = [json.loads(line, parse_constant = strict) for line in server.stdout.splitlines()]
+
+    assert [r['id'] for r in responses] == [None, 1, 2, 3]
+    assert 'Invalid JSON' in responses[0]['error']
+    assert 'OverflowError' in responses[1]['error']
+    assert 'result' in responses[2]
+    assert responses[3]['result']['p_value'] < 0.01
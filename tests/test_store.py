@@ -0,0 +1,45 @@
+"""
+Saving and loading experiment state (modules/store.py).
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from modules.binomial import BinomialExperiment
+from modules.store import load_state, save_state
+
+def test_round_trip(tmp_path):
+    """
+    A loaded experiment reports the same results, and its simulation comes back as
+    read-only memory maps that answer new questions without simulating again.
+    """
+    experiment = BinomialExperiment(0.1, 0.12, 5000, 5000, draws = 20000, seed = 1)
+    original = experiment.evaluate()
+    experiment.save(str(tmp_path))
+
+    loaded = BinomialExperiment.load(str(tmp_path))
+
+    assert isinstance(loaded.binom_null, np.memmap) and not loaded.binom_null.flags.writeable
+    for name in BinomialExperiment.saved_arrays:
+        assert np.array_equal(getattr(loaded, name), getattr(experiment, name))
+    assert loaded.interval_control == experiment.interval_control
+
+    assert loaded.simulate_significance() == original.p_value
+    assert loaded.p_value_error == original.p_value_error
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+def test_in_memory_load(tmp_path):
+    save_state(str(tmp_path), 'Thing', {'a': np.float64(1.5), 'b': None}, {'x': np.arange(5), 'skipped': None})
+    params, arrays = load_state(str(tmp_path), 'Thing', mmap_mode = None)
+
+    assert params == {'a': 1.5, 'b': None}
+    assert list(arrays) == ['x'] and not isinstance(arrays['x'], np.memmap)
+    assert np.array_equal(arrays['x'], np.arange(5))
+
+def test_kind_is_checked(tmp_path):
+    save_state(str(tmp_path), 'NormalExperiment', {}, {})
+
+    with pytest.raises(ValueError, match = 'holds a saved NormalExperiment'):
+        BinomialExperiment.load(str(tmp_path))
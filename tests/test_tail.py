@@ -0,0 +1,78 @@
+"""
+Importance-sampled tail p values (core.tail_significance()) and their fallbacks.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from scipy.special import logsumexp
+
+from modules import core
+from modules.binomial import BinomialExperiment
+from modules.multiarm import MultiArmExperiment
+
+def exact_log_p_value(params):
+    """
+    Log of the exact p value of the simulated test, for equal group sizes.
+    """
+    n = params.n_control
+    p_sample = core.pooled_probability(params)
+    control = np.arange(n + 1)
+    needed = np.round((params.p_treatment - params.p_control) * n) + control
+
+    return logsumexp(stats.binom.logpmf(control, n, p_sample) + stats.binom.logsf(needed - 1, n, p_sample))
+
+def test_tail_matches_exact():
+    """
+    Estimates far below plain simulation's resolution land within a few of their own
+    standard errors of the exact p value.
+    """
+    for p_treatment in (0.13, 0.16, 0.3):
+        params = core.ExperimentParams(p_control = 0.1, p_treatment = p_treatment, n_control = 2000, n_treatment = 2000)
+        p_value, relative_error = core.tail_significance(params, draws = 20000, seed = 1)
+        exact = np.exp(exact_log_p_value(params))
+
+        assert relative_error < 0.1
+        assert abs(p_value - exact) < 4 * relative_error * p_value
+
+def test_tail_underflow_is_a_bound():
+    """
+    A p value below the smallest float comes back as that float, with no error, rather than 0 or NaN.
+    """
+    params = core.ExperimentParams(p_control = 0.1, p_treatment = 0.6, n_control = 50000, n_treatment = 50000)
+    p_value, relative_error = core.tail_significance(params, seed = 1)
+
+    assert p_value == np.finfo(np.float64).smallest_subnormal
+    assert relative_error == None
+
+    result = core.evaluate(params, draws = 10000, seed = 1)
+    assert result.engine == 'importance'
+    assert result.p_value > 0 and result.p_value_error == None
+
+def test_ingest_data_falls_back_to_tail():
+    """
+    ingest_data() estimates p values past the simulation's resolution, like evaluate().
+    """
+    rng = np.random.default_rng(0)
+    n = 100000
+    data = pd.DataFrame({'group': np.repeat(['control', 'treatment'], n),
+                         'outcome': np.r_[rng.random(n) < 0.10, rng.random(n) < 0.13].astype(int)})
+
+    result = BinomialExperiment(draws = 100000, seed = 3).ingest_data(data, 'control', 'treatment')
+
+    assert result.engine == 'importance'
+    assert 0 < result.p_value < 1e-50
+    assert 0 < result.p_value_error < result.p_value
+    # draws are the tail estimate's, not the simulation's that couldn't resolve it
+    assert result.draws == 5000
+
+def test_multiarm_falls_back_to_tail():
+    """
+    Comparisons too significant to simulate get tail estimates instead of 0.
+    """
+    experiment = MultiArmExperiment([0.1, 0.12, 0.3], [5000, 5000, 5000])
+    results = experiment.evaluate(draws = 100000, seed = 1)
+
+    assert list(results['engine']) == ['simulation', 'importance']
+    assert (results['p_value'] > 0).all()
+    assert results['p_value'][1] < 1e-100
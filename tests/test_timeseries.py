@@ -0,0 +1,77 @@
+"""
+Time-bucketed cumulative evaluation (modules/timeseries.py).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import analytic
+from modules.timeseries import aggregate_timeseries, cumulative_results
+
+def events(rng, rows, start, days, tz = None):
+    """
+    Random events over days from start, half control and half treatment.
+    """
+    offsets = pd.to_timedelta(rng.uniform(0, days * 86400, size = rows), unit = 's')
+    return pd.DataFrame({'time': pd.Timestamp(start, tz = tz) + offsets,
+                         'group': rng.choice(['control', 'treatment', 'other'], size = rows),
+                         'outcome': rng.binomial(1, 0.1, size = rows)})
+
+def expected_counts(data, keys):
+    """
+    Per-bucket successes and trials for each arm, straight from a pandas groupby on keys.
+    """
+    data = data[data['group'] != 'other']
+    return data.groupby([keys, data['group']])['outcome'].agg(['sum', 'count']).unstack(fill_value = 0)
+
+def test_chunked_buckets_match_groupby():
+    """
+    Summing chunk by chunk gives the same buckets as one groupby on floored timestamps.
+    """
+    data = events(np.random.default_rng(0), 20000, '2024-01-01', 10)
+    counts = aggregate_timeseries(data, 'time', 'group', 'outcome', 'control', 'treatment', interval = '6h', chunk_size = 3000)
+    expected = expected_counts(data, data['time'].dt.floor('6h').rename(None))
+
+    assert list(counts.index) == list(expected.index)
+    for arm in ('control', 'treatment'):
+        assert (counts['successes_' + arm].to_numpy() == expected['sum'][arm].to_numpy()).all()
+        assert (counts['trials_' + arm].to_numpy() == expected['count'][arm].to_numpy()).all()
+
+def test_aware_days_start_at_local_midnight():
+    """
+    Across a daylight saving change, daily buckets of timezone-aware timestamps are local
+    calendar days and keep the timezone.
+    """
+    data = events(np.random.default_rng(1), 20000, '2024-03-07', 6, tz = 'America/New_York')
+    counts = aggregate_timeseries(data, 'time', 'group', 'outcome', 'control', 'treatment', interval = '1D', chunk_size = 5000)
+    expected = expected_counts(data, data['time'].dt.date.rename(None))
+
+    assert str(counts.index.tz) == 'America/New_York'
+    assert (counts.index.hour == 0).all()
+    assert [stamp.date() for stamp in counts.index] == list(expected.index)
+    assert (counts['trials_control'].to_numpy() == expected['count']['control'].to_numpy()).all()
+
+def test_mixed_aware_and_naive_rejected():
+    aware = events(np.random.default_rng(2), 100, '2024-01-01', 1, tz = 'UTC')
+    naive = events(np.random.default_rng(3), 100, '2024-01-01', 1)
+
+    with pytest.raises(ValueError, match = 'mixes timezone-aware and naive'):
+        aggregate_timeseries([aware, naive], 'time', 'group', 'outcome', 'control', 'treatment')
+
+def test_last_row_is_a_single_evaluation():
+    """
+    The trajectory's last row is what one evaluation of all the data reports.
+    """
+    data = events(np.random.default_rng(4), 20000, '2024-01-01', 10)
+    counts = aggregate_timeseries(data, 'time', 'group', 'outcome', 'control', 'treatment')
+    results = cumulative_results(counts)
+
+    totals = expected_counts(data, pd.Series(0, index = data.index))
+    s_control, s_treatment = totals['sum'].iloc[0][['control', 'treatment']]
+    n_control, n_treatment = totals['count'].iloc[0][['control', 'treatment']]
+    last = results.iloc[-1]
+
+    assert last['n_control'] == n_control and last['n_treatment'] == n_treatment
+    assert last['p_value'] == pytest.approx(float(analytic.significance(s_control / n_control, s_treatment / n_treatment,
+                                                                        n_control, n_treatment)))